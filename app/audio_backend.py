@@ -0,0 +1,217 @@
+import os
+import threading
+import time
+import numpy as np
+
+# sounddevice needs PortAudio, which headless servers and CI containers lack
+try:
+    import sounddevice as sd
+    sd_error = None
+except (ImportError, OSError) as e:
+    sd = None
+    sd_error = e
+
+# Overrides the backend picked when an engine is created without one
+BACKEND_ENV = "DROPBOT_AUDIO_BACKEND"
+
+# Used when the device does not report a native rate
+DEFAULT_SAMPLE_RATE = 44100
+
+class SoundDeviceBackend:
+    """Plays through the sound card with sounddevice/PortAudio"""
+    name = "sounddevice"
+
+    def __init__(self, device=None):
+        if sd is None:
+            raise RuntimeError(f"sounddevice is not available ({sd_error}); set "
+                               f"{BACKEND_ENV}=simulated to run without a sound card")
+        self.device = device
+
+    def native_sample_rate(self):
+        """The output device's default rate, or None if it cannot be queried"""
+        try:
+            info = sd.query_devices(self.device, 'output')
+            return int(info['default_samplerate'])
+        except Exception as e:
+            print(f"⚠️ Could not query output device rate: {e}")
+            return None
+
+    def configure(self, sample_rate, channels=2):
+        """Set process-wide sounddevice defaults for anything else that plays audio"""
+        sd.default.samplerate = sample_rate
+        sd.default.channels = channels
+        sd.default.dtype = 'float32'
+
+    def open_stream(self, callback, sample_rate, block_size, channels=2):
+        """Unstarted output stream calling callback(outdata, frames, time, status)"""
+        return sd.OutputStream(
+            callback=callback,
+            samplerate=sample_rate,
+            channels=channels,
+            blocksize=block_size,
+            dtype='float32',
+            device=self.device
+        )
+
+class SimulatedTimeInfo:
+    """Stand-in for the time info PortAudio passes to callbacks, in stream seconds"""
+    __slots__ = ("currentTime", "outputBufferDacTime", "inputBufferAdcTime")
+
+    def __init__(self):
+        self.currentTime = 0.0
+        self.outputBufferDacTime = 0.0
+        self.inputBufferAdcTime = 0.0
+
+class SimulatedStatus:
+    """Stand-in for sounddevice.CallbackFlags; falsy unless a flag is set"""
+    __slots__ = ("output_underflow", "output_overflow", "priming_output")
+
+    def __init__(self):
+        self.output_underflow = False
+        self.output_overflow = False
+        self.priming_output = False
+
+    def __bool__(self):
+        return self.output_underflow or self.output_overflow or self.priming_output
+
+class SimulatedStream:
+    """Output stream driven by a thread instead of a sound card
+
+    With realtime=True blocks are paced by a timer at the stream's sample
+    rate and a block that finishes past its deadline is reported to the
+    next callback as an output underflow, like a real device would. With
+    realtime=False the callback runs in a tight loop as fast as the CPU
+    allows. Output can be recorded to any file soundfile can write.
+    """
+    def __init__(self, callback, sample_rate, block_size, channels=2,
+                 realtime=True, record_path=None, max_blocks=None):
+        self.callback = callback
+        self.samplerate = sample_rate
+        self.blocksize = block_size or 512
+        self.channels = channels
+        self.realtime = realtime
+        self.record_path = record_path
+        self.max_blocks = max_blocks
+
+        self.outdata = np.zeros((self.blocksize, channels), dtype=np.float32)
+        self.time_info = SimulatedTimeInfo()
+        self.status = SimulatedStatus()
+        self.blocks = 0
+        self.underflows = 0
+        self.running = False
+        self.thread = None
+        self.record_file = None
+
+    @property
+    def active(self):
+        return self.running
+
+    def start(self):
+        if self.running:
+            return
+        if self.record_path:
+            import soundfile as sf
+            self.record_file = sf.SoundFile(self.record_path, 'w', samplerate=self.samplerate,
+                                            channels=self.channels, subtype="PCM_24")
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+        self.thread = None
+
+    def close(self):
+        self.stop()
+        if self.record_file is not None:
+            self.record_file.close()
+            self.record_file = None
+
+    def run(self):
+        frames = self.blocksize
+        period = frames / self.samplerate
+        started = time.perf_counter()
+        next_deadline = started + period
+
+        while self.running:
+            # Stream time is exact sample time, like a DAC clock
+            stream_time = self.blocks * period
+            self.time_info.currentTime = time.perf_counter() - started
+            self.time_info.outputBufferDacTime = stream_time
+            self.callback(self.outdata, frames, self.time_info, self.status)
+            self.status.output_underflow = False
+
+            if self.record_file is not None:
+                self.record_file.write(self.outdata)
+            self.blocks += 1
+
+            if self.max_blocks is not None and self.blocks >= self.max_blocks:
+                self.running = False
+                break
+
+            if self.realtime:
+                now = time.perf_counter()
+                if now > next_deadline:
+                    # Missed the device deadline - skip ahead like a real stream
+                    self.status.output_underflow = True
+                    self.underflows += 1
+                    next_deadline = now
+                else:
+                    time.sleep(next_deadline - now)
+                next_deadline += period
+
+class SimulatedBackend:
+    """Headless backend for servers, CI and benchmarks - no audio device needed"""
+    name = "simulated"
+
+    def __init__(self, realtime=True, record_path=None, max_blocks=None, native_rate=None):
+        self.realtime = realtime
+        self.record_path = record_path
+        self.max_blocks = max_blocks
+        self.native_rate = native_rate  # Pretend device rate, e.g. 48000
+        self.streams = []
+
+    def native_sample_rate(self):
+        return self.native_rate
+
+    def configure(self, sample_rate, channels=2):
+        pass
+
+    def open_stream(self, callback, sample_rate, block_size, channels=2):
+        stream = SimulatedStream(callback, sample_rate, block_size, channels,
+                                 realtime=self.realtime, record_path=self.record_path,
+                                 max_blocks=self.max_blocks)
+        self.streams.append(stream)
+        return stream
+
+def negotiate_sample_rate(backend, sample_rate=None):
+    """Rate an engine should run at: the one asked for, else the device's own
+
+    Running at the device's native rate keeps PortAudio and the OS mixer
+    from resampling the output; stems are converted to it once, when the
+    stem store for that rate is written.
+    """
+    if sample_rate is not None:
+        return sample_rate
+    native = backend.native_sample_rate()
+    return native if native else DEFAULT_SAMPLE_RATE
+
+def get_backend(name=None, **options):
+    """Backend by name: "sounddevice", "simulated" (timer-paced) or "null" (tight loop)
+
+    Without a name, $DROPBOT_AUDIO_BACKEND is used, else the sound card.
+    The simulated backends are only used when asked for: a rig whose
+    PortAudio is broken fails here instead of "playing" in silence.
+    """
+    name = name or os.environ.get(BACKEND_ENV) or "sounddevice"
+
+    if name == "sounddevice":
+        return SoundDeviceBackend(**options)
+    if name == "simulated":
+        return SimulatedBackend(**options)
+    if name == "null":
+        options.setdefault("realtime", False)
+        return SimulatedBackend(**options)
+    raise ValueError(f"Unknown audio backend: {name}")
@@ -0,0 +1,47 @@
+import json
+import math
+import os
+
+METADATA_DIR = os.path.join("data", "metadata")
+
+# Loop lengths offered to the decks, in beats
+LOOP_BEATS = (1, 2, 4, 8, 16)
+
+class BeatGrid:
+    """Constant-tempo beat grid in source samples
+
+    Built from the analysis bpm; `first_beat` (seconds) shifts the grid when
+    the metadata has one, otherwise beats are counted from the track start.
+    """
+    def __init__(self, bpm, sample_rate=44100, first_beat=0.0):
+        if bpm <= 0:
+            raise ValueError(f"Invalid bpm: {bpm}")
+        self.bpm = float(bpm)
+        self.sample_rate = sample_rate
+        self.period = 60.0 / self.bpm * sample_rate  # Samples per beat (fractional)
+        self.origin = first_beat * sample_rate
+
+    @classmethod
+    def from_metadata(cls, song_name, sample_rate=44100):
+        """Grid from data/metadata/<song>.json, or None if missing or without bpm"""
+        metadata_path = os.path.join(METADATA_DIR, f"{song_name}.json")
+        if not os.path.exists(metadata_path):
+            return None
+        try:
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+            if not metadata.get("bpm"):
+                return None
+            return cls(metadata["bpm"], sample_rate, metadata.get("first_beat", 0.0))
+        except Exception as e:
+            print(f"⚠️ Could not read beat grid for {song_name}: {e}")
+            return None
+
+    def beats(self, count):
+        """Length of `count` beats in samples"""
+        return count * self.period
+
+    def next_beat(self, position):
+        """First beat at or after a source sample position"""
+        index = math.ceil((position - self.origin) / self.period - 1e-9)
+        return self.origin + index * self.period
@@ -1,42 +1,60 @@
-# python -m app.dual_dj_player
+# python -m app.dual_dj_player [n_decks]
 
 from tkinter import Tk, Label, Scale, Button, filedialog, Frame, Entry, StringVar, Canvas
 from tkinter import HORIZONTAL, LEFT, RIGHT, BOTH, X, Y
-from app.sounddevice_audio_engine import RealTimeStemAudioEngine
+from app.engine_process import create_mixer
+from app.stem_store import stem_color
 import threading
 import time
 import json
 import os
+import sys
+
+DECK_LETTERS = "ABCDEFGH"
+
+class DeckState:
+    """GUI-side state and widgets of one deck
+
+    Stem settings are kept by name, so any stem set works and a setting
+    carries over to the next song that has the same stem.
+    """
+    def __init__(self, index, engine, side):
+        self.index = index
+        self.letter = DECK_LETTERS[index]
+        self.engine = engine
+        self.side = side  # Crossfader side: 'A' or 'B'
+        self.playing = False
+        self.song = ""
+        self.metadata = None
+        self.volumes = {}
+        self.muted = {}
+        self.speed = 1.0
+        self.pitch = 0
+        
+        # Widgets, created by setup_deck_gui
+        self.title = None
+        self.play_btn = None
+        self.canvas = None
+        self.position_slider = None
+        self.position_label = None
+        self.stem_frame = None
+        self.mute_btns = {}
 
 class DualDJPlayer:
-    def __init__(self):
-        # Two independent audio engines
-        self.deck_a = RealTimeStemAudioEngine()
-        self.deck_b = RealTimeStemAudioEngine()
-        
-        # Deck states
-        self.deck_a_playing = False
-        self.deck_b_playing = False
-        self.deck_a_song = ""
-        self.deck_b_song = ""
-        self.deck_a_metadata = None
-        self.deck_b_metadata = None
-        
-        # Deck controls
-        self.deck_a_volumes = {"vocals": 1.0, "drums": 1.0, "bass": 1.0, "other": 1.0}
-        self.deck_b_volumes = {"vocals": 1.0, "drums": 1.0, "bass": 1.0, "other": 1.0}
-        
-        self.deck_a_muted = {"vocals": False, "drums": False, "bass": False, "other": False}
-        self.deck_b_muted = {"vocals": False, "drums": False, "bass": False, "other": False}
-        
-        self.deck_a_speed = 1.0
-        self.deck_b_speed = 1.0
-        self.deck_a_pitch = 0
-        self.deck_b_pitch = 0
+    def __init__(self, n_decks=2, deck_options=None):
+        # Any number of decks mixed on one shared output stream; even decks
+        # sit on crossfader side A, odd decks on side B. deck_options
+        # configure every deck engine (effects_mode, load_mode, ...)
+        self.mixer = create_mixer(n_decks=n_decks, deck_options=deck_options)
+        self.decks = [DeckState(i, engine, 'A' if i % 2 == 0 else 'B')
+                      for i, engine in enumerate(self.mixer.decks)]
         
         # Crossfader (0.0 = full A, 1.0 = full B)
         self.crossfader = 0.5
         
+        # Set recording of the master output
+        self.recording = False
+        
         # Position tracking
         self.position_update_thread = None
         self.should_update_positions = False
@@ -113,48 +131,38 @@ class DualDJPlayer:
             return False
     
     def load_song(self, deck, file_path):
-        """Load song into specified deck (A or B)"""
+        """Load song into a deck"""
         try:
-            if deck == 'A':
-                engine = self.deck_a
-                if self.deck_a_playing:
-                    self.toggle_play_deck('A')
-            else:
-                engine = self.deck_b
-                if self.deck_b_playing:
-                    self.toggle_play_deck('B')
+            if deck.playing:
+                self.toggle_play_deck(deck)
             
-            print(f"Loading song into Deck {deck}...")
-            song_name = engine.load_song_stems(file_path)
+            print(f"Loading song into Deck {deck.letter}...")
+            song_name = deck.engine.load_song_stems(file_path)
             
             if song_name:
                 # Load metadata
                 metadata = self.load_song_metadata(song_name)
                 
                 # Apply initial effects
-                if deck == 'A':
-                    engine.apply_effects_to_stems(self.deck_a_speed, self.deck_a_pitch)
-                    self.deck_a_song = song_name
-                    self.deck_a_metadata = metadata
-                else:
-                    engine.apply_effects_to_stems(self.deck_b_speed, self.deck_b_pitch)
-                    self.deck_b_song = song_name
-                    self.deck_b_metadata = metadata
+                deck.engine.apply_effects_to_stems(deck.speed, deck.pitch)
+                deck.song = song_name
+                deck.metadata = metadata
                 
                 # Update GUI
                 self.update_deck_title(deck)
                 self.update_deck_sections(deck)
                 self.update_deck_position_slider(deck)
+                self.build_stem_controls(deck)
                 
-                print(f"Successfully loaded {song_name} into Deck {deck}")
+                print(f"Successfully loaded {song_name} into Deck {deck.letter}")
             
         except Exception as e:
-            print(f"Error loading song into Deck {deck}: {e}")
+            print(f"Error loading song into Deck {deck.letter}: {e}")
     
     def select_file_for_deck(self, deck):
         """File selection dialog for specific deck"""
         file_path = filedialog.askopenfilename(
-            title=f"Select song for Deck {deck}",
+            title=f"Select song for Deck {deck.letter}",
             filetypes=[("Audio Files", "*.mp3 *.wav")],
             initialdir="data/mp3s"
         )
@@ -164,27 +172,17 @@ class DualDJPlayer:
     
     def toggle_play_deck(self, deck):
         """Toggle play/pause for specific deck"""
-        if deck == 'A':
-            if self.deck_a_playing:
-                self.deck_a.stop_playback()
-                self.deck_a_playing = False
-                self.deck_a_play_btn.config(text="▶ Play", bg="#4CAF50")
-            else:
-                self.deck_a.start_playback()
-                self.deck_a_playing = True
-                self.deck_a_play_btn.config(text="⏸ Pause", bg="#FF5722")
+        if deck.playing:
+            deck.engine.stop_playback()
+            deck.playing = False
+            deck.play_btn.config(text="▶ Play", bg="#4CAF50")
         else:
-            if self.deck_b_playing:
-                self.deck_b.stop_playback()
-                self.deck_b_playing = False
-                self.deck_b_play_btn.config(text="▶ Play", bg="#4CAF50")
-            else:
-                self.deck_b.start_playback()
-                self.deck_b_playing = True
-                self.deck_b_play_btn.config(text="⏸ Pause", bg="#FF5722")
+            deck.engine.start_playback()
+            deck.playing = True
+            deck.play_btn.config(text="⏸ Pause", bg="#FF5722")
         
         # Start/stop position updates
-        if self.deck_a_playing or self.deck_b_playing:
+        if any(d.playing for d in self.decks):
             if not self.should_update_positions:
                 self.start_position_updates()
         else:
@@ -194,97 +192,51 @@ class DualDJPlayer:
         """Handle crossfader movement"""
         self.crossfader = float(value) / 100.0
         
-        # Apply crossfader to master volumes
-        deck_a_master = (1.0 - self.crossfader) * 2.0  # Boost when fully on this side
-        deck_b_master = self.crossfader * 2.0
-        
-        # Cap at 1.0 to avoid distortion
-        deck_a_master = min(deck_a_master, 1.0)
-        deck_b_master = min(deck_b_master, 1.0)
-        
-        self.deck_a.set_master_volume(deck_a_master)
-        self.deck_b.set_master_volume(deck_b_master)
+        # Crossfader gains are applied by the master mixer
+        self.mixer.set_crossfader(self.crossfader)
         
         # Update crossfader label
         if self.crossfader < 0.1:
-            self.crossfader_label.config(text="Deck A")
+            self.crossfader_label.config(text="Side A")
         elif self.crossfader > 0.9:
-            self.crossfader_label.config(text="Deck B")
+            self.crossfader_label.config(text="Side B")
         else:
             self.crossfader_label.config(text="Mix")
     
     def on_volume_change(self, deck, stem_name, value):
         """Handle volume changes for specific deck/stem"""
         volume = float(value) / 100.0
-        
-        if deck == 'A':
-            self.deck_a_volumes[stem_name] = volume
-            self.deck_a.set_volume(stem_name, volume)
-        else:
-            self.deck_b_volumes[stem_name] = volume
-            self.deck_b.set_volume(stem_name, volume)
+        deck.volumes[stem_name] = volume
+        deck.engine.set_volume(stem_name, volume)
     
     def toggle_mute(self, deck, stem_name):
-        """Toggle mute for specific deck/stem"""
-        if deck == 'A':
-            muted = self.deck_a_muted[stem_name]
-            if muted:
-                # Unmute
-                self.deck_a.set_volume(stem_name, self.deck_a_volumes[stem_name])
-                self.deck_a_muted[stem_name] = False
-                self.deck_a_mute_btns[stem_name].config(text="🔊", bg="#4CAF50")
-            else:
-                # Mute
-                self.deck_a.set_volume(stem_name, 0.0)
-                self.deck_a_muted[stem_name] = True
-                self.deck_a_mute_btns[stem_name].config(text="🔇", bg="#F44336")
+        """Toggle mute for specific deck/stem; the volume setting is kept"""
+        muted = not deck.muted.get(stem_name, False)
+        deck.muted[stem_name] = muted
+        deck.engine.set_mute(stem_name, muted)
+        if muted:
+            deck.mute_btns[stem_name].config(text="🔇", bg="#F44336")
         else:
-            muted = self.deck_b_muted[stem_name]
-            if muted:
-                # Unmute
-                self.deck_b.set_volume(stem_name, self.deck_b_volumes[stem_name])
-                self.deck_b_muted[stem_name] = False
-                self.deck_b_mute_btns[stem_name].config(text="🔊", bg="#4CAF50")
-            else:
-                # Mute
-                self.deck_b.set_volume(stem_name, 0.0)
-                self.deck_b_muted[stem_name] = True
-                self.deck_b_mute_btns[stem_name].config(text="🔇", bg="#F44336")
+            deck.mute_btns[stem_name].config(text="🔊", bg="#4CAF50")
     
     def jump_to_section(self, deck, start_time):
         """Jump to specific section in deck"""
-        if deck == 'A':
-            self.deck_a.set_position_seconds(start_time)
-        else:
-            self.deck_b.set_position_seconds(start_time)
+        deck.engine.set_position_seconds(start_time)
     
     def update_deck_title(self, deck):
         """Update deck title with song info"""
-        if deck == 'A':
-            if self.deck_a_song and self.deck_a_metadata:
-                bpm = self.deck_a_metadata.get('bpm', 'Unknown')
-                key = self.deck_a_metadata.get('key', 'Unknown')
-                text = f"🎵 {self.deck_a_song} | {bpm} BPM | {key}"
-            else:
-                text = self.deck_a_song if self.deck_a_song else "No song loaded"
-            self.deck_a_title.config(text=text)
+        if deck.song and deck.metadata:
+            bpm = deck.metadata.get('bpm', 'Unknown')
+            key = deck.metadata.get('key', 'Unknown')
+            text = f"🎵 {deck.song} | {bpm} BPM | {key}"
         else:
-            if self.deck_b_song and self.deck_b_metadata:
-                bpm = self.deck_b_metadata.get('bpm', 'Unknown')
-                key = self.deck_b_metadata.get('key', 'Unknown')
-                text = f"🎵 {self.deck_b_song} | {bpm} BPM | {key}"
-            else:
-                text = self.deck_b_song if self.deck_b_song else "No song loaded"
-            self.deck_b_title.config(text=text)
+            text = deck.song if deck.song else "No song loaded"
+        deck.title.config(text=text)
     
     def update_deck_sections(self, deck):
         """Update section visualization for deck"""
-        if deck == 'A':
-            canvas = self.deck_a_canvas
-            metadata = self.deck_a_metadata
-        else:
-            canvas = self.deck_b_canvas
-            metadata = self.deck_b_metadata
+        canvas = deck.canvas
+        metadata = deck.metadata
         
         # Clear canvas
         canvas.delete("all")
@@ -337,14 +289,9 @@ class DualDJPlayer:
     
     def update_deck_position_slider(self, deck):
         """Update position slider range for deck"""
-        if deck == 'A':
-            duration = self.deck_a.get_duration_seconds()
-            self.deck_a_position_slider.config(to=int(duration))
-            self.deck_a_position_slider.set(0)
-        else:
-            duration = self.deck_b.get_duration_seconds()
-            self.deck_b_position_slider.config(to=int(duration))
-            self.deck_b_position_slider.set(0)
+        duration = deck.engine.get_duration_seconds()
+        deck.position_slider.config(to=int(duration))
+        deck.position_slider.set(0)
     
     def start_position_updates(self):
         """Start position update thread"""
@@ -361,13 +308,10 @@ class DualDJPlayer:
         """Update position sliders in background"""
         while self.should_update_positions:
             try:
-                if self.deck_a_playing:
-                    pos_a = self.deck_a.get_position_seconds()
-                    self.root.after(0, self.update_deck_position_gui, 'A', pos_a)
-                
-                if self.deck_b_playing:
-                    pos_b = self.deck_b.get_position_seconds()
-                    self.root.after(0, self.update_deck_position_gui, 'B', pos_b)
+                for deck in self.decks:
+                    if deck.playing:
+                        position = deck.engine.get_position_seconds()
+                        self.root.after(0, self.update_deck_position_gui, deck, position)
                 
                 time.sleep(0.1)
             except Exception as e:
@@ -376,24 +320,21 @@ class DualDJPlayer:
     
     def update_deck_position_gui(self, deck, position):
         """Update position GUI for specific deck"""
-        if deck == 'A':
-            self.deck_a_position_slider.set(int(position))
-            self.deck_a_position_label.config(text=f"{int(position//60)}:{int(position%60):02d}")
-        else:
-            self.deck_b_position_slider.set(int(position))
-            self.deck_b_position_label.config(text=f"{int(position//60)}:{int(position%60):02d}")
+        deck.position_slider.set(int(position))
+        deck.position_label.config(text=f"{int(position//60)}:{int(position%60):02d}")
     
     def setup_gui(self):
-        """Setup the dual DJ GUI"""
+        """Setup the multi-deck DJ GUI"""
         self.root = Tk()
-        self.root.title("🎛️ Dual DJ Stem Player")
+        self.root.title(f"🎛️ DJ Stem Player ({len(self.decks)} decks)")
         
-        # Window setup
-        window_width = 1200
+        # Window setup: two decks fit 1200 px, each further deck adds a column
+        window_width = 1200 + 350 * max(0, len(self.decks) - 2)
         window_height = 800
         
         screen_width = self.root.winfo_screenwidth()
         screen_height = self.root.winfo_screenheight()
+        window_width = min(window_width, screen_width)
         
         x = (screen_width // 2) - (window_width // 2)
         y = (screen_height // 2) - (window_height // 2) - 50
@@ -405,23 +346,23 @@ class DualDJPlayer:
         main_frame = Frame(self.root)
         main_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
         
-        # Deck A (Left side)
-        deck_a_frame = Frame(main_frame, relief="ridge", bd=2)
-        deck_a_frame.pack(side=LEFT, fill=BOTH, expand=True, padx=(0, 5))
-        
-        # Deck B (Right side)
-        deck_b_frame = Frame(main_frame, relief="ridge", bd=2)
-        deck_b_frame.pack(side=RIGHT, fill=BOTH, expand=True, padx=(5, 0))
+        # Side A decks left of the crossfader, side B decks right of it
+        left = [deck for deck in self.decks if deck.side == 'A']
+        right = [deck for deck in self.decks if deck.side == 'B']
+        for deck in left:
+            deck_frame = Frame(main_frame, relief="ridge", bd=2)
+            deck_frame.pack(side=LEFT, fill=BOTH, expand=True, padx=5)
+            self.setup_deck_gui(deck_frame, deck)
+        for deck in reversed(right):
+            deck_frame = Frame(main_frame, relief="ridge", bd=2)
+            deck_frame.pack(side=RIGHT, fill=BOTH, expand=True, padx=5)
+            self.setup_deck_gui(deck_frame, deck)
         
         # Center controls (Crossfader)
         center_frame = Frame(main_frame, width=200)
         center_frame.pack(side=LEFT, fill=Y, padx=10)
         center_frame.pack_propagate(False)
         
-        # Setup individual decks
-        self.setup_deck_gui(deck_a_frame, 'A')
-        self.setup_deck_gui(deck_b_frame, 'B')
-        
         # Setup center controls
         self.setup_center_controls(center_frame)
         
@@ -431,7 +372,7 @@ class DualDJPlayer:
     def setup_deck_gui(self, parent, deck):
         """Setup GUI for individual deck"""
         # Deck header
-        Label(parent, text=f"DECK {deck}", font=("Arial", 16, "bold")).pack(pady=5)
+        Label(parent, text=f"DECK {deck.letter}", font=("Arial", 16, "bold")).pack(pady=5)
         
         # Load button
         Button(parent, text=f"📁 Load Song", 
@@ -439,86 +380,70 @@ class DualDJPlayer:
                font=("Arial", 10)).pack(pady=5)
         
         # Song title
-        if deck == 'A':
-            self.deck_a_title = Label(parent, text="No song loaded", font=("Arial", 10))
-            self.deck_a_title.pack(pady=5)
-        else:
-            self.deck_b_title = Label(parent, text="No song loaded", font=("Arial", 10))
-            self.deck_b_title.pack(pady=5)
+        deck.title = Label(parent, text="No song loaded", font=("Arial", 10))
+        deck.title.pack(pady=5)
         
         # Play button
-        if deck == 'A':
-            self.deck_a_play_btn = Button(parent, text="▶ Play", 
-                                         command=lambda: self.toggle_play_deck('A'),
-                                         font=("Arial", 12), bg="#4CAF50", fg="white")
-            self.deck_a_play_btn.pack(pady=5)
-        else:
-            self.deck_b_play_btn = Button(parent, text="▶ Play", 
-                                         command=lambda: self.toggle_play_deck('B'),
-                                         font=("Arial", 12), bg="#4CAF50", fg="white")
-            self.deck_b_play_btn.pack(pady=5)
+        deck.play_btn = Button(parent, text="▶ Play", 
+                               command=lambda: self.toggle_play_deck(deck),
+                               font=("Arial", 12), bg="#4CAF50", fg="white")
+        deck.play_btn.pack(pady=5)
         
         # Sections
         sections_frame = Frame(parent)
         sections_frame.pack(fill=X, pady=5, padx=5)
         Label(sections_frame, text="Sections:", font=("Arial", 9)).pack(anchor='w')
         
-        if deck == 'A':
-            self.deck_a_canvas = Canvas(sections_frame, height=30, bg='white')
-            self.deck_a_canvas.pack(fill=X)
-        else:
-            self.deck_b_canvas = Canvas(sections_frame, height=30, bg='white')
-            self.deck_b_canvas.pack(fill=X)
+        deck.canvas = Canvas(sections_frame, height=30, bg='white')
+        deck.canvas.pack(fill=X)
         
         # Position control
         pos_frame = Frame(parent)
         pos_frame.pack(fill=X, pady=5, padx=5)
         
-        if deck == 'A':
-            self.deck_a_position_slider = Scale(pos_frame, from_=0, to=300, orient=HORIZONTAL)
-            self.deck_a_position_slider.pack(fill=X)
-            self.deck_a_position_label = Label(pos_frame, text="0:00")
-            self.deck_a_position_label.pack()
-        else:
-            self.deck_b_position_slider = Scale(pos_frame, from_=0, to=300, orient=HORIZONTAL)
-            self.deck_b_position_slider.pack(fill=X)
-            self.deck_b_position_label = Label(pos_frame, text="0:00")
-            self.deck_b_position_label.pack()
+        deck.position_slider = Scale(pos_frame, from_=0, to=300, orient=HORIZONTAL)
+        deck.position_slider.pack(fill=X)
+        deck.position_label = Label(pos_frame, text="0:00")
+        deck.position_label.pack()
         
-        # Volume controls
+        # Volume controls, one row per stem of the loaded song
         vol_frame = Frame(parent)
         vol_frame.pack(fill=BOTH, expand=True, pady=5, padx=5)
         Label(vol_frame, text="VOLUME CONTROLS", font=("Arial", 10, "bold")).pack()
         
-        stem_names = ["vocals", "drums", "bass", "other"]
-        colors = ["#FF6B6B", "#4ECDC4", "#45B7D1", "#96CEB4"]
-        
-        if deck == 'A':
-            self.deck_a_mute_btns = {}
-        else:
-            self.deck_b_mute_btns = {}
-        
-        for i, stem_name in enumerate(stem_names):
-            stem_frame = Frame(vol_frame)
+        deck.stem_frame = Frame(vol_frame)
+        deck.stem_frame.pack(fill=BOTH, expand=True)
+        Label(deck.stem_frame, text="Load a song for stem controls", fg="gray").pack()
+    
+    def build_stem_controls(self, deck):
+        """(Re)build the volume/mute rows for the stems of the deck's song"""
+        for widget in deck.stem_frame.winfo_children():
+            widget.destroy()
+        deck.mute_btns = {}
+        
+        for i, stem_name in enumerate(deck.engine.stem_names):
+            deck.volumes.setdefault(stem_name, 1.0)
+            deck.muted.setdefault(stem_name, False)
+            color = stem_color(stem_name, i)
+            
+            stem_frame = Frame(deck.stem_frame)
             stem_frame.pack(fill=X, pady=2)
             
-            Label(stem_frame, text=f"{stem_name.title()}:", width=8, anchor='w').pack(side=LEFT)
+            label = stem_name.replace("_", " ").title()
+            Label(stem_frame, text=f"{label}:", width=9, anchor='w').pack(side=LEFT)
             
             slider = Scale(stem_frame, from_=0, to=150, orient=HORIZONTAL,
                           command=lambda val, d=deck, s=stem_name: self.on_volume_change(d, s, val),
-                          bg=colors[i])
-            slider.set(100)
+                          bg=color)
+            slider.set(int(deck.volumes[stem_name] * 100))
             slider.pack(side=LEFT, fill=X, expand=True, padx=5)
             
-            mute_btn = Button(stem_frame, text="🔊", width=3,
+            muted = deck.muted[stem_name]
+            mute_btn = Button(stem_frame, text="🔇" if muted else "🔊", width=3,
                              command=lambda d=deck, s=stem_name: self.toggle_mute(d, s),
-                             bg="#4CAF50", fg="white")
+                             bg="#F44336" if muted else "#4CAF50", fg="white")
             mute_btn.pack(side=RIGHT)
-            
-            if deck == 'A':
-                self.deck_a_mute_btns[stem_name] = mute_btn
-            else:
-                self.deck_b_mute_btns[stem_name] = mute_btn
+            deck.mute_btns[stem_name] = mute_btn
     
     def setup_center_controls(self, parent):
         """Setup center crossfader controls"""
@@ -547,6 +472,10 @@ class DualDJPlayer:
         
         Button(parent, text="AUTO MIX", font=("Arial", 10),
                command=self.auto_mix).pack(pady=2)
+        
+        self.record_btn = Button(parent, text="⏺ REC", font=("Arial", 10),
+                                 command=self.toggle_recording, bg="#9E9E9E", fg="white")
+        self.record_btn.pack(pady=2)
     
     def sync_bpm(self):
         """Sync BPM between decks"""
@@ -556,11 +485,21 @@ class DualDJPlayer:
         """Auto crossfade between decks"""
         print("Auto mix not implemented yet")
     
+    def toggle_recording(self):
+        """Start or stop recording the master output to data/recordings/"""
+        if not self.recording:
+            self.mixer.start_recording()
+            self.recording = True
+            self.record_btn.config(text="⏹ STOP REC", bg="#F44336")
+        else:
+            self.mixer.stop_recording()
+            self.recording = False
+            self.record_btn.config(text="⏺ REC", bg="#9E9E9E")
+    
     def on_closing(self):
         """Cleanup on exit"""
         self.stop_position_updates()
-        self.deck_a.cleanup()
-        self.deck_b.cleanup()
+        self.mixer.cleanup()
         self.root.destroy()
     
     def run(self):
@@ -568,5 +507,6 @@ class DualDJPlayer:
         self.root.mainloop()
 
 if __name__ == "__main__":
-    app = DualDJPlayer()
-    app.run()
\ No newline at end of file
+    n_decks = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    app = DualDJPlayer(max(1, min(len(DECK_LETTERS), n_decks)))
+    app.run()
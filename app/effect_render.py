@@ -0,0 +1,112 @@
+import multiprocessing
+import numpy as np
+import librosa
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+# Worker pool is kept alive between renders - spawning workers (and importing
+# librosa in each) costs more than a short render
+_pool = None
+_pool_workers = 0
+
+def render_stem(audio, sample_rate, speed, pitch_shift):
+    """Render speed and pitch over one (n_samples, 2) stem, returns (n_samples', 2)"""
+    # Convert to (channels, samples) for librosa
+    audio = audio.T
+
+    # Apply pitch shift
+    if pitch_shift != 0:
+        audio = librosa.effects.pitch_shift(audio, sr=sample_rate, n_steps=pitch_shift)
+
+    # Apply time stretch
+    if speed != 1.0:
+        audio = librosa.effects.time_stretch(audio, rate=speed)
+
+    # Convert back to (samples, channels)
+    return audio.T.astype(np.float32)
+
+def rendered_length(n_samples, speed):
+    """Length librosa's time_stretch produces for a stem of n_samples"""
+    return n_samples if speed == 1.0 else int(round(n_samples / speed))
+
+def render_matrix(source, sample_rate, speed, pitch_shift):
+    """Render every stem of a (n_stems, n_samples, 2) matrix one after another"""
+    length = rendered_length(source.shape[1], speed)
+    matrix = np.zeros((source.shape[0], length, 2), dtype=np.float32)
+    for i, audio in enumerate(source):
+        rendered = render_stem(audio, sample_rate, speed, pitch_shift)[:length]
+        matrix[i, :len(rendered)] = rendered
+    return matrix
+
+def _render_shared_stem(source_name, source_shape, output_name, output_shape,
+                        index, sample_rate, speed, pitch_shift):
+    """Pool task: render one stem from shared memory into shared memory"""
+    source_shm = shared_memory.SharedMemory(name=source_name)
+    output_shm = shared_memory.SharedMemory(name=output_name)
+    try:
+        source = np.ndarray(source_shape, dtype=np.float32, buffer=source_shm.buf)
+        output = np.ndarray(output_shape, dtype=np.float32, buffer=output_shm.buf)
+
+        rendered = render_stem(source[index], sample_rate, speed, pitch_shift)[:output_shape[1]]
+        output[index, :len(rendered)] = rendered
+        output[index, len(rendered):] = 0
+
+        # Drop views before closing so the buffers can be released
+        del source, output
+    finally:
+        source_shm.close()
+        output_shm.close()
+
+def get_pool(workers):
+    """Shared process pool, recreated if the worker count changes"""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        # Spawned, not forked: the parent runs Tk and PortAudio threads, and a
+        # forked child can inherit one of their locks held and deadlock
+        _pool = ProcessPoolExecutor(max_workers=workers,
+                                    mp_context=multiprocessing.get_context("spawn"))
+        _pool_workers = workers
+    return _pool
+
+def shutdown_pool():
+    """Stop the render workers"""
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+        _pool_workers = 0
+
+def render_matrix_parallel(source, sample_rate, speed, pitch_shift, workers=4):
+    """Render all stems concurrently in a process pool
+
+    Stems are passed through shared memory rather than pickled: each worker
+    attaches to the source block, renders its stem and writes the result
+    straight into the shared output block.
+    """
+    n_stems, n_samples = source.shape[:2]
+    output_shape = (n_stems, rendered_length(n_samples, speed), 2)
+
+    source_shm = shared_memory.SharedMemory(create=True, size=source.nbytes)
+    output_shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(output_shape)) * 4))
+    try:
+        shared_source = np.ndarray(source.shape, dtype=np.float32, buffer=source_shm.buf)
+        shared_source[:] = source
+
+        pool = get_pool(workers)
+        futures = [pool.submit(_render_shared_stem, source_shm.name, source.shape,
+                               output_shm.name, output_shape, i, sample_rate, speed, pitch_shift)
+                   for i in range(n_stems)]
+        for future in futures:
+            future.result()
+
+        shared_output = np.ndarray(output_shape, dtype=np.float32, buffer=output_shm.buf)
+        matrix = shared_output.copy()
+        del shared_source, shared_output
+        return matrix
+    finally:
+        source_shm.close()
+        source_shm.unlink()
+        output_shm.close()
+        output_shm.unlink()
@@ -0,0 +1,117 @@
+import itertools
+import time
+from collections import deque
+from heapq import heappush, heappop
+
+class EngineClock:
+    """Sample-accurate clock for one output stream
+
+    `sample_time` counts every frame the stream has rendered and is only
+    advanced by the callback. When the backend passes PortAudio time info,
+    the DAC time of the block being rendered is kept too, so sample times
+    and stream times convert both ways.
+    """
+    def __init__(self, sample_rate=44100):
+        self.sample_rate = sample_rate
+        self.sample_time = 0      # First sample of the block being rendered
+        self.block_frames = 0
+        self.dac_time = None      # Stream time at which sample_time is heard
+        self.updated_at = time.perf_counter()
+
+    def begin_block(self, frames, time_info):
+        """Called by the callback before rendering `frames` samples"""
+        self.block_frames = frames
+        if time_info is not None:
+            self.dac_time = time_info.outputBufferDacTime
+        self.updated_at = time.perf_counter()
+
+    def end_block(self):
+        self.sample_time += self.block_frames
+        self.block_frames = 0
+
+    def sample_for_time(self, stream_time):
+        """Sample that will be heard at a stream time, or None without time info"""
+        if self.dac_time is None:
+            return None
+        return self.sample_time + int(round((stream_time - self.dac_time) * self.sample_rate))
+
+    def time_for_sample(self, sample_time):
+        """Stream time at which a sample will be heard, or None without time info"""
+        if self.dac_time is None:
+            return None
+        return self.dac_time + (sample_time - self.sample_time) / self.sample_rate
+
+    def estimate_sample(self):
+        """Sample being rendered right now, extrapolated from the last callback"""
+        elapsed = time.perf_counter() - self.updated_at
+        return self.sample_time + int(elapsed * self.sample_rate)
+
+    def samples_after(self, seconds):
+        """Sample time `seconds` from now, for scheduling relative events"""
+        return self.estimate_sample() + int(seconds * self.sample_rate)
+
+class EventScheduler:
+    """Runs actions inside the audio callback on an exact sample
+
+    Any thread may schedule; only the callback pops. New events go through
+    a deque (append/popleft are atomic) and are moved into a heap owned by
+    the callback, so neither side takes a lock. Events whose time has
+    already passed run at the start of the next block.
+    """
+    def __init__(self):
+        self.incoming = deque()
+        self.pending = []
+        self.cancelled = set()
+        self.ids = itertools.count(1)
+        self.executed = 0
+        self.late = 0
+
+    def schedule(self, sample_time, action, *args):
+        """Run action(*args) when the stream reaches sample_time; returns an event id"""
+        event_id = next(self.ids)
+        self.incoming.append((int(sample_time), event_id, action, args))
+        return event_id
+
+    def cancel(self, event_id):
+        self.cancelled.add(event_id)
+
+    def clear(self):
+        """Cancel everything not yet executed"""
+        for event in list(self.incoming) + list(self.pending):
+            self.cancelled.add(event[1])
+
+    def has_events(self):
+        return bool(self.incoming) or bool(self.pending)
+
+    def process(self, block_start, frames, render, target):
+        """Render one block in segments split at each due event
+
+        `render(target, offset, count)` renders `count` samples starting
+        `offset` samples into the block; events due inside the block run
+        between segments, on their exact sample.
+        """
+        incoming = self.incoming
+        pending = self.pending
+        while incoming:
+            heappush(pending, incoming.popleft())
+
+        offset = 0
+        block_end = block_start + frames
+        while pending and pending[0][0] < block_end:
+            sample_time, event_id, action, args = heappop(pending)
+            if event_id in self.cancelled:
+                self.cancelled.discard(event_id)
+                continue
+
+            at = sample_time - block_start
+            if at < 0:
+                at = 0
+                self.late += 1
+            if at > offset:
+                render(target, offset, at - offset)
+                offset = at
+            action(*args)
+            self.executed += 1
+
+        if offset < frames:
+            render(target, offset, frames - offset)
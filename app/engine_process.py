@@ -0,0 +1,497 @@
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import numpy as np
+from collections import namedtuple
+from multiprocessing import shared_memory
+from app.sounddevice_audio_engine import (RealTimeStemAudioEngine, load_song_matrix,
+                                          compact_matrix, stack_stems, find_song_stems,
+                                          load_stem_folder, stem_key)
+from app.mixer_engine import MasterMixerEngine
+from app.audio_backend import get_backend
+from app.stem_registry import StemRegistry
+from app.stem_store import DEFAULT_RESAMPLER
+
+# Set to 1 to have the GUIs run their audio engine in a separate process
+ENGINE_PROCESS_ENV = "DROPBOT_ENGINE_PROCESS"
+
+TELEMETRY_INTERVAL = 0.02   # Seconds between position updates from the engine
+STATS_EVERY = 25            # Telemetry messages between callback stats snapshots
+REPLY_TIMEOUT = 120.0
+
+# A stem matrix copied into shared memory, with the GUI side's view of it
+SharedBlock = namedtuple("SharedBlock", ["shm", "stem_names", "matrix"])
+
+def run_engine_process(conn, kind, options):
+    """Child process: own the engine and serve commands from the GUI process
+
+    Messages in are (request_id, deck, method, args, kwargs); request_id is
+    None for fire-and-forget commands such as slider moves. Messages out are
+    ("ready", sample_rate) once the engine exists, then ("reply", request_id,
+    ok, result) and periodic ("telemetry", snapshot).
+    """
+    try:
+        backend = get_backend(options.pop("backend", None))
+        if kind == "mixer":
+            target = MasterMixerEngine(backend=backend, **options)
+            decks = target.decks
+        else:
+            target = RealTimeStemAudioEngine(backend=backend, **options)
+            decks = [target]
+    except Exception as e:
+        conn.send(("failed", RuntimeError(f"Engine process could not start: {e!r}")))
+        return
+    # The GUI side loads stems at whatever rate the device negotiated
+    conn.send(("ready", target.sample_rate))
+
+    # Stem blocks the GUI process created; each deck keeps its current one attached
+    attached = [None] * len(decks)
+    released = []
+
+    def attach_stems(deck, name, shape, dtype, stem_names, song_name, stem_folder=None):
+        shm = shared_memory.SharedMemory(name=name)
+        matrix = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        decks[deck].set_stem_matrix(stem_names, matrix, song_name, stem_folder)
+        if attached[deck] is not None:
+            released.append(attached[deck])
+        attached[deck] = shm
+        return True
+
+    def close_released():
+        # A block can only close once no engine array still views it
+        for shm in list(released):
+            try:
+                shm.close()
+                released.remove(shm)
+            except BufferError:
+                pass
+
+    sent = 0
+    last_telemetry = 0.0
+    while True:
+        if conn.poll(TELEMETRY_INTERVAL):
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            if message is None:
+                break
+
+            request_id, deck, method, args, kwargs = message
+            try:
+                if method == "attach_stems":
+                    result = attach_stems(deck, *args)
+                else:
+                    obj = target if deck is None else decks[deck]
+                    result = getattr(obj, method)(*args, **kwargs)
+                ok = True
+            except Exception as e:
+                result, ok = e, False
+            if request_id is not None:
+                try:
+                    conn.send(("reply", request_id, ok, result))
+                except Exception as e:
+                    conn.send(("reply", request_id, False, RuntimeError(repr(e))))
+            close_released()
+
+        now = time.time()
+        if now - last_telemetry >= TELEMETRY_INTERVAL:
+            snapshot = {"time": now, "decks": [{
+                "position": deck.get_position_seconds(),
+                "duration": deck.get_duration_seconds(),
+                "is_playing": deck.is_playing,
+                "speed": deck.speed,
+                "pitch_shift": deck.pitch_shift,
+                "varispeed": deck.varispeed_rate(),
+                "loop": deck.loop,
+            } for deck in decks]}
+            if sent % STATS_EVERY == 0:
+                snapshot["stats"] = target.get_stats()
+            try:
+                conn.send(("telemetry", snapshot))
+            except (EOFError, OSError):
+                break
+            sent += 1
+            last_telemetry = now
+
+    target.cleanup()
+    for shm in attached + released:
+        if shm is not None:
+            try:
+                shm.close()
+            except BufferError:
+                pass
+
+class EngineProcess:
+    """Parent side of an engine running in its own process
+
+    The audio callback then has a GIL of its own, so Tk and matplotlib work
+    in the GUI process cannot delay it. Commands go over a pipe; positions
+    and callback stats come back as telemetry about 50 times a second.
+    """
+    def __init__(self, kind="engine", n_decks=1, options=None):
+        options = dict(options or {})
+        # A mixer's decks take their engine options from deck_options
+        deck_options = options.get("deck_options") or options
+        self.storage_dtype = deck_options.get("storage_dtype", "float32")
+
+        # Spawn gives the engine a clean interpreter without the GUI's Tk state
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=run_engine_process,
+                                       args=(child_conn, kind, options), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+        try:
+            status, value = self.conn.recv()
+        except (EOFError, OSError):
+            raise RuntimeError("Engine process exited during startup")
+        if status != "ready":
+            self.process.join(timeout=5.0)
+            raise value
+        self.sample_rate = value
+
+        self.send_lock = threading.Lock()
+        self.request_ids = itertools.count(1)
+        self.replies = {}
+        self.reply_ready = threading.Condition()
+        self.telemetry = {"time": 0.0, "decks": [{
+            "position": 0.0, "duration": 0.0, "is_playing": False,
+            "speed": 1.0, "pitch_shift": 0, "varispeed": 1.0, "loop": None}
+            for _ in range(n_decks)]}
+        self.stats = {}
+        self.received_at = time.time()
+
+        # Shared stem blocks by stem folder, so decks loading the same song
+        # attach one block; shared[deck] is the key each deck holds
+        self.stem_registry = StemRegistry()
+        self.shared = [None] * n_decks
+        self.array_ids = itertools.count(1)
+
+        self.listener = threading.Thread(target=self.listen, daemon=True)
+        self.listener.start()
+
+    def listen(self):
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            if message[0] == "telemetry":
+                snapshot = message[1]
+                if "stats" in snapshot:
+                    self.stats = snapshot.pop("stats")
+                self.telemetry = snapshot
+                self.received_at = time.time()
+            else:
+                _, request_id, ok, result = message
+                with self.reply_ready:
+                    self.replies[request_id] = (ok, result)
+                    self.reply_ready.notify_all()
+
+        # Wake anyone still waiting for a reply
+        with self.reply_ready:
+            self.reply_ready.notify_all()
+
+    def call(self, deck, method, *args, wait=False, **kwargs):
+        """Run a method on the remote engine (deck=None) or one of its decks"""
+        request_id = next(self.request_ids) if wait else None
+        with self.send_lock:
+            self.conn.send((request_id, deck, method, args, kwargs))
+        if not wait:
+            return None
+
+        deadline = time.time() + REPLY_TIMEOUT
+        with self.reply_ready:
+            while request_id not in self.replies:
+                if not self.process.is_alive() or time.time() > deadline:
+                    raise RuntimeError(f"Engine process did not answer {method}")
+                self.reply_ready.wait(0.1)
+            ok, result = self.replies.pop(request_id)
+        if not ok:
+            raise result
+        return result
+
+    def share_matrix(self, deck, stem_names, matrix, song_name):
+        """Copy a stem matrix into shared memory and attach the deck to it
+
+        Returns a view of the shared block for the GUI side, so both
+        processes read the same pages.
+        """
+        key = ("arrays", next(self.array_ids))
+        return self.share_stems(deck, key, lambda: (stem_names, matrix), song_name).matrix
+
+    def share_stems(self, deck, key, load, song_name, stem_folder=None):
+        """Attach the deck to the shared block for key, creating it from load() if needed
+
+        load returns (stem_names, matrix) and only runs when no deck holds
+        the key yet. stem_folder is passed on so the engine keys its render
+        cache by the stems' separation. Returns the SharedBlock.
+        """
+        block = self.stem_registry.acquire(key, lambda: self.create_block(*load()),
+                                           on_release=lambda block: self.release(block.shm))
+        try:
+            self.call(deck, "attach_stems", block.shm.name, block.matrix.shape,
+                      block.matrix.dtype.str, list(block.stem_names), song_name, stem_folder,
+                      wait=True)
+        except Exception:
+            self.stem_registry.release(key)
+            raise
+
+        # The engine has moved to the new block; the old one goes with its last deck
+        previous = self.shared[deck]
+        self.shared[deck] = key
+        if previous is not None:
+            self.stem_registry.release(previous)
+        return block
+
+    def create_block(self, stem_names, matrix):
+        matrix = compact_matrix(np.asarray(matrix), self.storage_dtype)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, matrix.nbytes))
+        shared = np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=shm.buf)
+        shared[:] = matrix
+        shared.setflags(write=False)
+        return SharedBlock(shm, list(stem_names), shared)
+
+    def release(self, shm):
+        try:
+            shm.close()
+        except BufferError:
+            pass  # Still viewed by the GUI; freed with the process
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        """Stop the engine process and free shared stems"""
+        if self.process.is_alive():
+            try:
+                with self.send_lock:
+                    self.conn.send(None)
+            except (EOFError, OSError):
+                pass
+            self.process.join(timeout=5.0)
+            if self.process.is_alive():
+                self.process.terminate()
+        for i, key in enumerate(self.shared):
+            if key is not None:
+                self.stem_registry.release(key)
+                self.shared[i] = None
+
+class RemoteDeck:
+    """Stands in for RealTimeStemAudioEngine in the GUI process
+
+    Setters are sent without waiting; getters answer from the latest
+    telemetry, extrapolated while playing. original_stems are views of the
+    shared stem block, so waveforms can be drawn without another copy.
+    """
+    def __init__(self, host, index, deck=None, options=None):
+        options = options or {}
+        self.host = host
+        self.index = index
+        self.deck = deck  # None addresses the remote engine itself
+        self.sample_rate = host.sample_rate
+        self.effects_mode = options.get("effects_mode", "stream")
+        self.load_mode = options.get("load_mode", "memory")
+        self.resampler = options.get("resampler", DEFAULT_RESAMPLER)
+        self.song_name = None
+        self.stem_names = []
+        self.original_stems = {}
+        self.volumes = {}  # By stem name, for whatever stem set is loaded
+        self.master_volume = 1.0
+
+    @property
+    def state(self):
+        return self.host.telemetry["decks"][self.index]
+
+    @property
+    def is_playing(self):
+        return self.state["is_playing"]
+
+    @property
+    def speed(self):
+        return self.state["speed"]
+
+    @property
+    def pitch_shift(self):
+        return self.state["pitch_shift"]
+
+    @property
+    def loop(self):
+        return self.state["loop"]
+
+    def call(self, method, *args, **kwargs):
+        return self.host.call(self.deck, method, *args, **kwargs)
+
+    def load_song_stems(self, file_path, model=None):
+        """Load stems here, share them with the engine process"""
+        if self.load_mode == "stream":
+            # The engine streams from disk itself; the GUI maps the same store
+            song_name = self.call("load_song_stems", file_path, model, wait=True)
+            _, _, stem_names, matrix = load_song_matrix(file_path, self.sample_rate, model)
+            self.set_local_stems(stem_names, matrix, song_name)
+            return song_name
+
+        song_name, stem_folder = find_song_stems(file_path, model)
+        key = stem_key(stem_folder, self.sample_rate, self.host.storage_dtype)
+        block = self.host.share_stems(self.index, key,
+                                      lambda: load_stem_folder(stem_folder, self.sample_rate,
+                                                               self.resampler)[1:],
+                                      song_name, stem_folder)
+        self.set_local_stems(block.stem_names, block.matrix, song_name)
+        return song_name
+
+    def load_stem_arrays(self, stems, song_name=None):
+        stem_names, matrix = stack_stems(stems)
+        shared = self.host.share_matrix(self.index, stem_names, matrix, song_name)
+        self.set_local_stems(stem_names, shared, song_name)
+
+    def set_local_stems(self, stem_names, matrix, song_name):
+        self.song_name = song_name
+        self.stem_names = list(stem_names)
+        self.original_stems = {name: matrix[i] for i, name in enumerate(self.stem_names)}
+        for name in self.stem_names:
+            self.volumes.setdefault(name, 1.0)
+
+    def apply_effects_to_stems(self, speed=1.0, pitch_shift=0):
+        self.call("apply_effects_to_stems", speed, pitch_shift)
+        self.state["speed"], self.state["pitch_shift"] = speed, pitch_shift
+
+    def start_playback(self):
+        self.call("start_playback", wait=True)
+
+    def stop_playback(self):
+        self.call("stop_playback", wait=True)
+
+    def set_volume(self, stem_name, volume):
+        self.volumes[stem_name] = max(0.0, min(2.0, volume))
+        self.call("set_volume", stem_name, volume)
+
+    def set_mute(self, stem_name, muted=True):
+        self.call("set_mute", stem_name, muted)
+
+    def set_master_volume(self, volume):
+        self.master_volume = max(0.0, min(2.0, volume))
+        self.call("set_master_volume", volume)
+
+    def set_varispeed(self, rate):
+        self.call("set_varispeed", rate)
+
+    def set_pitch_bend(self, amount):
+        self.call("set_pitch_bend", amount)
+
+    def set_interpolation(self, interpolation):
+        self.call("set_interpolation", interpolation, wait=True)
+
+    def set_eq(self, stem_name, low=None, mid=None, high=None):
+        self.call("set_eq", stem_name, low, mid, high)
+
+    def set_filter(self, stem_name, position):
+        self.call("set_filter", stem_name, position)
+
+    def set_position_seconds(self, seconds):
+        self.call("set_position_seconds", seconds)
+        # Show the new position straight away rather than one telemetry later
+        self.state["position"] = seconds
+
+    def get_position_seconds(self):
+        state = self.state
+        position = state["position"]
+        if state["is_playing"] and state["loop"] is None:
+            rate = state["speed"] * state["varispeed"]
+            position += (time.time() - self.host.received_at) * rate
+        duration = state["duration"]
+        return min(position, duration) if duration else position
+
+    def get_duration_seconds(self):
+        return self.state["duration"]
+
+    def set_loop(self, beats):
+        return self.call("set_loop", beats, wait=True)
+
+    def exit_loop(self):
+        self.call("exit_loop")
+
+    def beat_jump(self, beats):
+        return self.call("beat_jump", beats, wait=True)
+
+    def get_stats(self):
+        return self.call("get_stats", wait=True)
+
+    def start_recording(self, path=None):
+        return self.call("start_recording", path, wait=True)
+
+    def stop_recording(self):
+        return self.call("stop_recording", wait=True)
+
+    def cleanup(self):
+        """Stop this deck; a standalone remote engine also shuts its process down"""
+        if self.deck is None:
+            self.host.close()
+        else:
+            self.call("cleanup", wait=True)
+
+class RemoteMixer:
+    """Stands in for MasterMixerEngine in the GUI process
+
+    options go to the remote MasterMixerEngine; deck_options to each of its
+    deck engines, and to the RemoteDecks standing in for them here.
+    """
+    def __init__(self, n_decks=2, deck_options=None, **options):
+        deck_options = dict(deck_options or {})
+        self.host = EngineProcess("mixer", n_decks,
+                                  dict(options, n_decks=n_decks, deck_options=deck_options))
+        self.decks = [RemoteDeck(self.host, i, i, deck_options) for i in range(n_decks)]
+        self.crossfader = 0.5
+        self.master_volume = 1.0
+
+    def set_crossfader(self, position):
+        self.crossfader = max(0.0, min(1.0, position))
+        self.host.call(None, "set_crossfader", position)
+
+    def set_deck_side(self, deck_index, side):
+        self.host.call(None, "set_deck_side", deck_index, side, wait=True)
+
+    def set_master_volume(self, volume):
+        self.master_volume = max(0.0, min(2.0, volume))
+        self.host.call(None, "set_master_volume", volume)
+
+    def start(self):
+        self.host.call(None, "start", wait=True)
+
+    def stop(self):
+        self.host.call(None, "stop", wait=True)
+
+    def start_recording(self, path=None):
+        return self.host.call(None, "start_recording", path, wait=True)
+
+    def stop_recording(self):
+        return self.host.call(None, "stop_recording", wait=True)
+
+    def get_stats(self):
+        """Latest callback stats from telemetry (no round trip)"""
+        return self.host.stats
+
+    def cleanup(self):
+        self.host.close()
+        print("🧹 Engine process stopped")
+
+def start_engine_process(**options):
+    """RealTimeStemAudioEngine in its own process, behind a RemoteDeck"""
+    return RemoteDeck(EngineProcess("engine", 1, options), 0, None, options)
+
+def create_engine(**options):
+    """Engine for the GUIs: in-process, or in a subprocess when $DROPBOT_ENGINE_PROCESS=1"""
+    if os.environ.get(ENGINE_PROCESS_ENV) == "1":
+        return start_engine_process(**options)
+    return RealTimeStemAudioEngine(**options)
+
+def create_mixer(n_decks=2, deck_options=None, **options):
+    """Master mixer for the GUIs, following $DROPBOT_ENGINE_PROCESS like create_engine"""
+    if os.environ.get(ENGINE_PROCESS_ENV) == "1":
+        return RemoteMixer(n_decks, deck_options=deck_options, **options)
+    return MasterMixerEngine(n_decks=n_decks, deck_options=deck_options, **options)
@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+
+# Upper edges of the callback-time histogram buckets in microseconds; the
+# last bucket collects everything slower than the final edge
+HISTOGRAM_EDGES_US = [50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000]
+
+# Kinds of event kept in the recent xrun ring
+XRUN_KINDS = ("deadline", "underflow", "overflow", "exception")
+
+class CallbackStats:
+    """Timing and xrun counters for one audio callback
+
+    Only the callback writes, and every update is a plain attribute or list
+    slot assignment, so no lock is needed: readers on other threads may see
+    a snapshot that is one callback stale, never a torn one. Nothing here
+    allocates beyond the float/int objects Python creates for any arithmetic.
+    """
+    def __init__(self, sample_rate=44100, recent_size=64):
+        self.sample_rate = sample_rate
+        self.histogram = [0] * (len(HISTOGRAM_EDGES_US) + 1)
+
+        # Wall-clock times of recent xruns so dropouts can be lined up with
+        # GUI redraws or effect renders in other logs
+        self.recent_times = [0.0] * recent_size
+        self.recent_kinds = [0] * recent_size
+        self.recent_index = 0
+        self.reset()
+
+    def reset(self):
+        """Zero every counter"""
+        for i in range(len(self.histogram)):
+            self.histogram[i] = 0
+        for i in range(len(self.recent_times)):
+            self.recent_times[i] = 0.0
+            self.recent_kinds[i] = 0
+        self.recent_index = 0
+
+        self.callbacks = 0
+        self.frames = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.min_headroom = None
+        self.deadline_misses = 0
+        self.output_underflows = 0
+        self.output_overflows = 0
+        self.priming_callbacks = 0
+        self.exceptions = 0
+        self.last_exception = None
+        self.started_at = time.time()
+
+    def begin(self):
+        """Timestamp taken at the top of the callback"""
+        return time.perf_counter()
+
+    def end(self, started, frames, status):
+        """Record one finished callback that started at `started`"""
+        elapsed = time.perf_counter() - started
+        deadline = frames / self.sample_rate
+        headroom = deadline - elapsed
+
+        self.callbacks += 1
+        self.frames += frames
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+        if self.min_headroom is None or headroom < self.min_headroom:
+            self.min_headroom = headroom
+        self.histogram[bisect_right(HISTOGRAM_EDGES_US, elapsed * 1e6)] += 1
+
+        if headroom < 0:
+            self.deadline_misses += 1
+            self.mark(0)
+
+        # sounddevice.CallbackFlags is falsy when no flag is set
+        if status:
+            if status.output_underflow:
+                self.output_underflows += 1
+                self.mark(1)
+            if status.output_overflow:
+                self.output_overflows += 1
+                self.mark(2)
+            if status.priming_output:
+                self.priming_callbacks += 1
+
+    def record_exception(self, error):
+        """Count an exception the callback swallowed to keep the stream alive"""
+        self.exceptions += 1
+        self.last_exception = error
+        self.mark(3)
+
+    def mark(self, kind):
+        index = self.recent_index
+        self.recent_times[index] = time.time()
+        self.recent_kinds[index] = kind
+        self.recent_index = (index + 1) % len(self.recent_times)
+
+    def get_stats(self):
+        """Plain dict snapshot, safe to call from any thread"""
+        callbacks = self.callbacks
+        size = len(self.recent_times)
+        recent = []
+        for i in range(size):
+            index = (self.recent_index + i) % size
+            if self.recent_times[index]:
+                recent.append({"time": self.recent_times[index],
+                               "kind": XRUN_KINDS[self.recent_kinds[index]]})
+
+        labels = [f"<{edge}us" for edge in HISTOGRAM_EDGES_US] + [f">={HISTOGRAM_EDGES_US[-1]}us"]
+        return {
+            "callbacks": callbacks,
+            "frames": self.frames,
+            "uptime_s": round(time.time() - self.started_at, 3),
+            "mean_us": round(self.total_time / callbacks * 1e6, 2) if callbacks else 0.0,
+            "max_us": round(self.max_time * 1e6, 2),
+            "min_headroom_us": round(self.min_headroom * 1e6, 2) if self.min_headroom is not None else None,
+            "deadline_misses": self.deadline_misses,
+            "output_underflows": self.output_underflows,
+            "output_overflows": self.output_overflows,
+            "priming_callbacks": self.priming_callbacks,
+            "exceptions": self.exceptions,
+            "last_exception": repr(self.last_exception) if self.last_exception is not None else None,
+            "histogram": dict(zip(labels, list(self.histogram))),
+            "recent_xruns": recent,
+        }
+
+class StatsDumper:
+    """Background thread writing a stats snapshot to a JSON file every `interval` seconds"""
+    def __init__(self, get_stats, path, interval=5.0):
+        self.get_stats = get_stats
+        self.path = path
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        """Stop the thread after writing one last snapshot"""
+        self.stop_event.set()
+        self.thread.join(timeout=self.interval + 1.0)
+
+    def run(self):
+        while True:
+            stopping = self.stop_event.wait(self.interval)
+            self.write()
+            if stopping:
+                return
+
+    def write(self):
+        try:
+            snapshot = self.get_stats()
+            snapshot["written_at"] = time.time()
+            # Write then rename so a reader never sees a half-written file
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(snapshot, f, indent=2)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            print(f"⚠️ Could not write engine stats to {self.path}: {e}")
@@ -0,0 +1,252 @@
+import numpy as np
+from app.sounddevice_audio_engine import RealTimeStemAudioEngine
+from app.engine_stats import CallbackStats, StatsDumper
+from app.audio_backend import get_backend, negotiate_sample_rate
+from app.engine_clock import EngineClock, EventScheduler
+from app.param_queue import ParamQueue, GainRamp
+from app.output_recorder import OutputRecorder, recording_path
+
+class MasterMixerEngine:
+    """One output stream that pulls blocks from every deck and mixes them
+
+    deck_options are passed to every deck's RealTimeStemAudioEngine
+    (effects_mode, load_mode, storage_dtype, render_workers...); the rate,
+    block size and backend are always the mixer's.
+    """
+    def __init__(self, n_decks=2, sample_rate=None, block_size=512, backend=None, deck_options=None):
+        self.backend = backend if backend is not None else get_backend()
+        self.sample_rate = negotiate_sample_rate(self.backend, sample_rate)  # Device rate by default
+        self.block_size = block_size
+
+        # One clock and event queue for the shared stream, so events on
+        # different decks line up sample-for-sample
+        self.clock = EngineClock(self.sample_rate)
+        self.scheduler = EventScheduler()
+
+        # Decks render into the mixer instead of opening their own streams
+        self.decks = []
+        for _ in range(n_decks):
+            deck = RealTimeStemAudioEngine(sample_rate=self.sample_rate, block_size=block_size,
+                                           backend=self.backend, **(deck_options or {}))
+            deck.mixer = self
+            deck.clock = self.clock
+            deck.scheduler = self.scheduler
+            self.decks.append(deck)
+
+        # Crossfader assignment per deck: 'A', 'B' or 'thru'
+        self.deck_sides = ['A' if i % 2 == 0 else 'B' for i in range(n_decks)]
+        self.crossfader = 0.5  # 0.0 = full A, 1.0 = full B
+        self.master_volume = 1.0
+        self.deck_gains = np.ones(n_decks, dtype=np.float32)
+        self.update_deck_gains()
+
+        # Crossfader and master changes reach the callback through commands;
+        # mix_gains (deck gains times master) is what the callback plays and
+        # is ramped in after each change - across the block for commands,
+        # from the event's sample to the block end for scheduled changes
+        self.commands = ParamQueue()
+        self.mix_gains = self.deck_gains * np.float32(self.master_volume)
+        self.gain_ramp = GainRamp(n_decks, max(block_size, 4096))
+        self.gain_ramp.reset(self.mix_gains)
+
+        # Preallocated per-deck block buffers, grown if the host asks for more
+        self.deck_buffers = np.zeros((n_decks, max(block_size, 4096), 2), dtype=np.float32)
+        self.stream = None
+
+        # Timing and xrun counters for the shared callback
+        self.stats = CallbackStats(self.sample_rate)
+        self.stats_dumper = None
+        self.recorder = None
+
+    def update_deck_gains(self):
+        """Recompute the per-deck gain vector from the crossfader"""
+        # Boost when fully on one side, capped at 1.0 to avoid distortion
+        side_gains = {
+            'A': min((1.0 - self.crossfader) * 2.0, 1.0),
+            'B': min(self.crossfader * 2.0, 1.0),
+            'thru': 1.0,
+        }
+        self.deck_gains = np.array([side_gains[side] for side in self.deck_sides], dtype=np.float32)
+
+    def set_crossfader(self, position):
+        """Set crossfader position in real-time (0.0 = A, 1.0 = B)"""
+        self.crossfader = max(0.0, min(1.0, position))
+        self.update_deck_gains()
+        self.send(self.apply_mix_gains, self.deck_gains, self.master_volume)
+
+    def set_deck_side(self, deck_index, side):
+        """Assign a deck to crossfader side 'A', 'B' or 'thru'"""
+        if side not in ('A', 'B', 'thru'):
+            raise ValueError(f"Unknown crossfader side: {side}")
+        self.deck_sides[deck_index] = side
+        self.update_deck_gains()
+        self.send(self.apply_mix_gains, self.deck_gains, self.master_volume)
+
+    def set_master_volume(self, volume):
+        """Set master output volume in real-time"""
+        self.master_volume = max(0.0, min(2.0, volume))
+        self.send(self.apply_mix_gains, self.deck_gains, self.master_volume)
+
+    def send(self, action, *args):
+        """Hand a mix change to the callback, or apply it now if the stream is closed"""
+        if self.stream is not None:
+            if self.commands.push(self.clock.estimate_sample(), action, *args):
+                return
+            print("⚠️ Parameter queue full, applying directly")
+        action(*args)
+
+    def apply_mix_gains(self, deck_gains, master_volume):
+        """Callback side: new crossfader/master gains, ramped in over the next block
+
+        deck_gains is a fresh array per update, so the GUI never writes one
+        the callback is reading.
+        """
+        np.multiply(deck_gains, master_volume, out=self.mix_gains)
+        self.gain_ramp.retarget()
+
+    def audio_callback(self, outdata, frames, time, status):
+        """Pull one block from each deck and mix them in a single pass"""
+        started = self.stats.begin()
+        self.clock.begin_block(frames, time)
+        try:
+            # Parameter changes since the last block apply at its start
+            now = self.clock.sample_time
+            self.commands.drain(now)
+            for deck in self.decks:
+                deck.commands.drain(now)
+
+            if frames > self.deck_buffers.shape[1]:
+                self.deck_buffers = np.zeros((len(self.decks), frames, 2), dtype=np.float32)
+
+            if self.scheduler.has_events():
+                self.scheduler.process(self.clock.sample_time, frames, self.render_decks, outdata)
+            else:
+                self.render_decks(outdata, 0, frames)
+            np.clip(outdata, -0.95, 0.95, out=outdata)
+
+            # The set recording is exactly what goes to the speakers
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.capture(outdata)
+
+        except Exception as e:
+            # Don't print errors in audio callback - causes lag
+            outdata.fill(0)
+            self.stats.record_exception(e)
+
+        self.clock.end_block()
+        self.stats.end(started, frames, status)
+
+    def render_decks(self, outdata, offset, count):
+        """Render and mix `count` samples of every deck starting `offset` samples into the block
+
+        Mixing per segment means a gain change scheduled mid-block is heard
+        from its own sample, with its ramp starting there.
+        """
+        blocks = self.deck_buffers[:, offset:offset + count]
+        for i, deck in enumerate(self.decks):
+            deck.render_block(blocks[i], count)
+
+        # Crossfader and master gains applied as one contraction over the deck axis
+        self.gain_ramp.mix(self.mix_gains, blocks.reshape(len(self.decks), -1),
+                           outdata[offset:offset + count].reshape(-1))
+        self.gain_ramp.settle(self.mix_gains)
+
+    def schedule(self, sample_time, action, *args):
+        """Run action(*args) inside the callback when the stream reaches sample_time"""
+        return self.scheduler.schedule(sample_time, action, *args)
+
+    def schedule_deck_start(self, sample_time, deck_index):
+        """Start a deck on an exact sample (the stream must already be running)"""
+        return self.schedule(sample_time, self.set_deck_playing, deck_index, True)
+
+    def schedule_deck_stop(self, sample_time, deck_index):
+        return self.schedule(sample_time, self.set_deck_playing, deck_index, False)
+
+    def schedule_crossfader(self, sample_time, position):
+        self.crossfader = max(0.0, min(1.0, position))
+        self.update_deck_gains()
+        return self.schedule(sample_time, self.apply_mix_gains, self.deck_gains, self.master_volume)
+
+    def set_deck_playing(self, deck_index, playing):
+        self.decks[deck_index].is_playing = playing
+
+    def get_stats(self):
+        """Shared callback counters plus per-deck streaming state"""
+        stats = self.stats.get_stats()
+        stats["sample_rate"] = self.sample_rate
+        stats["block_size"] = self.block_size
+        stats["commands"] = self.commands.get_stats()
+        stats["recording"] = self.recorder.get_stats() if self.recorder is not None else None
+        stats["decks"] = [{
+            "song": deck.song_name,
+            "is_playing": deck.is_playing,
+            "stream_underruns": deck.streamer.underruns if deck.streamer is not None else 0,
+            "rendering": deck.render_busy or deck.render_request is not None,
+        } for deck in self.decks]
+        return stats
+
+    def start_stats_dump(self, path, interval=5.0):
+        """Write get_stats() to a JSON file every `interval` seconds"""
+        self.stop_stats_dump()
+        self.stats_dumper = StatsDumper(self.get_stats, path, interval)
+        self.stats_dumper.start()
+
+    def stop_stats_dump(self):
+        if self.stats_dumper is not None:
+            self.stats_dumper.stop()
+            self.stats_dumper = None
+
+    def start_recording(self, path=None):
+        """Record the master output (post-crossfader, post-limiter) to WAV/FLAC; returns the path"""
+        self.stop_recording()
+        recorder = OutputRecorder(path or recording_path(), self.sample_rate)
+        recorder.start()
+        self.recorder = recorder  # The callback captures from its next block
+        print(f"⏺️ Recording set to {recorder.path}")
+        return recorder.path
+
+    def stop_recording(self):
+        """Finish the file; returns the final recording stats, or None if not recording"""
+        recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return None
+        recorder.stop()
+        stats = recorder.get_stats()
+        print(f"⏹️ Recorded {stats['seconds']:.1f}s to {recorder.path} "
+              f"({stats['dropped_frames']} frames dropped)")
+        return stats
+
+    def start(self):
+        """Open the shared output stream (no-op if already running)"""
+        if self.stream is not None:
+            return
+
+        try:
+            self.stream = self.backend.open_stream(self.audio_callback, self.sample_rate, self.block_size)
+            self.stream.start()
+            print(f"🎵 Master mixer started ({len(self.decks)} decks, one stream)")
+
+        except Exception as e:
+            self.stream = None
+            print(f"❌ Failed to start master mixer: {e}")
+
+    def stop(self):
+        """Close the shared output stream"""
+        if self.stream:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+            # Nothing drains the queues any more - apply what the callback missed
+            self.commands.drain(self.clock.sample_time)
+            for deck in self.decks:
+                deck.commands.drain(self.clock.sample_time)
+
+    def cleanup(self):
+        """Stop every deck and release the output stream"""
+        for deck in self.decks:
+            deck.stop_playback()
+        self.stop()
+        self.stop_stats_dump()
+        self.stop_recording()
+        print("🧹 Master mixer cleaned up")
@@ -0,0 +1,137 @@
+# python -m app.offline_render <song> <output.wav|.flac> [speed] [pitch] [start_s] [duration_s]
+
+import sys
+import time
+import numpy as np
+import soundfile as sf
+
+# Samples a streaming deck must have buffered before a block is rendered:
+# a few blocks plus one stretch grain at the fastest speed/pitch
+STREAM_LOOKAHEAD = 16384
+
+def source_decks(source):
+    """Decks rendered by a source - a MasterMixerEngine or a single deck engine"""
+    return list(source.decks) if hasattr(source, "decks") else [source]
+
+def wait_for_renders(decks, timeout=300.0):
+    """Block until queued background effect renders have been swapped in"""
+    deadline = time.time() + timeout
+    for deck in decks:
+        # Request first: the worker clears it and sets render_busy in one step
+        while deck.render_request is not None or deck.render_busy:
+            if time.time() > deadline:
+                raise TimeoutError("Effect render did not finish in time")
+            time.sleep(0.01)
+        deck.install_pending_swap()
+
+def wait_for_stream(deck, timeout=10.0):
+    """Block until a disk-streaming deck has enough data ahead of its playhead"""
+    streamer = deck.streamer
+    if streamer is None:
+        return
+    deadline = time.time() + timeout
+    while True:
+        generation, target = streamer.seek_request
+        position = target if generation != streamer.consumer_generation else deck.stream_position
+        if generation == streamer.reader_generation and \
+                streamer.buffered_samples(position) >= STREAM_LOOKAHEAD:
+            return
+        if time.time() > deadline:
+            # Render the underrun rather than hang; it is counted in stream_underruns
+            return
+        time.sleep(0.001)
+
+def render_offline(source, path, duration_seconds=None, start_seconds=None,
+                   block_size=None, subtype="PCM_24"):
+    """Bounce a deck or the master mixer to a WAV/FLAC file faster than real time
+
+    Blocks are produced by the source's own audio_callback, so volumes,
+    master volume, crossfader, speed/pitch and the limiter are exactly what
+    would be heard live. No output stream is opened. Every loaded deck is
+    played for the duration of the bounce; play state and positions are
+    restored afterwards. The format follows the file extension.
+    """
+    if getattr(source, "stream", None) is not None:
+        raise RuntimeError("Stop live playback before rendering offline")
+
+    # Streaming decks have no stem matrix; any deck with samples to play counts
+    decks = [deck for deck in source_decks(source) if deck.track_length() > 0]
+    if not decks:
+        raise ValueError("No loaded decks to render")
+
+    sample_rate = decks[0].sample_rate
+    block_size = block_size or decks[0].block_size
+    saved = [(deck.is_playing, deck.get_position_seconds()) for deck in decks]
+
+    try:
+        wait_for_renders(decks)
+        for deck in decks:
+            if start_seconds is not None:
+                deck.set_position_seconds(start_seconds)
+            deck.is_playing = True
+
+        if duration_seconds is None:
+            # Rest of the longest track in output time, so a sped-up deck is
+            # not bounced past its end (where playback wraps to the start)
+            duration_seconds = max((deck.get_duration_seconds() - deck.get_position_seconds())
+                                   / deck.playback_rate() for deck in decks)
+        total = int(duration_seconds * sample_rate)
+
+        # Blocks are gathered into ~1 s chunks so the file sees few large writes
+        blocks_per_chunk = max(1, sample_rate // block_size)
+        chunk = np.zeros((blocks_per_chunk * block_size, 2), dtype=np.float32)
+
+        started = time.perf_counter()
+        written = 0
+        with sf.SoundFile(path, 'w', samplerate=sample_rate, channels=2, subtype=subtype) as f:
+            while written < total:
+                filled = 0
+                while filled < len(chunk) and written + filled < total:
+                    frames = min(block_size, total - written - filled)
+                    for deck in decks:
+                        wait_for_stream(deck)
+                    source.audio_callback(chunk[filled:filled + frames], frames, None, None)
+                    filled += frames
+                f.write(chunk[:filled])
+                written += filled
+        elapsed = time.perf_counter() - started
+
+    finally:
+        for deck, (was_playing, position) in zip(decks, saved):
+            deck.is_playing = was_playing
+            deck.set_position_seconds(position)
+
+    seconds = written / sample_rate
+    return {
+        "path": path,
+        "frames": written,
+        "seconds": round(seconds, 3),
+        "elapsed_s": round(elapsed, 3),
+        "realtime_factor": round(seconds / elapsed, 1) if elapsed > 0 else None,
+    }
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python -m app.offline_render <song> <output.wav|.flac> "
+              "[speed] [pitch] [start_s] [duration_s]")
+        sys.exit(1)
+
+    from app.sounddevice_audio_engine import RealTimeStemAudioEngine
+    from app.audio_backend import get_backend
+
+    song_path, output_path = sys.argv[1], sys.argv[2]
+    speed = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    pitch = float(sys.argv[4]) if len(sys.argv) > 4 else 0
+    start = float(sys.argv[5]) if len(sys.argv) > 5 else None
+    duration = float(sys.argv[6]) if len(sys.argv) > 6 else None
+
+    # A bounce never opens a stream, so it needs no sound card
+    engine = RealTimeStemAudioEngine(backend=get_backend("null"))
+    if not engine.load_song_stems(song_path):
+        sys.exit(1)
+    engine.apply_effects_to_stems(speed, pitch)
+
+    result = render_offline(engine, output_path, duration, start)
+    print(f"✅ Rendered {result['seconds']}s to {result['path']} "
+          f"in {result['elapsed_s']}s ({result['realtime_factor']}x real time)")
+    engine.cleanup()
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+import numpy as np
+import soundfile as sf
+
+class OutputRecorder:
+    """Records the master output to a WAV/FLAC file without touching disk in the callback
+
+    The audio callback copies each finished block into a preallocated ring
+    with capture(); a writer thread drains the ring to the file in chunks of
+    about `chunk_seconds`. Each side moves only its own counter (frames
+    captured vs frames written), so no lock is needed. If the writer falls
+    more than `buffer_seconds` behind, the frames that do not fit are
+    dropped and counted rather than blocking the callback. The format
+    follows the file extension.
+    """
+    def __init__(self, path, sample_rate=44100, buffer_seconds=10.0, chunk_seconds=0.5,
+                 subtype="PCM_24"):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.subtype = subtype
+        self.capacity = int(buffer_seconds * sample_rate)
+        self.chunk_size = max(1024, int(chunk_seconds * sample_rate))
+        self.ring = np.zeros((self.capacity, 2), dtype=np.float32)
+
+        self.captured = 0   # Frames copied into the ring (callback only)
+        self.written = 0    # Frames written to the file (writer only)
+        self.dropped_frames = 0
+        self.dropped_blocks = 0
+        self.max_backlog = 0
+        self.error = None
+
+        self.running = False
+        self.thread = None
+        self.file = None
+        self.wake = threading.Event()
+
+    def start(self):
+        """Open the file and start the writer thread"""
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.file = sf.SoundFile(self.path, 'w', samplerate=self.sample_rate, channels=2,
+                                 subtype=self.subtype)
+        self.running = True
+        self.thread = threading.Thread(target=self.writer_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Write out everything captured so far and close the file"""
+        self.running = False
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5.0)
+            self.thread = None
+        if self.file is not None:
+            if self.error is None:
+                self.flush(self.captured)
+            self.file.close()
+            self.file = None
+
+    def capture(self, block):
+        """Copy a (frames, 2) output block into the ring (callback side)"""
+        frames = len(block)
+        start = self.captured
+        free = self.capacity - (start - self.written)
+        if frames > free:
+            # The writer is behind - keep what fits, count the rest
+            self.dropped_frames += frames - free
+            self.dropped_blocks += 1
+            frames = free
+            if frames == 0:
+                return
+
+        index = start % self.capacity
+        first = min(frames, self.capacity - index)
+        self.ring[index:index + first] = block[:first]
+        if first < frames:
+            self.ring[:frames - first] = block[first:frames]
+        self.captured = start + frames  # Publish only once the frames are in place
+
+    def writer_loop(self):
+        period = self.chunk_size / self.sample_rate / 2
+        while self.running:
+            captured = self.captured
+            backlog = captured - self.written
+            if backlog > self.max_backlog:
+                self.max_backlog = backlog
+            if backlog >= self.chunk_size:
+                try:
+                    self.flush(captured)
+                except Exception as e:
+                    # Stop writing; the callback keeps capturing and counts drops
+                    self.error = str(e)
+                    print(f"❌ Recording write failed: {e}")
+                    return
+            else:
+                self.wake.wait(period)
+                self.wake.clear()
+
+    def flush(self, captured):
+        """Write ring frames [written, captured) to the file (writer side)"""
+        while self.written < captured:
+            index = self.written % self.capacity
+            count = min(captured - self.written, self.capacity - index)
+            self.file.write(self.ring[index:index + count])
+            self.written += count
+
+    def get_stats(self):
+        return {
+            "path": self.path,
+            "recording": self.running,
+            "seconds": self.written / self.sample_rate,
+            "backlog_frames": self.captured - self.written,
+            "max_backlog_frames": self.max_backlog,
+            "dropped_frames": self.dropped_frames,
+            "dropped_blocks": self.dropped_blocks,
+            "error": self.error,
+        }
+
+def recording_path(folder=os.path.join("data", "recordings"), extension="flac"):
+    """Timestamped file for a new set recording"""
+    return os.path.join(folder, f"set_{time.strftime('%Y%m%d_%H%M%S')}.{extension}")
@@ -0,0 +1,120 @@
+import numpy as np
+
+class ParamQueue:
+    """Bounded single-producer/single-consumer queue of parameter commands
+
+    One control thread (the GUI, or the engine process's command loop)
+    pushes; only the audio callback drains, once per block. Each side owns
+    one index, and a slot is written before the tail moves past it, so no
+    lock is needed. Commands carry the sample time they were issued at, and
+    all commands pending at a block start apply there together; later
+    updates to the same parameter simply overwrite earlier ones.
+    """
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.head = 0  # Next slot to drain (callback only)
+        self.tail = 0  # Next slot to fill (producer only)
+        self.dropped = 0
+        self.drained = 0
+        self.max_batch = 0
+        self.max_latency = 0  # Samples between issue and apply
+
+    def push(self, stamp, action, *args):
+        """Queue action(*args), issued at sample `stamp`; False (and counted) if full"""
+        tail = self.tail
+        if tail - self.head >= self.capacity:
+            self.dropped += 1
+            return False
+        self.slots[tail % self.capacity] = (stamp, action, args)
+        self.tail = tail + 1  # Publish only once the slot is complete
+        return True
+
+    def pending(self):
+        return self.tail != self.head
+
+    def drain(self, now):
+        """Apply every queued command in order (callback side); returns how many ran"""
+        head, tail = self.head, self.tail
+        if head == tail:
+            return 0
+
+        slots = self.slots
+        for i in range(head, tail):
+            index = i % self.capacity
+            stamp, action, args = slots[index]
+            slots[index] = None
+            action(*args)
+            if now - stamp > self.max_latency:
+                self.max_latency = now - stamp
+        self.head = tail
+
+        batch = tail - head
+        self.drained += batch
+        if batch > self.max_batch:
+            self.max_batch = batch
+        return batch
+
+    def get_stats(self):
+        return {"drained": self.drained, "dropped": self.dropped,
+                "max_batch": self.max_batch, "max_latency_samples": self.max_latency}
+
+class GainRamp:
+    """Moves a gain vector to new targets linearly over one mix instead of stepping
+
+    `gains` are the gains heard at the end of the last mix. After retarget(),
+    the next mix() fades from them to the target sample by sample, then
+    settle() makes the target current. Without a pending change mix() is the
+    plain gain-vector contraction.
+    """
+    def __init__(self, n_gains, max_frames=4096):
+        self.gains = np.zeros(n_gains, dtype=np.float32)
+        self.delta = np.zeros(n_gains, dtype=np.float32)
+        self.pending = False
+        self.allocate(max_frames)
+
+    def allocate(self, max_frames):
+        # Interleaved stereo: both channels of frame n get (n + 1) / frames
+        self.steps = np.repeat(np.arange(1, max_frames + 1, dtype=np.float32), 2)
+        self.curve = np.zeros(2 * max_frames, dtype=np.float32)
+        self.scratch = np.zeros(2 * max_frames, dtype=np.float32)
+
+    def reset(self, gains):
+        """Jump straight to gains, e.g. when a new song is installed"""
+        np.copyto(self.gains, gains)
+        self.pending = False
+
+    def retarget(self):
+        """The target gains changed; ramp on the next mix"""
+        self.pending = True
+
+    def mix(self, target, source, out, start=None):
+        """out = source rows (n_gains, size) contracted with the ramped gains
+
+        out is flat interleaved stereo; `start` overrides the gains ramped
+        from (used for masked subsets of the vector).
+        """
+        if not self.pending:
+            np.dot(target, source, out=out)
+            return
+
+        size = len(out)
+        if size > len(self.steps):
+            self.allocate(size // 2)
+        if start is None:
+            start = self.gains
+        curve = self.curve[:size]
+        np.multiply(self.steps[:size], 2.0 / size, out=curve)
+
+        np.subtract(target, start, out=self.delta)
+        np.dot(start, source, out=out)
+        scratch = self.scratch[:size]
+        np.dot(self.delta, source, out=scratch)
+        scratch *= curve
+        out += scratch
+
+    def settle(self, target):
+        """Make target the current gains once a ramped mix has used it"""
+        if self.pending:
+            np.copyto(self.gains, target)
+            self.pending = False
@@ -2,7 +2,8 @@
 
 from tkinter import Tk, Label, Scale, Button, filedialog, Frame, Entry, StringVar
 from tkinter import HORIZONTAL
-from app.sounddevice_audio_engine import RealTimeStemAudioEngine
+from app.engine_process import create_engine
+from app.stem_store import STEM_NAMES, stem_color
 import threading
 import time
 import json
@@ -14,15 +15,15 @@ import matplotlib.patches as patches
 
 class RealTimeStemPlayer:
     def __init__(self):
-        self.audio_engine = RealTimeStemAudioEngine()
+        self.audio_engine = create_engine()
         self.is_playing = False
         self.song_name = ""
         self.song_metadata = None  # Store song analysis data
         
-        # Control parameters
-        self.volumes = {"vocals": 1.0, "drums": 1.0, "bass": 1.0, "other": 1.0}
-        self.muted_states = {"vocals": False, "drums": False, "bass": False, "other": False}
-        self.pre_mute_volumes = {"vocals": 1.0, "drums": 1.0, "bass": 1.0, "other": 1.0}
+        # Control parameters, per stem of the loaded song (4-stem rows until
+        # a song with another stem set is loaded)
+        self.stem_names = list(STEM_NAMES)
+        self.reset_stem_settings()
         self.speed = 1.0
         self.pitch = 0
         
@@ -132,9 +133,7 @@ class RealTimeStemPlayer:
             
             # Reset all settings to defaults when loading new song
             print("🔄 Resetting to defaults for new song")
-            self.volumes = {"vocals": 1.0, "drums": 1.0, "bass": 1.0, "other": 1.0}
-            self.muted_states = {"vocals": False, "drums": False, "bass": False, "other": False}
-            self.pre_mute_volumes = {"vocals": 1.0, "drums": 1.0, "bass": 1.0, "other": 1.0}
+            self.reset_stem_settings()
             self.speed = 1.0
             self.pitch = 0
             
@@ -154,6 +153,10 @@ class RealTimeStemPlayer:
             # Load the new song
             self.song_name = self.audio_engine.load_song_stems(file_path)
             
+            # The song may bring another stem set (6 stems, vocals/no_vocals)
+            if self.song_name and self.audio_engine.stem_names != self.stem_names:
+                self.set_stem_names(self.audio_engine.stem_names)
+            
             # Load song analysis metadata
             if self.song_name:
                 self.load_song_metadata(self.song_name)
@@ -231,6 +234,11 @@ class RealTimeStemPlayer:
             self.speed = new_speed
             self.speed_entry.set(str(int(float(value))))
             
+            # Streaming effects respond within a block - no debounce needed
+            if self.audio_engine.effects_mode == "stream":
+                self.audio_engine.apply_effects_to_stems(self.speed, self.pitch)
+                return
+            
             # Cancel any pending speed change
             if hasattr(self, 'speed_change_timer'):
                 self.root.after_cancel(self.speed_change_timer)
@@ -239,40 +247,9 @@ class RealTimeStemPlayer:
             self.speed_change_timer = self.root.after(500, lambda: self.apply_speed_change())
     
     def apply_speed_change(self):
-        """Apply speed change in background thread"""
+        """Apply speed change - rendered in the background and swapped in without stopping"""
         print(f"🏃 Applying speed change: {self.speed}x")
-        
-        # Show processing indicator
-        self.speed_slider.config(state='disabled')
-        self.root.config(cursor='wait')
-        
-        # Run in background thread to prevent GUI freezing
-        def process_speed():
-            try:
-                was_playing = self.is_playing
-                if was_playing:
-                    self.audio_engine.stop_playback()
-                
-                self.audio_engine.apply_effects_to_stems(self.speed, self.pitch)
-                
-                if was_playing:
-                    self.audio_engine.start_playback()
-                
-                # Re-enable GUI on main thread
-                self.root.after(0, self.speed_processing_done)
-                
-            except Exception as e:
-                print(f"❌ Speed processing error: {e}")
-                self.root.after(0, self.speed_processing_done)
-        
-        import threading
-        threading.Thread(target=process_speed, daemon=True).start()
-    
-    def speed_processing_done(self):
-        """Called when speed processing is complete"""
-        self.speed_slider.config(state='normal')
-        self.root.config(cursor='')
-        print("✅ Speed change complete")
+        self.audio_engine.apply_effects_to_stems(self.speed, self.pitch)
     
     def on_speed_entry_change(self):
         """Handle speed entry field changes"""
@@ -295,6 +272,11 @@ class RealTimeStemPlayer:
             self.pitch = new_pitch
             self.pitch_entry.set(str(new_pitch))
             
+            # Streaming effects respond within a block - no debounce needed
+            if self.audio_engine.effects_mode == "stream":
+                self.audio_engine.apply_effects_to_stems(self.speed, self.pitch)
+                return
+            
             # Cancel any pending pitch change
             if hasattr(self, 'pitch_change_timer'):
                 self.root.after_cancel(self.pitch_change_timer)
@@ -303,40 +285,9 @@ class RealTimeStemPlayer:
             self.pitch_change_timer = self.root.after(500, lambda: self.apply_pitch_change())
     
     def apply_pitch_change(self):
-        """Apply pitch change in background thread"""
+        """Apply pitch change - rendered in the background and swapped in without stopping"""
         print(f"🎵 Applying pitch change: {self.pitch} semitones")
-        
-        # Show processing indicator
-        self.pitch_slider.config(state='disabled')
-        self.root.config(cursor='wait')
-        
-        # Run in background thread
-        def process_pitch():
-            try:
-                was_playing = self.is_playing
-                if was_playing:
-                    self.audio_engine.stop_playback()
-                
-                self.audio_engine.apply_effects_to_stems(self.speed, self.pitch)
-                
-                if was_playing:
-                    self.audio_engine.start_playback()
-                
-                # Re-enable GUI on main thread
-                self.root.after(0, self.pitch_processing_done)
-                
-            except Exception as e:
-                print(f"❌ Pitch processing error: {e}")
-                self.root.after(0, self.pitch_processing_done)
-        
-        import threading
-        threading.Thread(target=process_pitch, daemon=True).start()
-    
-    def pitch_processing_done(self):
-        """Called when pitch processing is complete"""
-        self.pitch_slider.config(state='normal')
-        self.root.config(cursor='')
-        print("✅ Pitch change complete")
+        self.audio_engine.apply_effects_to_stems(self.speed, self.pitch)
     
     def on_pitch_entry_change(self):
         """Handle pitch entry field changes"""
@@ -414,7 +365,8 @@ class RealTimeStemPlayer:
     def handle_keypress(self, event):
         """Handle keyboard shortcuts"""
         key = event.char.lower()
-        stem_map = {"1": "vocals", "2": "drums", "3": "bass", "4": "other"}
+        # 1-9 toggle the stems in display order
+        stem_map = {str(i + 1): name for i, name in enumerate(self.stem_names[:9])}
         
         if key in stem_map:
             stem_name = stem_map[key]
@@ -430,7 +382,7 @@ class RealTimeStemPlayer:
         elif key == "0":
             # Master mute/unmute all
             all_muted = all(self.muted_states.values())
-            for stem_name in ["vocals", "drums", "bass", "other"]:
+            for stem_name in self.stem_names:
                 if all_muted:
                     # Unmute all if all are muted
                     if self.muted_states[stem_name]:
@@ -456,14 +408,24 @@ class RealTimeStemPlayer:
             self.play_button.config(text="⏸ Pause", bg="#FF5722")
             self.start_position_updates()
     
+    def reset_stem_settings(self):
+        """Full volume and unmuted for every stem in self.stem_names"""
+        self.volumes = {name: 1.0 for name in self.stem_names}
+        self.muted_states = {name: False for name in self.stem_names}
+        self.pre_mute_volumes = {name: 1.0 for name in self.stem_names}
+    
+    def set_stem_names(self, stem_names):
+        """Switch the controls to another stem set"""
+        self.stem_names = list(stem_names)
+        self.reset_stem_settings()
+        self.build_volume_rows()
+    
     def reset_to_original(self):
         """Reset all controls to original values"""
         print("🔄 Resetting all controls to original values")
         
         # Reset volumes and mute states in real-time
-        self.volumes = {"vocals": 1.0, "drums": 1.0, "bass": 1.0, "other": 1.0}
-        self.muted_states = {"vocals": False, "drums": False, "bass": False, "other": False}
-        self.pre_mute_volumes = {"vocals": 1.0, "drums": 1.0, "bass": 1.0, "other": 1.0}
+        self.reset_stem_settings()
         
         for stem_name in self.volumes.keys():
             self.volume_sliders[stem_name].set(100)
@@ -471,7 +433,7 @@ class RealTimeStemPlayer:
             self.audio_engine.set_volume(stem_name, 1.0)
             self.mute_buttons[stem_name].config(text="🔊", bg="#4CAF50")
         
-        # Reset speed/pitch (requires restart)
+        # Reset speed/pitch
         old_speed, old_pitch = self.speed, self.pitch
         self.speed = 1.0
         self.pitch = 0
@@ -481,16 +443,9 @@ class RealTimeStemPlayer:
         self.pitch_slider.set(0)
         self.pitch_entry.set("0")
         
-        # Apply effects if they changed
+        # Apply effects if they changed - swapped in without stopping playback
         if old_speed != 1.0 or old_pitch != 0:
-            was_playing = self.is_playing
-            if was_playing:
-                self.audio_engine.stop_playback()
-            
             self.audio_engine.apply_effects_to_stems(self.speed, self.pitch)
-            
-            if was_playing:
-                self.audio_engine.start_playback()
         
         print("✅ Reset complete")
     
@@ -670,20 +625,28 @@ class RealTimeStemPlayer:
         Label(vol_frame, text="🎚️ REAL-TIME VOLUME CONTROLS", 
               font=("Arial", 12, "bold"), fg="green").pack()
         
+        self.stem_rows_frame = Frame(vol_frame)
+        self.stem_rows_frame.pack(fill='x')
+        self.build_volume_rows()
+    
+    def build_volume_rows(self):
+        """One volume/mute row per stem in self.stem_names"""
+        for widget in self.stem_rows_frame.winfo_children():
+            widget.destroy()
         self.volume_sliders = {}
         self.volume_entries = {}
         self.mute_buttons = {}
-        stem_names = ["vocals", "drums", "bass", "other"]
-        colors = ["#FF6B6B", "#4ECDC4", "#45B7D1", "#96CEB4"]
-        key_numbers = ["1", "2", "3", "4"]
         
-        for i, stem_name in enumerate(stem_names):
-            frame = Frame(vol_frame)
+        for i, stem_name in enumerate(self.stem_names):
+            color = stem_color(stem_name, i)
+            frame = Frame(self.stem_rows_frame)
             frame.pack(fill='x', padx=20, pady=3)
             
-            # Stem name with keyboard shortcut
-            Label(frame, text=f"{stem_name.title()} ({key_numbers[i]}):", width=12, anchor='w',
-                  fg=colors[i], font=("Arial", 10, "bold")).pack(side='left')
+            # Stem name with keyboard shortcut (1-9)
+            label = stem_name.replace("_", " ").title()
+            shortcut = f" ({i + 1})" if i < 9 else ""
+            Label(frame, text=f"{label}{shortcut}:", width=12, anchor='w',
+                  fg=color, font=("Arial", 10, "bold")).pack(side='left')
             
             # Mute button
             mute_btn = Button(frame, text="🔊", width=3, height=1,
@@ -703,7 +666,7 @@ class RealTimeStemPlayer:
             # Volume slider
             slider = Scale(frame, from_=0, to=150, orient=HORIZONTAL,
                           command=lambda val, name=stem_name: self.on_volume_change(name, val),
-                          bg=colors[i], activebackground=colors[i])
+                          bg=color, activebackground=color)
             slider.set(100)
             slider.pack(side='right', fill='x', expand=True, padx=(0, 5))
             
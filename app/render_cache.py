@@ -0,0 +1,139 @@
+import numpy as np
+import threading
+import os
+from collections import OrderedDict
+
+def stem_set_name(stem_names, stem_folder=None):
+    """Label for the separation a song's stems came from, e.g. 'htdemucs_4stems'
+
+    The model is the stem folder's parent (data/separated/<model>/<song>);
+    stems loaded without a folder are told apart by their count only.
+    """
+    label = f"{len(stem_names)}stems"
+    if stem_folder:
+        model = os.path.basename(os.path.dirname(os.path.abspath(stem_folder)))
+        label = f"{model}_{label}"
+    return label
+
+class RenderCache:
+    """Bounded LRU of rendered stem matrices keyed by song and render settings
+
+    Entries are (n_stems, n_samples, 2) float32 matrices as produced by the
+    render path. The key holds the stem set and sample rate as well as
+    speed and pitch, so a song separated by another model or loaded at
+    another device rate never picks up a render of the wrong shape. With
+    disk_root set, renders are also saved next to the separated stems
+    (<disk_root>/<song>/renders/) and memory-mapped back on a miss, so they
+    survive restarts.
+    """
+    def __init__(self, max_bytes=2 * 1024 ** 3, disk_root=None):
+        self.max_bytes = max_bytes
+        self.disk_root = disk_root
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    def make_key(self, song_name, stem_set, sample_rate, speed, pitch_shift):
+        """Normalize float settings so 1.04 and 1.0400001 share an entry"""
+        return (song_name, stem_set, int(sample_rate),
+                round(float(speed), 4), round(float(pitch_shift), 4))
+
+    def disk_path(self, key):
+        song_name, stem_set, sample_rate, speed, pitch_shift = key
+        return os.path.join(self.disk_root, song_name, "renders",
+                            f"{stem_set}_sr{sample_rate}_speed{speed:g}_pitch{pitch_shift:+g}.npy")
+
+    def get(self, song_name, stem_set, sample_rate, speed, pitch_shift):
+        """Cached matrix for a setting, or None"""
+        key = self.make_key(song_name, stem_set, sample_rate, speed, pitch_shift)
+        with self.lock:
+            matrix = self.entries.get(key)
+            if matrix is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return matrix
+
+        if self.disk_root:
+            path = self.disk_path(key)
+            if os.path.exists(path):
+                try:
+                    matrix = np.load(path, mmap_mode='r')
+                    with self.lock:
+                        self.disk_hits += 1
+                    self._insert(key, matrix)
+                    return matrix
+                except Exception as e:
+                    print(f"⚠️ Could not read cached render {path}: {e}")
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, song_name, stem_set, sample_rate, speed, pitch_shift, matrix):
+        """Store a rendered matrix, evicting least recently used entries"""
+        key = self.make_key(song_name, stem_set, sample_rate, speed, pitch_shift)
+        self._insert(key, matrix)
+
+        if self.disk_root:
+            path = self.disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write then rename so a crash never leaves a truncated entry
+                temp_path = path + ".tmp.npy"
+                np.save(temp_path, matrix)
+                os.replace(temp_path, path)
+            except Exception as e:
+                print(f"⚠️ Could not write cached render {path}: {e}")
+
+    def _insert(self, key, matrix):
+        with self.lock:
+            if key in self.entries:
+                self.current_bytes -= self.entries.pop(key).nbytes
+
+            # Anything bigger than the whole budget is not worth keeping
+            if matrix.nbytes > self.max_bytes:
+                return
+
+            self.entries[key] = matrix
+            self.current_bytes += matrix.nbytes
+
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+                self.evictions += 1
+                self.evicted_bytes += evicted.nbytes
+
+    def clear(self):
+        """Drop every in-memory entry (disk entries are kept)"""
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def get_stats(self):
+        """Hit/miss/eviction counters and current memory use"""
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+            }
+
+_shared_cache = None
+
+def get_shared_cache():
+    """Process-wide cache shared by every deck"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = RenderCache()
+    return _shared_cache
@@ -1,103 +1,303 @@
 import numpy as np
-import librosa
-import sounddevice as sd
 import threading
 import time
+import math
 import os
-from calibrate.split_audio import split_song
+from calibrate.split_audio import split_song, get_stem_folder_path, DEFAULT_MODEL
+from app.stream_effects import StreamingTimePitch, FractionalReader
+from app.effect_render import render_matrix, render_matrix_parallel
+from app.render_cache import get_shared_cache, stem_set_name
+from app.stem_store import (decode_stem_files, write_stem_store, open_stem_store, store_paths,
+                            DEFAULT_RESAMPLER, RESAMPLERS)
+from app.stem_streamer import DiskStemStreamer
+from app.engine_stats import CallbackStats, StatsDumper
+from app.audio_backend import get_backend, negotiate_sample_rate
+from app.engine_clock import EngineClock, EventScheduler
+from app.beat_grid import BeatGrid, LOOP_BEATS
+from app.stem_registry import SharedStems, get_stem_registry
+from app.stem_eq import FilterChain
+from app.param_queue import ParamQueue, GainRamp
+from app.output_recorder import OutputRecorder, recording_path
+
+# Supported in-memory stem storage types
+STORAGE_DTYPES = ("float32", "float16", "int16")
+
+# Vinyl-mode playback: rate limits for the tempo fader and the jog wheel bend
+# (a fraction of the current rate), and the read-pointer interpolations
+VARISPEED_RANGE = (0.5, 2.0)
+PITCH_BEND_RANGE = (-0.5, 0.5)
+INTERPOLATIONS = ("linear", "cubic")
+
+def storage_scale(matrix):
+    """Factor that maps stored samples back to float audio in [-1, 1]"""
+    return 1.0 / 32767.0 if matrix.dtype == np.int16 else 1.0
+
+def compact_matrix(matrix, storage_dtype):
+    """Convert a float32 stem matrix to a storage dtype (other dtypes pass through)"""
+    if storage_dtype == "float32" or matrix.dtype != np.float32:
+        return matrix
+    
+    if storage_dtype == "float16":
+        return matrix.astype(np.float16)
+    
+    # One stem at a time keeps the float temporaries small
+    compact = np.empty(matrix.shape, dtype=np.int16)
+    for i in range(matrix.shape[0]):
+        compact[i] = np.clip(matrix[i] * 32767.0, -32768, 32767)
+    return compact
+
+def stack_stems(stems):
+    """Pad decoded (n_samples, 2) stems to one (n_stems, n_samples, 2) float32 matrix"""
+    stem_names = list(stems)
+    max_length = max(len(audio) for audio in stems.values())
+    
+    matrix = np.zeros((len(stem_names), max_length, 2), dtype=np.float32)
+    for i, stem_name in enumerate(stem_names):
+        audio = stems[stem_name]
+        matrix[i, :len(audio)] = audio
+        if len(audio) < max_length:
+            print(f"🔧 Padded {stem_name} from {len(audio)} to {max_length} samples")
+    return stem_names, matrix
+
+def find_song_stems(file_path, model=None):
+    """Separate a song if needed; returns (song_name, stem_folder)
+    
+    Without a model, the existing separation with the most stems is used
+    (htdemucs_6s, htdemucs, a two-stem split...); whatever stems it holds
+    are loaded.
+    """
+    song_name = split_song(file_path, model)
+    stem_folder = (get_stem_folder_path(song_name, model)
+                   or os.path.join("data", "separated", model or DEFAULT_MODEL, song_name))
+    
+    if not os.path.exists(stem_folder):
+        raise FileNotFoundError(f"Stem folder not found: {stem_folder}")
+    return song_name, stem_folder
+
+def load_stem_folder(stem_folder, sample_rate, resampler=DEFAULT_RESAMPLER, timings=None):
+    """Load a separated song's stems as (store_path, stem_names, matrix)
+    
+    The matrix is a memory map of the pre-decoded stem store, which is
+    written on the first load; if it cannot be written the stems are
+    decoded into memory and store_path is None. Decode times per stem go
+    into `timings` (see decode_stem_files); a mapped store adds none.
+    """
+    # Engine-ready memory-mapped store: reloading is nearly free
+    store = open_stem_store(stem_folder, sample_rate)
+    if store is None:
+        loaded_stems = decode_stem_files(stem_folder, sample_rate, resampler=resampler,
+                                         timings=timings)
+        
+        if not loaded_stems:
+            raise ValueError("No stems were successfully loaded")
+        
+        max_length = max(len(audio) for audio in loaded_stems.values())
+        print(f"🔧 Synchronizing {len(loaded_stems)} stems to {max_length} samples")
+        
+        # Save a padded float32 copy once so the next load is a memory map
+        try:
+            write_stem_store(stem_folder, sample_rate, loaded_stems)
+            store = open_stem_store(stem_folder, sample_rate)
+        except Exception as e:
+            print(f"⚠️ Could not write stem store ({e}), keeping stems in memory")
+        
+        if store is None:
+            # Pad all stems to same length for perfect synchronization
+            stem_names, matrix = stack_stems(loaded_stems)
+            return None, stem_names, matrix
+    
+    stem_names, matrix = store
+    return store_paths(stem_folder, sample_rate)[0], stem_names, matrix
+
+def load_song_matrix(file_path, sample_rate, model=None):
+    """find_song_stems and load_stem_folder in one: (song_name, store_path, stem_names, matrix)"""
+    song_name, stem_folder = find_song_stems(file_path, model)
+    return (song_name,) + load_stem_folder(stem_folder, sample_rate)
+
+def stem_key(stem_folder, sample_rate, storage_dtype):
+    """Registry key: decks share stems only when all three match"""
+    return (os.path.abspath(stem_folder), sample_rate, storage_dtype)
 
 class RealTimeStemAudioEngine:
     """Real-time audio engine using sounddevice for seamless mixing"""
-    def __init__(self, sample_rate=44100, block_size=512):
-        self.sample_rate = sample_rate
+    def __init__(self, sample_rate=None, block_size=512, effects_mode="stream",
+                 render_workers=None, render_cache=None, load_mode="memory", prefetch_seconds=5.0,
+                 storage_dtype="float32", backend=None, stem_registry=None,
+                 resampler=DEFAULT_RESAMPLER):
+        # Where output streams come from: the sound card, or a simulated
+        # stream for headless runs (see app/audio_backend.py)
+        self.backend = backend if backend is not None else get_backend()
+        
+        # Without an explicit rate, run at the device's native rate; stems are
+        # loaded from the stem store for that rate
+        self.sample_rate = negotiate_sample_rate(self.backend, sample_rate)
         self.block_size = block_size
         
+        # "memory" maps the whole stem store, "stream" reads it from disk through
+        # a ring buffer kept prefetch_seconds ahead of the playhead
+        self.load_mode = load_mode
+        self.prefetch_seconds = prefetch_seconds
+        self.streamer = None
+        self.stream_position = 0  # Absolute (non-wrapping) position in stream mode
+        self.stream_block = np.zeros((0, 0, 2), dtype=np.float32)
+        
+        # "int16"/"float16" keep stems compact in memory; only the block being
+        # mixed is converted to float32
+        if storage_dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported storage dtype: {storage_dtype}")
+        self.storage_dtype = storage_dtype
+        self.convert_block = np.zeros((0, 0, 2), dtype=np.float32)
+        
+        # Used only for stems whose WAV rate differs from sample_rate;
+        # load_timings holds the last load's per-stem decode seconds
+        if resampler not in RESAMPLERS:
+            raise ValueError(f"Unsupported resampler: {resampler}")
+        self.resampler = resampler
+        self.load_timings = {}
+        
+        # Decks playing the same song share one read-only stem matrix; stem_key
+        # is this engine's reference, released when the song is replaced
+        self.stem_registry = stem_registry if stem_registry is not None else get_stem_registry()
+        self.stem_key = None
+        
+        # "stream" processes speed/pitch block-by-block in the callback,
+        # "render" re-renders full stems with librosa (highest quality, slow)
+        self.effects_mode = effects_mode
+        self.speed = 1.0
+        self.pitch_shift = 0
+        self.stretcher = None
+        self.stretch_engaged = False
+        
+        # Vinyl mode: tempo and pitch move together by reading the stems at a
+        # fractional rate straight from the loaded buffers. read_position is
+        # the fractional read pointer while engaged
+        self.varispeed = 1.0
+        self.pitch_bend = 0.0
+        self.interpolation = "linear"
+        self.read_position = 0.0
+        self.varispeed_engaged = False
+        self.varispeed_block = np.zeros(0, dtype=np.float32)  # Flat, viewed per block
+        
+        # Beat loop (start, end) and one-shot beat jump (at, to), in source
+        # samples; the callback reads them once per block
+        self.beat_grid = None
+        self.loop = None
+        self.jump = None
+        self.jump_request = None  # Beat offset in samples, waiting for the callback
+        
+        # Render mode: effects render on a worker thread into a new matrix that
+        # the callback swaps in at a block boundary, so playback never stops
+        self.timebase = 1.0  # Source samples per sample of processed_matrix
+        self.render_generation = 0
+        self.render_request = None
+        self.render_condition = threading.Condition()
+        self.render_thread = None
+        self.render_busy = False  # True from taking a request until its result is published
+        self.pending_swap = None  # (generation, matrix, stems, timebase)
+        self.swapped_generation = 0
+        self.swap_lock = threading.Lock()
+        
+        # Stems render concurrently in a process pool; 0 or 1 renders serially
+        if render_workers is None:
+            render_workers = min(4, os.cpu_count() or 1)
+        self.render_workers = render_workers
+        
+        # Rendered stem sets are reused when a speed/pitch setting is revisited
+        self.render_cache = render_cache if render_cache is not None else get_shared_cache()
+        
         # Audio data storage
         self.original_stems = {}
         self.processed_stems = {}
-        self.volumes = {"vocals": 1.0, "drums": 1.0, "bass": 1.0, "other": 1.0}
+        
+        # Stems are packed into one contiguous (n_stems, n_samples, 2) float32
+        # block; original_stems/processed_stems hold per-stem views into it
+        self.song_name = None
+        self.stem_names = []
+        self.stem_set = None
+        self.stem_index = {}
+        self.stem_matrix = None
+        self.processed_matrix = None
+        self.gain_vector = np.ones(0, dtype=np.float32)
+        self.block_gains = np.ones(0, dtype=np.float32)
+        # Any stem set works (4-stem, 6-stem, vocals/no_vocals): settings are
+        # kept by stem name, and a new name starts at full volume
+        self.volumes = {}
+        self.muted = set()
+        
+        # Real-time EQ/filter chains: per stem name (kept across songs, like
+        # volumes) and one for the whole deck. stem_chains lines them up with
+        # the loaded stems; dry_mask zeroes filtered stems in the plain mix
+        self.stem_eq = {}
+        self.stem_chains = ()
+        self.deck_eq = FilterChain(self.sample_rate)
+        self.dry_mask = np.ones(0, dtype=np.float32)
+        self.dry_gains = np.ones(0, dtype=np.float32)
+        self.stems_filtered = False
+        self.deck_filtered = False
         self.master_volume = 1.0
+        
+        # Volume, mute and master changes reach the callback through commands,
+        # drained once per block and ramped over it. volumes/muted/master_volume
+        # are the caller's settings; gain_vector and output_volume are what
+        # the callback plays
+        self.commands = ParamQueue()
+        self.output_volume = 1.0
+        self.gain_ramp = GainRamp(0)
+        self.dry_start = np.ones(0, dtype=np.float32)
+        
         self.is_playing = False
         self.current_position = 0
         self.stream = None
+        self.mixer = None  # Set when this engine is a deck on a MasterMixerEngine
+        
+        # Sample clock of the stream this engine renders for, and events to
+        # run on it; a MasterMixerEngine replaces both with its own
+        self.clock = EngineClock(self.sample_rate)
+        self.scheduler = EventScheduler()
+        
+        # Callback timing and xrun counters, optionally dumped to JSON
+        self.stats = CallbackStats(self.sample_rate)
+        self.stats_dumper = None
+        self.recorder = None
         
-        # Simple sounddevice setup
+        # Device defaults (a no-op for simulated backends)
         try:
-            import sounddevice as sd
-            sd.default.samplerate = self.sample_rate
-            sd.default.channels = 2
-            sd.default.dtype = 'float32'
+            self.backend.configure(self.sample_rate)
         except Exception as e:
-            print(f"❌ Sounddevice error: {e}")
+            print(f"❌ Audio backend error: {e}")
     
-    def load_song_stems(self, file_path):
-        """Load and prepare stems for real-time playback"""
+    def load_song_stems(self, file_path, model=None):
+        """Load and prepare stems for real-time playback (the richest separation unless a model is given)"""
         try:
             print("Loading stems for real-time playback...")
             
-            song_name = split_song(file_path)
-            stem_folder = os.path.join("data", "separated", "htdemucs", song_name)
+            song_name, stem_folder = find_song_stems(file_path, model)
+            self.load_timings = {}
             
-            if not os.path.exists(stem_folder):
-                raise FileNotFoundError(f"Stem folder not found: {stem_folder}")
-            
-            stem_names = ["vocals", "drums", "bass", "other"]
-            loaded_stems = {}
-            max_length = 0
-            
-            for stem_name in stem_names:
-                stem_path = os.path.join(stem_folder, f"{stem_name}.wav")
-                if os.path.exists(stem_path):
-                    try:                        
-                        # Load with exact sample rate matching
-                        audio, sr = librosa.load(stem_path, sr=self.sample_rate, mono=False)
-                        
-                        if audio is None or len(audio) == 0:
-                            print(f"⚠️ Warning: {stem_name} is empty, skipping")
-                            continue
-                        
-                        # Ensure stereo
-                        if len(audio.shape) == 1:
-                            audio = np.stack([audio, audio])
-                        elif audio.shape[0] == 1:
-                            audio = np.vstack([audio, audio])
-                        
-                        # Transpose to (samples, channels) for sounddevice
-                        if audio.shape[0] == 2:
-                            audio = audio.T
-                        
-                        # Ensure contiguous memory layout
-                        audio = np.ascontiguousarray(audio.astype(np.float32))
-                        
-                        loaded_stems[stem_name] = audio
-                        max_length = max(max_length, len(audio))
-                        
-                    except Exception as e:
-                        print(f"❌ Error loading {stem_name}: {e}")
-                        # Continue with other stems
-                        
+            if self.load_mode == "stream":
+                store_path, stem_names, matrix = load_stem_folder(stem_folder, self.sample_rate,
+                                                                  self.resampler, self.load_timings)
+                if store_path is not None:
+                    self.set_streamer(stem_names, store_path, song_name, stem_folder)
+                    print(f"💿 Streaming {len(stem_names)} stems from disk ({self.prefetch_seconds}s prefetch)")
                 else:
-                    print(f"⚠️ {stem_name} file not found at {stem_path}")
-            
-            if not loaded_stems:
-                raise ValueError("No stems were successfully loaded")
-            
-            print(f"🔧 Synchronizing {len(loaded_stems)} stems to {max_length} samples")
-            
-            # Pad all stems to same length for perfect synchronization
-            for stem_name in loaded_stems:
-                current_length = len(loaded_stems[stem_name])
-                if current_length < max_length:
-                    padding = np.zeros((max_length - current_length, 2), dtype=np.float32)
-                    loaded_stems[stem_name] = np.vstack([loaded_stems[stem_name], padding])
-                    print(f"🔧 Padded {stem_name} from {current_length} to {max_length} samples")
+                    self.set_stem_matrix(stem_names, matrix, song_name, stem_folder)
+                    print(f"✅ Successfully loaded {len(stem_names)} stems")
+                return song_name
             
-            self.original_stems = loaded_stems
-            self.processed_stems = loaded_stems.copy()
+            key = stem_key(stem_folder, self.sample_rate, self.storage_dtype)
+            shared = self.stem_registry.acquire(key, lambda: self.load_shared_stems(stem_folder))
+            try:
+                self.set_stem_matrix(shared.stem_names, shared.matrix, song_name, stem_folder)
+            except Exception:
+                self.stem_registry.release(key)
+                raise
+            self.stem_key = key
             
-            self.current_position = 0
-            
-            print(f"✅ Successfully loaded {len(loaded_stems)} stems")
+            if shared.store_path is not None:
+                print(f"⚡ Mapped {len(shared.stem_names)} pre-decoded stems ({shared.matrix.shape[1]} samples)")
+            else:
+                print(f"✅ Successfully loaded {len(shared.stem_names)} stems")
             return song_name
             
         except Exception as e:
@@ -106,89 +306,686 @@ class RealTimeStemAudioEngine:
             traceback.print_exc()
             raise  # Re-raise so the GUI can handle it
     
+    def load_shared_stems(self, stem_folder):
+        """Registry loader: the stem folder as read-only stems in storage dtype"""
+        store_path, stem_names, matrix = load_stem_folder(stem_folder, self.sample_rate,
+                                                          self.resampler, self.load_timings)
+        matrix = self.compact(matrix)
+        matrix.setflags(write=False)
+        return SharedStems(stem_names, matrix, store_path)
+    
+    def release_stems(self):
+        """Drop this engine's reference to shared stems, if it holds one"""
+        key = self.stem_key
+        self.stem_key = None
+        if key is not None:
+            self.stem_registry.release(key)
+    
+    def load_stem_arrays(self, stems, song_name=None):
+        """Pack decoded (n_samples, 2) stems into the engine's stem matrix"""
+        stem_names, matrix = stack_stems(stems)
+        self.set_stem_matrix(stem_names, matrix, song_name)
+    
+    def set_stem_matrix(self, stem_names, matrix, song_name=None, stem_folder=None):
+        """Install a (n_stems, n_samples, 2) float32 stem matrix as the loaded song"""
+        self.close_streamer()
+        self.release_stems()
+        
+        if matrix is not None:
+            matrix = self.compact(matrix)
+            self.convert_block = np.zeros((len(stem_names), max(self.block_size, 4096), 2),
+                                          dtype=np.float32)
+        
+        self.song_name = song_name
+        self.stem_names = list(stem_names)
+        self.stem_set = stem_set_name(self.stem_names, stem_folder)
+        self.stem_index = {name: i for i, name in enumerate(self.stem_names)}
+        for name in self.stem_names:
+            self.volumes.setdefault(name, 1.0)
+        self.stem_matrix = matrix
+        self.processed_matrix = matrix
+        if matrix is None:
+            self.original_stems = {}
+        else:
+            self.original_stems = {name: matrix[i] for i, name in enumerate(self.stem_names)}
+        self.processed_stems = self.original_stems
+        
+        self.gain_vector = np.array([self.stem_gain(name) for name in self.stem_names],
+                                    dtype=np.float32)
+        self.block_gains = np.empty_like(self.gain_vector)
+        self.dry_mask = np.ones_like(self.gain_vector)
+        self.dry_gains = np.empty_like(self.gain_vector)
+        self.dry_start = np.empty_like(self.gain_vector)
+        
+        # A new song starts at its gains rather than fading in from the last one
+        scale = storage_scale(matrix) if matrix is not None else 1.0
+        gain_ramp = GainRamp(len(self.stem_names), max(self.block_size, 4096))
+        gain_ramp.reset(self.gain_vector * np.float32(self.output_volume * scale))
+        self.gain_ramp = gain_ramp
+        self.stem_chains = tuple(self.stem_eq.get(name) for name in self.stem_names)
+        for chain in self.stem_eq.values():
+            chain.reset()
+        self.deck_eq.reset()
+        
+        self.current_position = 0
+        self.stretcher = StreamingTimePitch(len(self.stem_names))
+        self.reader = FractionalReader(len(self.stem_names), self.stretcher.region_size,
+                                       cubic=self.interpolation == "cubic")
+        self.stretch_engaged = False
+        self.varispeed_engaged = False
+        self.varispeed_block = np.zeros(len(self.stem_names) * max(self.block_size, 4096) * 2,
+                                        dtype=np.float32)
+        
+        self.loop = None
+        self.jump = None
+        self.jump_request = None
+        self.beat_grid = BeatGrid.from_metadata(song_name, self.sample_rate) if song_name else None
+        
+        # Renders queued for the previous song are now stale
+        with self.render_condition:
+            self.render_generation += 1
+            self.render_request = None
+            self.pending_swap = None
+            self.timebase = 1.0
+    
+    def compact(self, matrix):
+        """Convert a float32 stem matrix to the engine's storage dtype"""
+        return compact_matrix(matrix, self.storage_dtype)
+    
+    def expand(self, matrix):
+        """Full float32 copy of a (possibly compact) stem matrix"""
+        if matrix.dtype == np.float32:
+            return matrix
+        return matrix.astype(np.float32) * np.float32(storage_scale(matrix))
+    
+    def kernel_source(self, matrix, start, count):
+        """float32 (n_stems, count, 2) view of stored samples for the mix kernel"""
+        source = matrix[:, start:start + count]
+        if matrix.dtype == np.float32:
+            return source
+        
+        if count > self.convert_block.shape[1]:
+            self.convert_block = np.zeros((matrix.shape[0], count, 2), dtype=np.float32)
+        converted = self.convert_block[:, :count]
+        np.copyto(converted, source)
+        return converted
+    
+    def set_streamer(self, stem_names, store_path, song_name=None, stem_folder=None):
+        """Play a stem store from disk instead of holding it in memory"""
+        self.set_stem_matrix(stem_names, None, song_name, stem_folder)
+        
+        streamer = DiskStemStreamer(store_path, sample_rate=self.sample_rate,
+                                    prefetch_seconds=self.prefetch_seconds)
+        if self.interpolation == "cubic":
+            streamer.reader.enable_cubic()
+        streamer.start(0)
+        self.stream_position = 0
+        self.stream_block = np.zeros((len(self.stem_names), max(self.block_size, 4096), 2),
+                                     dtype=np.float32)
+        self.streamer = streamer
+    
+    def close_streamer(self):
+        """Stop the disk reader of the current song, if any"""
+        streamer = self.streamer
+        self.streamer = None
+        if streamer is not None:
+            streamer.stop()
+    
+    def track_length(self):
+        """Length in samples of the buffer playback currently reads"""
+        if self.streamer is not None:
+            return self.streamer.n_samples
+        if self.processed_matrix is None:
+            return 0
+        return self.processed_matrix.shape[1]
+    
     def apply_effects_to_stems(self, speed=1.0, pitch_shift=0):
         """Apply speed and pitch effects to all stems"""
         print(f"Applying effects: speed={speed}x, pitch={pitch_shift} semitones")
         
-        for stem_name in self.original_stems:
-            audio = self.original_stems[stem_name].copy()
+        self.speed = speed
+        self.pitch_shift = pitch_shift
+        
+        # Disk streaming can only use the streaming effects
+        if self.effects_mode == "stream" or self.streamer is not None:
+            # Picked up by the callback at the next grain - no render, no copy
+            self.processed_stems = self.original_stems
+            self.processed_matrix = self.stem_matrix
+            if self.stretcher is not None:
+                self.stretcher.set_params(speed, pitch_shift)
+            return
+        
+        cached = None
+        if self.song_name and (speed != 1.0 or pitch_shift != 0):
+            cached = self.render_cache.get(self.song_name, self.stem_set, self.sample_rate,
+                                           speed, pitch_shift)
+        
+        with self.render_condition:
+            self.render_generation += 1
+            generation = self.render_generation
             
-            # Convert back to (channels, samples) for librosa
-            if len(audio.shape) == 2 and audio.shape[1] == 2:
-                audio = audio.T
+            if speed == 1.0 and pitch_shift == 0:
+                # Nothing to render - swap straight back to the originals
+                self.render_request = None
+                self.pending_swap = (generation, self.stem_matrix, self.original_stems, 1.0)
+            elif cached is not None:
+                # Revisited setting - reuse the earlier render instantly
+                self.render_request = None
+                cached = self.compact(cached)
+                stems = {name: cached[i] for i, name in enumerate(self.stem_names)}
+                self.pending_swap = (generation, cached, stems, speed)
+            else:
+                self.render_request = (generation, self.stem_matrix, speed, pitch_shift)
+                self.render_condition.notify()
+        
+        if self.render_thread is None:
+            self.render_thread = threading.Thread(target=self.render_worker, daemon=True)
+            self.render_thread.start()
+        
+        if not self.is_playing:
+            self.install_pending_swap()
+    
+    def render_effects(self, source, speed, pitch_shift):
+        """Render speed and pitch over a full stem matrix with librosa"""
+        source = self.expand(source)
+        
+        if self.render_workers > 1:
+            try:
+                return render_matrix_parallel(source, self.sample_rate, speed, pitch_shift,
+                                              workers=min(self.render_workers, len(source)))
+            except Exception as e:
+                print(f"⚠️ Parallel render failed ({e}), falling back to serial")
+        
+        return render_matrix(source, self.sample_rate, speed, pitch_shift)
+    
+    def render_worker(self):
+        """Render effect requests in the background - the newest request wins"""
+        while True:
+            with self.render_condition:
+                while self.render_request is None:
+                    self.render_condition.wait()
+                generation, source, speed, pitch_shift = self.render_request
+                song_name, stem_set = self.song_name, self.stem_set
+                self.render_request = None
+                self.render_busy = True
             
-            # Apply pitch shift
-            if pitch_shift != 0:
-                audio = librosa.effects.pitch_shift(audio, sr=self.sample_rate, n_steps=pitch_shift)
+            try:
+                start_time = time.time()
+                matrix = self.compact(self.render_effects(source, speed, pitch_shift))
+                if song_name:
+                    self.render_cache.put(song_name, stem_set, self.sample_rate, speed, pitch_shift,
+                                          matrix)
+            except Exception as e:
+                print(f"❌ Effect render failed: {e}")
+                with self.render_condition:
+                    self.render_busy = False
+                continue
             
-            # Apply time stretch
-            if speed != 1.0:
-                audio = librosa.effects.time_stretch(audio, rate=speed)
+            with self.render_condition:
+                # Still busy until the swap is published, so nothing waiting on
+                # the render sees it idle with no result pending
+                self.render_busy = False
+                # Drop renders superseded by a newer request or a new song
+                if generation != self.render_generation or source is not self.stem_matrix:
+                    continue
+                stems = {name: matrix[i] for i, name in enumerate(self.stem_names)}
+                self.pending_swap = (generation, matrix, stems, speed)
+            
+            print(f"✅ Effects rendered in {time.time() - start_time:.1f}s, swapping in")
+            if not self.is_playing:
+                self.install_pending_swap()
+    
+    def install_pending_swap(self):
+        """Swap in a finished render, keeping our place in the track
+
+        Called by the callback at the start of a block, or directly when
+        stopped. Never blocks: if another thread is mid-swap we try again
+        next block.
+        """
+        pending = self.pending_swap
+        if pending is None or pending[0] == self.swapped_generation:
+            return
+        if not self.swap_lock.acquire(blocking=False):
+            return
+        
+        try:
+            generation, matrix, stems, timebase = self.pending_swap
+            if generation == self.swapped_generation:
+                return
             
-            # Convert back to (samples, channels)
-            if len(audio.shape) == 2 and audio.shape[0] == 2:
-                audio = audio.T
+            # Map the playhead from the old buffer's time base into the new one
+            track_position = self.current_position * self.timebase
+            new_position = int(track_position / timebase)
             
-            self.processed_stems[stem_name] = audio.astype(np.float32)
+            self.processed_matrix = matrix
+            self.processed_stems = stems
+            self.timebase = timebase
+            self.current_position = min(new_position, matrix.shape[1] - 1)
+            self.swapped_generation = generation
+        finally:
+            self.swap_lock.release()
+    
+    def needs_stretch(self):
+        """Whether speed/pitch must be processed in the callback"""
+        return ((self.effects_mode == "stream" or self.streamer is not None)
+                and self.stretcher is not None
+                and (self.speed != 1.0 or self.pitch_shift != 0))
+    
+    def read_source(self, start, step, count, out):
+        """Fill out (n_stems, count, 2) from the original stems at a fractional position"""
+        if self.streamer is not None:
+            self.streamer.read_fractional(start, step, count, out)
+            return
         
-        # Reset position when effects change
-        self.current_position = 0
+        # Reads crossing the loop end continue from the loop start
+        loop = self.loop
+        if loop is not None and loop[0] <= start < loop[1] < start + step * count:
+            loop_start, loop_end = int(loop[0]), int(loop[1])
+            self.reader.read(self.stem_matrix[:, loop_start:loop_end], start - loop_start, step, count, out)
+            return
+        
+        # Wraps around so reads past the end follow the looping playback
+        self.reader.read(self.stem_matrix, start, step, count, out)
+    
+    def mix_stretched(self, outdata, frames):
+        """Mix a block through the streaming time/pitch processor"""
+        streamer = self.streamer
+        if not self.stretch_engaged:
+            self.stretcher.reset(self.stream_position if streamer else self.current_position)
+            self.stretch_engaged = True
+        
+        # A pending beat jump restarts the stretcher on the output sample
+        # where the playhead reaches the jump point
+        jump = self.jump
+        if jump is not None and streamer is None:
+            stretcher = self.stretcher
+            until = max(0, math.ceil((jump[0] - stretcher.position) / stretcher.params[0]))
+            if until < frames:
+                if until > 0:
+                    block = stretcher.process(self.read_source, until)
+                    self.mix_stems(block, outdata[:until])
+                self.jump = None
+                stretcher.reset(stretcher.position + jump[1] - jump[0])
+                outdata = outdata[until:]
+                frames -= until
+        
+        block = self.stretcher.process(self.read_source, frames)
+        self.mix_stems(block, outdata)
+        
+        if streamer is not None:
+            # Disk positions never wrap - the streamer maps them onto the file
+            self.stream_position = int(self.stretcher.position)
+            streamer.release(self.stream_position)
+            self.current_position = self.stream_position % streamer.n_samples
+        else:
+            self.stretcher.position %= self.stem_matrix.shape[1]
+            self.current_position = int(self.stretcher.position)
+    
+    def varispeed_rate(self):
+        """Source samples read per output sample in vinyl mode (fader times jog bend)"""
+        return self.varispeed * (1.0 + self.pitch_bend)
+    
+    def mix_varispeed(self, outdata, frames):
+        """Mix a block read at the varispeed rate from the loaded stems (vinyl mode)
+        
+        The rate is re-read every block, so fader moves and jog bends are
+        heard on the next callback; nothing is rendered and no buffer is
+        allocated.
+        """
+        streamer = self.streamer
+        if not self.varispeed_engaged:
+            self.read_position = float(self.stream_position if streamer else self.current_position)
+            self.varispeed_engaged = True
+        
+        rate = self.varispeed_rate()
+        cubic = self.interpolation == "cubic"
+        n_stems = len(self.stem_names)
+        if n_stems * frames * 2 > len(self.varispeed_block):
+            self.varispeed_block = np.zeros(n_stems * frames * 2, dtype=np.float32)
+        
+        if streamer is not None:
+            # Disk positions never wrap - the streamer maps them onto the file
+            block = self.varispeed_scratch(frames)
+            if streamer.read_fractional(self.read_position, rate, frames, block, cubic):
+                self.read_position += rate * frames
+                self.stream_position = int(self.read_position)
+                streamer.release(self.stream_position)
+            self.mix_stems(block, outdata)
+            self.current_position = self.stream_position % streamer.n_samples
+            return
+        
+        # Loop and jump points are in source samples; the matrix may be a
+        # render at another speed
+        matrix = self.processed_matrix
+        timebase = self.timebase
+        pos = self.read_position
+        
+        # A pending beat jump splits the block on the output sample where the
+        # read pointer reaches the jump point
+        jump = self.jump
+        if jump is not None:
+            at = jump[0] / timebase
+            until = math.ceil((at - pos) / rate) if at >= pos else frames
+            if until < frames:
+                if until > 0:
+                    pos = self.read_varispeed(matrix, pos, rate, until, outdata[:until], cubic)
+                pos += jump[1] / timebase - at
+                self.jump = None
+                outdata = outdata[until:]
+                frames -= until
+        
+        self.read_position = self.read_varispeed(matrix, pos, rate, frames, outdata, cubic)
+        self.current_position = int(self.read_position)
+    
+    def varispeed_scratch(self, count):
+        """Contiguous (n_stems, count, 2) view, so mixing it needs no copy"""
+        n_stems = len(self.stem_names)
+        return self.varispeed_block[:n_stems * count * 2].reshape(n_stems, count, 2)
+    
+    def read_varispeed(self, matrix, start, rate, count, out, cubic):
+        """Mix count samples read every `rate` samples from start; returns the next read position"""
+        block = self.varispeed_scratch(count)
+        end = start + rate * count
+        
+        # Inside a loop the read wraps at the loop end; otherwise at the track end
+        loop = self.loop
+        if loop is not None:
+            loop_start, loop_end = int(loop[0] / self.timebase), int(loop[1] / self.timebase)
+            if loop_start <= start < loop_end:
+                self.reader.read(matrix[:, loop_start:loop_end], start - loop_start, rate, count,
+                                 block, cubic)
+                self.mix_stems(block, out)
+                return loop_start + (end - loop_start) % (loop_end - loop_start)
+        
+        self.reader.read(matrix, start, rate, count, block, cubic)
+        self.mix_stems(block, out)
+        return end % matrix.shape[1]
+    
+    def render_streamed(self, streamer, outdata, frames):
+        """Mix the next block from the disk ring buffer"""
+        target = streamer.poll_seek()
+        if target is not None:
+            self.stream_position = target
+            self.stretch_engaged = False
+            self.varispeed_engaged = False
+        
+        if self.needs_stretch():
+            self.mix_stretched(outdata, frames)
+            return
+        self.stretch_engaged = False
+        
+        if self.varispeed_rate() != 1.0:
+            self.mix_varispeed(outdata, frames)
+            return
+        self.varispeed_engaged = False
+        
+        if frames > self.stream_block.shape[1]:
+            self.stream_block = np.zeros((len(self.stem_names), frames, 2), dtype=np.float32)
+        block = self.stream_block[:, :frames]
+        
+        # On underrun (e.g. right after a seek) hold the playhead and output silence
+        if streamer.read(self.stream_position, frames, block):
+            self.stream_position += frames
+            streamer.release(self.stream_position)
+        
+        self.mix_stems(block, outdata)
+        self.current_position = self.stream_position % streamer.n_samples
+    
+    def render_block(self, outdata, frames):
+        """Write this deck's mix for the next block into outdata (no limiting)
+
+        Shared by the standalone stream callback and MasterMixerEngine,
+        which pulls one block from every deck on a single output stream.
+        """
+        if not self.is_playing:
+            outdata.fill(0)
+            return
+        
+        self.prepare_filters()
+        self.render_stems(outdata, frames)
+        if self.deck_filtered:
+            self.deck_eq.process_in_place(outdata[:frames])
+    
+    def prepare_filters(self):
+        """Pick up EQ/filter knob changes, once per block"""
+        mask = self.dry_mask
+        filtered = False
+        for i, chain in enumerate(self.stem_chains):
+            if chain is not None and chain.prepare():
+                mask[i] = 0.0
+                filtered = True
+            else:
+                mask[i] = 1.0
+        self.stems_filtered = filtered
+        self.deck_filtered = self.deck_eq.prepare()
+    
+    def mix_stems(self, source, out):
+        """Mix a float32 (n_stems, count, 2) block into out with the block gains
+        
+        Stems without EQ go through one gain-vector contraction; each
+        filtered stem runs its IIR cascade straight into out. Gain changes
+        since the last mix are ramped across this one.
+        """
+        n_stems = len(self.block_gains)
+        ramp = self.gain_ramp
+        if not self.stems_filtered:
+            ramp.mix(self.block_gains, source.reshape(n_stems, -1), out.reshape(-1))
+            ramp.settle(self.block_gains)
+            return
+        
+        np.multiply(self.block_gains, self.dry_mask, out=self.dry_gains)
+        np.multiply(ramp.gains, self.dry_mask, out=self.dry_start)
+        ramp.mix(self.dry_gains, source.reshape(n_stems, -1), out.reshape(-1), start=self.dry_start)
+        
+        count = len(out)
+        for i, chain in enumerate(self.stem_chains):
+            if self.dry_mask[i] == 0.0:
+                start = ramp.gains[i] if ramp.pending else self.block_gains[i]
+                chain.add_to(source[i], start, (self.block_gains[i] - start) / count, out)
+        ramp.settle(self.block_gains)
+    
+    def render_stems(self, outdata, frames):
+        """Mix the loaded stems for the next block, before the deck filter"""
+        streamer = self.streamer
+        if streamer is not None:
+            # Master volume is folded into the per-stem gain vector
+            np.multiply(self.gain_vector, self.output_volume, out=self.block_gains)
+            self.render_streamed(streamer, outdata, frames)
+            return
+        
+        self.install_pending_swap()
+        matrix = self.processed_matrix
+        if matrix is None:
+            outdata.fill(0)
+            return
+        
+        # Master volume and the storage scale are folded into the gain vector
+        np.multiply(self.gain_vector, self.output_volume * storage_scale(matrix),
+                    out=self.block_gains)
+        
+        if self.jump_request is not None:
+            self.resolve_jump_request()
+        
+        if self.needs_stretch():
+            self.mix_stretched(outdata, frames)
+            return
+        self.stretch_engaged = False
+        
+        if self.varispeed_rate() != 1.0:
+            self.mix_varispeed(outdata, frames)
+            return
+        self.varispeed_engaged = False
+        
+        # The matrix shape is the cached track length - no per-block scan
+        n_stems, length = matrix.shape[:2]
+        pos = self.current_position
+        
+        # Loop and jump points are in source samples; the matrix may be a
+        # render at another speed
+        timebase = self.timebase
+        loop = self.loop
+        jump = self.jump
+        
+        done = 0
+        while done < frames:
+            if pos >= length:
+                pos = 0
+            
+            # Next point where playback continues elsewhere: a beat jump, the
+            # loop end or the track end (which wraps to the start)
+            end, resume, jumping = length, 0, False
+            if jump is not None:
+                at = int(jump[0] / timebase)
+                if pos <= at < end:
+                    end, resume, jumping = at, int(jump[1] / timebase), True
+            if loop is not None:
+                at = int(loop[1] / timebase)
+                if pos < at < end:
+                    end, resume, jumping = at, int(loop[0] / timebase), False
+            
+            # One gain-vector contraction mixes every stem straight into outdata
+            count = min(frames - done, end - pos)
+            if count > 0:
+                self.mix_stems(self.kernel_source(matrix, pos, count), outdata[done:done + count])
+                done += count
+                pos += count
+            
+            if pos >= end:
+                pos = resume
+                if jumping:
+                    jump = self.jump = None
+        
+        self.current_position = pos
     
     def audio_callback(self, outdata, frames, time, status):
         """Optimized real-time audio callback"""
-        # Remove all status printing - it causes lag
+        # No printing here - it causes lag; status and errors go to self.stats
+        started = self.stats.begin()
+        self.clock.begin_block(frames, time)
         
         # Clear output buffer first
         outdata.fill(0)
         
-        if not self.is_playing or not self.processed_stems:
-            return
-        
         try:
-            current_pos = self.current_position
-            
-            # Mix stems efficiently
-            for stem_name, audio in self.processed_stems.items():
-                volume = self.volumes.get(stem_name, 1.0)
-                
-                if volume > 0.001 and len(audio) > current_pos:
-                    available = len(audio) - current_pos
-                    to_copy = min(frames, available)
-                    
-                    if to_copy > 0:
-                        chunk = audio[current_pos:current_pos + to_copy] * volume
-                        outdata[:to_copy] += chunk
-            
-            # Apply master volume and soft limiting
-            outdata *= self.master_volume
-            np.clip(outdata, -0.95, 0.95, out=outdata)
+            # Parameter changes since the last block apply at its start
+            self.commands.drain(self.clock.sample_time)
             
-            # Update position
-            self.current_position += frames
+            # Scheduled events split the block so each lands on its exact sample
+            if self.scheduler.has_events():
+                self.scheduler.process(self.clock.sample_time, frames, self.render_segment, outdata)
+            else:
+                self.render_block(outdata, frames)
             
-            # Handle looping
-            if self.processed_stems:
-                max_len = max(len(audio) for audio in self.processed_stems.values())
-                if self.current_position >= max_len:
-                    self.current_position = 0
+            # Soft limiting
+            np.clip(outdata, -0.95, 0.95, out=outdata)
+            
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.capture(outdata)
                         
-        except Exception:
-            # Don't print errors in audio callback - causes lag
+        except Exception as e:
             outdata.fill(0)
+            self.stats.record_exception(e)
+        
+        self.clock.end_block()
+        self.stats.end(started, frames, status)
+    
+    def render_segment(self, outdata, offset, count):
+        """Render `count` samples into outdata starting `offset` samples in"""
+        self.render_block(outdata[offset:offset + count], count)
+    
+    def schedule(self, sample_time, action, *args):
+        """Run action(*args) inside the callback when the stream reaches sample_time
+        
+        Sample times are on self.clock (use clock.samples_after(seconds) for
+        relative times). Returns an id for scheduler.cancel().
+        """
+        return self.scheduler.schedule(sample_time, action, *args)
+    
+    def schedule_seek(self, sample_time, seconds):
+        return self.schedule(sample_time, self.seek_to, seconds)
+    
+    def schedule_volume(self, sample_time, stem_name, volume):
+        self.volumes[stem_name] = max(0.0, min(2.0, volume))
+        return self.schedule(sample_time, self.apply_stem_gain, stem_name, self.stem_gain(stem_name))
+    
+    def schedule_mute(self, sample_time, stem_name, muted=True):
+        self.update_muted(stem_name, muted)
+        return self.schedule(sample_time, self.apply_stem_gain, stem_name, self.stem_gain(stem_name))
+    
+    def schedule_master_volume(self, sample_time, volume):
+        self.master_volume = max(0.0, min(2.0, volume))
+        return self.schedule(sample_time, self.apply_output_volume, self.master_volume)
+    
+    def stream_active(self):
+        """True while an output stream is pulling blocks from this engine"""
+        if self.mixer is not None:
+            return self.mixer.stream is not None
+        return self.stream is not None
+    
+    def get_stats(self):
+        """Callback timing, xrun and streaming counters as a plain dict"""
+        stats = self.stats.get_stats()
+        stats["sample_rate"] = self.sample_rate
+        stats["block_size"] = self.block_size
+        stats["is_playing"] = self.is_playing
+        stats["stream_underruns"] = self.streamer.underruns if self.streamer is not None else 0
+        stats["rendering"] = self.render_busy or self.render_request is not None
+        stats["load_timings"] = self.load_timings
+        stats["commands"] = self.commands.get_stats()
+        stats["recording"] = self.recorder.get_stats() if self.recorder is not None else None
+        return stats
+    
+    def start_stats_dump(self, path, interval=5.0):
+        """Write get_stats() to a JSON file every `interval` seconds"""
+        self.stop_stats_dump()
+        self.stats_dumper = StatsDumper(self.get_stats, path, interval)
+        self.stats_dumper.start()
+    
+    def stop_stats_dump(self):
+        if self.stats_dumper is not None:
+            self.stats_dumper.stop()
+            self.stats_dumper = None
+    
+    def start_recording(self, path=None):
+        """Record this engine's output (post-limiter) to a WAV/FLAC file; returns the path
+        
+        Only a standalone engine records itself; decks on a master mixer are
+        recorded through MasterMixerEngine.start_recording().
+        """
+        self.stop_recording()
+        recorder = OutputRecorder(path or recording_path(), self.sample_rate)
+        recorder.start()
+        self.recorder = recorder  # The callback captures from its next block
+        print(f"⏺️ Recording to {recorder.path}")
+        return recorder.path
+    
+    def stop_recording(self):
+        """Finish the file; returns the final recording stats, or None if not recording"""
+        recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return None
+        recorder.stop()
+        stats = recorder.get_stats()
+        print(f"⏹️ Recorded {stats['seconds']:.1f}s to {recorder.path} "
+              f"({stats['dropped_frames']} frames dropped)")
+        return stats
     
     def start_playback(self):
         """Start real-time audio playback"""
         if self.is_playing:
             return
         
+        self.install_pending_swap()
+        
+        # Decks on a shared mixer only flag themselves - the mixer owns the stream
+        if self.mixer is not None:
+            self.is_playing = True
+            self.mixer.start()
+            return
+        
         try:
-            self.stream = sd.OutputStream(
-                callback=self.audio_callback,
-                samplerate=self.sample_rate,
-                channels=2,
-                blocksize=self.block_size,
-                dtype='float32'
-            )
+            self.stream = self.backend.open_stream(self.audio_callback, self.sample_rate, self.block_size)
             
             self.stream.start()
             self.is_playing = True
@@ -208,43 +1005,224 @@ class RealTimeStemAudioEngine:
             self.stream.stop()
             self.stream.close()
             self.stream = None
+            # Nothing drains the queue any more - apply what the callback missed
+            self.commands.drain(self.clock.sample_time)
         
         print("⏹️ Playback stopped")
     
     def set_volume(self, stem_name, volume):
         """Set volume for a specific stem in real-time"""
-        if stem_name in self.volumes:
-            self.volumes[stem_name] = max(0.0, min(2.0, volume))  # Allow up to 200%
-            # No restart needed - change happens in real-time!
+        self.volumes[stem_name] = max(0.0, min(2.0, volume))  # Allow up to 200%
+        self.send(self.apply_stem_gain, stem_name, self.stem_gain(stem_name))
+        # No restart needed - change happens in real-time!
+    
+    def set_mute(self, stem_name, muted=True):
+        """Silence a stem without losing its volume setting"""
+        self.update_muted(stem_name, muted)
+        self.send(self.apply_stem_gain, stem_name, self.stem_gain(stem_name))
     
     def set_master_volume(self, volume):
         """Set master volume in real-time"""
         self.master_volume = max(0.0, min(2.0, volume))
+        self.send(self.apply_output_volume, self.master_volume)
+    
+    def update_muted(self, stem_name, muted):
+        if muted:
+            self.muted.add(stem_name)
+        else:
+            self.muted.discard(stem_name)
+    
+    def stem_gain(self, stem_name):
+        """Gain a stem should play at from its volume and mute settings"""
+        return 0.0 if stem_name in self.muted else self.volumes.get(stem_name, 1.0)
+    
+    def send(self, action, *args):
+        """Hand a parameter change to the callback, or apply it now if none is running"""
+        if self.stream_active():
+            if self.commands.push(self.clock.estimate_sample(), action, *args):
+                return
+            print("⚠️ Parameter queue full, applying directly")
+        action(*args)
     
+    def apply_stem_gain(self, stem_name, gain):
+        """Callback side: a stem's new gain, ramped in over the next block"""
+        index = self.stem_index.get(stem_name)
+        if index is not None:
+            self.gain_vector[index] = gain
+            self.gain_ramp.retarget()
+    
+    def apply_output_volume(self, volume):
+        """Callback side: the deck's new output volume, ramped like stem gains"""
+        self.output_volume = volume
+        self.gain_ramp.retarget()
+
+    def set_varispeed(self, rate):
+        """Vinyl-mode tempo: 1.0 is normal, 1.02 plays 2% faster and higher"""
+        self.varispeed = max(VARISPEED_RANGE[0], min(VARISPEED_RANGE[1], float(rate)))
+    
+    def set_pitch_bend(self, amount):
+        """Jog-wheel nudge on top of the varispeed rate: 0.03 is 3% faster, 0 releases"""
+        self.pitch_bend = max(PITCH_BEND_RANGE[0], min(PITCH_BEND_RANGE[1], float(amount)))
+    
+    def set_interpolation(self, interpolation):
+        """Read-pointer interpolation for vinyl mode: "linear" (cheaper) or "cubic" (cleaner)"""
+        if interpolation not in INTERPOLATIONS:
+            raise ValueError(f"Unsupported interpolation: {interpolation}")
+        # Allocate cubic scratch here, not in the callback
+        if interpolation == "cubic":
+            if self.stretcher is not None:
+                self.reader.enable_cubic()
+            if self.streamer is not None:
+                self.streamer.reader.enable_cubic()
+        self.interpolation = interpolation
+    
+    def eq_chain(self, stem_name):
+        """Filter chain for a stem, or the whole deck when stem_name is None"""
+        if stem_name is None:
+            return self.deck_eq
+        chain = self.stem_eq.get(stem_name)
+        if chain is None:
+            chain = self.stem_eq[stem_name] = FilterChain(self.sample_rate)
+            self.stem_chains = tuple(self.stem_eq.get(name) for name in self.stem_names)
+        return chain
+
+    def set_eq(self, stem_name, low=None, mid=None, high=None):
+        """Low/mid/high gains in dB for a stem (or the deck when stem_name is None)"""
+        self.eq_chain(stem_name).set_eq(low, mid, high)
+
+    def set_filter(self, stem_name, position):
+        """HPF/LPF sweep for a stem (or the deck): -1 low-pass .. 0 off .. 1 high-pass"""
+        self.eq_chain(stem_name).set_sweep(position)
+
     def get_position_seconds(self):
         """Get current playback position in seconds"""
-        return self.current_position / self.sample_rate if self.sample_rate > 0 else 0
+        # Positions are reported in original track time, whatever the render speed
+        return self.current_position * self.timebase / self.sample_rate if self.sample_rate > 0 else 0
     
     def set_position_seconds(self, seconds):
         """Set playback position in seconds"""
-        new_position = int(seconds * self.sample_rate)
+        # While a stream is running the callback owns the playhead, so the
+        # seek goes through the command queue and runs at the next block start
+        self.send(self.seek_to, seconds)
+    
+    def seek_to(self, seconds):
+        """Move the playhead now (callback thread, or when no stream is running)"""
+        new_position = int(seconds * self.sample_rate / self.timebase)
         
         # Ensure position is within bounds
-        if self.processed_stems:
-            max_length = max(len(audio) for audio in self.processed_stems.values())
+        max_length = self.track_length()
+        if max_length > 0:
             new_position = max(0, min(new_position, max_length - 1))
         
         # Set position
         self.current_position = new_position
+        self.stretch_engaged = False
+        self.varispeed_engaged = False
+        
+        # Seeking out of a loop releases it; pending beat jumps are dropped
+        loop = self.loop
+        source_position = new_position * self.timebase
+        if loop is not None and not (loop[0] <= source_position < loop[1]):
+            self.exit_loop()
+        self.jump = None
+        self.jump_request = None
+        
+        # The disk reader refills from the new position
+        if self.streamer is not None:
+            self.streamer.seek(new_position)
     
     def get_duration_seconds(self):
         """Get total duration in seconds"""
-        if not self.processed_stems:
-            return 0
-        max_length = max(len(audio) for audio in self.processed_stems.values())
-        return max_length / self.sample_rate
+        return self.track_length() * self.timebase / self.sample_rate
+    
+    def playback_rate(self):
+        """Source samples the playhead covers per output sample at the current settings"""
+        if self.needs_stretch():
+            return self.speed
+        return self.varispeed_rate() * self.timebase
+    
+    def source_position(self):
+        """Playhead in samples of the original track"""
+        if self.stretch_engaged and self.stretcher is not None:
+            return self.stretcher.position
+        return self.current_position * self.timebase
+    
+    def set_loop(self, beats):
+        """Loop `beats` beats starting on the next beat of the grid
+        
+        Playback runs into the loop and wraps at its end inside the callback,
+        reading the same buffer again - nothing is copied. Returns False if
+        the loop cannot be set (no bpm, disk streaming, or past the end).
+        """
+        if beats not in LOOP_BEATS:
+            raise ValueError(f"Loop length must be one of {LOOP_BEATS} beats")
+        if self.beat_grid is None or self.stem_matrix is None:
+            print("⚠️ No beat grid for this track - loop not set")
+            return False
+        if self.streamer is not None:
+            print("⚠️ Beat loops need the track in memory (load_mode='memory')")
+            return False
+        
+        start = self.beat_grid.next_beat(self.source_position())
+        end = start + self.beat_grid.beats(beats)
+        if end > self.stem_matrix.shape[1]:
+            return False
+        
+        loop = (int(round(start)), int(round(end)))
+        self.loop = loop
+        self.stretcher.loop = loop
+        return True
+    
+    def exit_loop(self):
+        """Release the loop; playback carries on through its end"""
+        self.loop = None
+        if self.stretcher is not None:
+            self.stretcher.loop = None
+    
+    def beat_jump(self, beats):
+        """Jump forwards (or backwards) by `beats` beats
+        
+        Without a loop the jump happens when the playhead reaches the next
+        beat. While looping, the loop and playhead move together at once,
+        which keeps the phase anyway. Returns False without a grid or while
+        disk streaming.
+        """
+        if self.beat_grid is None or self.stem_matrix is None or self.streamer is not None:
+            return False
+        
+        # Resolved in the callback so the next beat is measured from the real playhead
+        self.jump_request = int(round(self.beat_grid.beats(beats)))
+        return True
+    
+    def resolve_jump_request(self):
+        """Callback side of beat_jump()"""
+        offset = self.jump_request
+        self.jump_request = None
+        length = self.stem_matrix.shape[1]
+        
+        loop = self.loop
+        if loop is not None:
+            if loop[0] + offset < 0 or loop[1] + offset > length:
+                return
+            loop = (loop[0] + offset, loop[1] + offset)
+            self.loop = loop
+            self.stretcher.loop = loop
+            if self.stretch_engaged:
+                self.stretcher.position += offset
+                self.stretcher.read_position += offset
+            else:
+                self.current_position = int((self.current_position * self.timebase + offset) / self.timebase)
+            return
+        
+        at = int(round(self.beat_grid.next_beat(self.source_position())))
+        if 0 <= at + offset < length:
+            self.jump = (at, at + offset)
     
     def cleanup(self):
         """Clean up resources"""
         self.stop_playback()
+        self.close_streamer()
+        self.release_stems()
+        self.stop_stats_dump()
+        self.stop_recording()
         print("🧹 Audio engine cleaned up")
\ No newline at end of file
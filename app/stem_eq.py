@@ -0,0 +1,196 @@
+import math
+import numpy as np
+from numba import njit, types
+
+# Band centres of the 3-band EQ: low/high shelves and a mid peak
+LOW_HZ = 250.0
+MID_HZ = 1000.0
+HIGH_HZ = 4000.0
+MID_Q = 0.7
+EQ_RANGE_DB = (-26.0, 12.0)   # -26 dB is close enough to a kill on a DJ mixer
+
+# The sweep knob runs -1..1: below 0 a low-pass closes from LPF_MAX_HZ down to
+# LPF_MIN_HZ, above 0 a high-pass opens from HPF_MIN_HZ up to HPF_MAX_HZ
+LPF_MIN_HZ, LPF_MAX_HZ = 100.0, 20000.0
+HPF_MIN_HZ, HPF_MAX_HZ = 20.0, 8000.0
+SWEEP_Q = 0.8                 # Slightly above Butterworth for a DJ-filter edge
+SWEEP_DEADZONE = 0.02
+MAX_SECTIONS = 4              # Three EQ bands and the sweep
+
+def biquad(kind, frequency, sample_rate, gain_db=0.0, q=0.7071):
+    """One normalised second-order section [b0, b1, b2, 1, a1, a2] (RBJ cookbook)"""
+    w0 = 2 * math.pi * min(frequency, 0.49 * sample_rate) / sample_rate
+    cos_w0, sin_w0 = math.cos(w0), math.sin(w0)
+    alpha = sin_w0 / (2 * q)
+    A = 10 ** (gain_db / 40)
+
+    if kind == "lpf":
+        b = [(1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2]
+        a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    elif kind == "hpf":
+        b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+        a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    elif kind == "mid":
+        b = [1 + alpha * A, -2 * cos_w0, 1 - alpha * A]
+        a = [1 + alpha / A, -2 * cos_w0, 1 - alpha / A]
+    elif kind == "low":
+        root = 2 * math.sqrt(A) * alpha
+        b = [A * ((A + 1) - (A - 1) * cos_w0 + root),
+             2 * A * ((A - 1) - (A + 1) * cos_w0),
+             A * ((A + 1) - (A - 1) * cos_w0 - root)]
+        a = [(A + 1) + (A - 1) * cos_w0 + root,
+             -2 * ((A - 1) + (A + 1) * cos_w0),
+             (A + 1) + (A - 1) * cos_w0 - root]
+    elif kind == "high":
+        root = 2 * math.sqrt(A) * alpha
+        b = [A * ((A + 1) + (A - 1) * cos_w0 + root),
+             -2 * A * ((A - 1) + (A + 1) * cos_w0),
+             A * ((A + 1) + (A - 1) * cos_w0 - root)]
+        a = [(A + 1) - (A - 1) * cos_w0 + root,
+             2 * ((A - 1) - (A + 1) * cos_w0),
+             (A + 1) - (A - 1) * cos_w0 - root]
+    else:
+        raise ValueError(f"Unknown filter section: {kind}")
+
+    return [b[0] / a[0], b[1] / a[0], b[2] / a[0], 1.0, a[1] / a[0], a[2] / a[0]]
+
+# Stem blocks are often views of read-only stores (memory-mapped or shared
+# between decks), so the kernel is compiled for read-only input too
+_BLOCK = types.Array(types.float32, 2, 'A')
+_READONLY_BLOCK = types.Array(types.float32, 2, 'A', readonly=True)
+
+@njit([types.void(types.float64[:, ::1], types.float64[:, :, ::1], block, types.float64,
+                  types.float64, _BLOCK, types.boolean)
+       for block in (_BLOCK, _READONLY_BLOCK)],
+      cache=True, nogil=True)
+def run_cascade(sos, zi, block, gain, gain_step, out, accumulate):
+    """Run a (frames, 2) block through the biquad cascade (transposed direct form II)
+
+    The result, times gain, is added to out when accumulate is set and
+    written to it otherwise; out may be the block itself. gain grows by
+    gain_step per frame, so a gain change ramps in over the block. zi is
+    (n_sections, 2 channels, 2) and carries over to the next block.
+    Compiled once (and cached) so the callback pays no Python overhead per
+    section.
+    """
+    n_sections = sos.shape[0]
+    for n in range(block.shape[0]):
+        for ch in range(2):
+            v = np.float64(block[n, ch])
+            for k in range(n_sections):
+                y = sos[k, 0] * v + zi[k, ch, 0]
+                zi[k, ch, 0] = sos[k, 1] * v - sos[k, 4] * y + zi[k, ch, 1]
+                zi[k, ch, 1] = sos[k, 2] * v - sos[k, 5] * y
+                v = y
+            g = gain + gain_step * (n + 1)
+            if accumulate:
+                out[n, ch] += g * v
+            else:
+                out[n, ch] = g * v
+
+class FilterChain:
+    """3-band EQ and HPF/LPF sweep for one stereo signal (a stem or a deck)
+
+    Knob setters run on the GUI thread and only redesign the coefficients;
+    flat bands are left out of the cascade, so a neutral chain costs nothing.
+    The callback picks up a new design at its next block and keeps the IIR
+    state of every section that is still there, so moving a knob does not
+    click and state runs on across callbacks.
+    """
+    def __init__(self, sample_rate=44100):
+        self.sample_rate = sample_rate
+        self.low = 0.0    # dB
+        self.mid = 0.0
+        self.high = 0.0
+        self.sweep = 0.0  # -1 (low-pass) .. 0 (off) .. 1 (high-pass)
+
+        # (sos, kinds) published by the knobs; the callback owns the rest
+        self.design = (None, ())
+        self.installed = self.design
+        self.sos = None
+        self.kinds = ()
+        self.zi = None
+
+        # Section state lives in two preallocated buffers, swapped on each
+        # redesign, so installing a design in the callback never allocates;
+        # views[b][n] is the first n sections of buffer b
+        self.state = [np.zeros((MAX_SECTIONS, 2, 2)) for _ in range(2)]
+        self.views = [[state[:n] for n in range(MAX_SECTIONS + 1)] for state in self.state]
+        self.current = 0
+
+    @property
+    def active(self):
+        return self.design[0] is not None
+
+    def set_eq(self, low=None, mid=None, high=None):
+        """Band gains in dB; None leaves a band as it is"""
+        lo, hi = EQ_RANGE_DB
+        if low is not None:
+            self.low = max(lo, min(hi, float(low)))
+        if mid is not None:
+            self.mid = max(lo, min(hi, float(mid)))
+        if high is not None:
+            self.high = max(lo, min(hi, float(high)))
+        self.update()
+
+    def set_sweep(self, position):
+        self.sweep = max(-1.0, min(1.0, float(position)))
+        self.update()
+
+    def sweep_section(self):
+        """(kind, cutoff) of the sweep filter, or None at the centre"""
+        position = self.sweep
+        if position <= -SWEEP_DEADZONE:
+            return "lpf", LPF_MAX_HZ * (LPF_MIN_HZ / LPF_MAX_HZ) ** -position
+        if position >= SWEEP_DEADZONE:
+            return "hpf", HPF_MIN_HZ * (HPF_MAX_HZ / HPF_MIN_HZ) ** position
+        return None
+
+    def update(self):
+        """Redesign the cascade from the knob values"""
+        sections, kinds = [], []
+        for kind, frequency, gain in (("low", LOW_HZ, self.low), ("mid", MID_HZ, self.mid),
+                                      ("high", HIGH_HZ, self.high)):
+            if abs(gain) > 0.05:
+                q = MID_Q if kind == "mid" else 0.7071
+                sections.append(biquad(kind, frequency, self.sample_rate, gain, q))
+                kinds.append(kind)
+
+        sweep = self.sweep_section()
+        if sweep is not None:
+            sections.append(biquad(sweep[0], sweep[1], self.sample_rate, q=SWEEP_Q))
+            kinds.append(sweep[0])
+
+        sos = np.array(sections, dtype=np.float64) if sections else None
+        self.design = (sos, tuple(kinds))  # One assignment - the callback sees old or new
+
+    def reset(self):
+        """Forget the filter state, e.g. when a new song is loaded"""
+        for state in self.state:
+            state.fill(0)
+
+    def prepare(self):
+        """Install the latest design (callback side); returns True if the chain filters"""
+        design = self.design
+        if design is not self.installed:
+            sos, kinds = design
+            old, new = self.state[self.current], self.state[1 - self.current]
+            # Sections that survive the redesign keep their state
+            for j, kind in enumerate(kinds):
+                if kind in self.kinds:
+                    new[j] = old[self.kinds.index(kind)]
+                else:
+                    new[j] = 0
+            self.current = 1 - self.current
+            self.zi = self.views[self.current][len(kinds)] if sos is not None else None
+            self.sos, self.kinds = sos, kinds
+            self.installed = design
+        return self.sos is not None
+
+    def add_to(self, block, gain, gain_step, out):
+        """Add the filtered (frames, 2) block times gain (ramped by gain_step per frame) to out"""
+        run_cascade(self.sos, self.zi, block, gain, gain_step, out, True)
+
+    def process_in_place(self, block):
+        """Filter a (frames, 2) float32 block in place"""
+        run_cascade(self.sos, self.zi, block, 1.0, 0.0, block, False)
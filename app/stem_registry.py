@@ -0,0 +1,95 @@
+import threading
+from collections import namedtuple
+
+# What decks share: stem order, the read-only (n_stems, n_samples, 2) matrix
+# and the stem store it came from (None for stems decoded into memory)
+SharedStems = namedtuple("SharedStems", ["stem_names", "matrix", "store_path"])
+
+class RegistryEntry:
+    def __init__(self, on_release):
+        self.value = None
+        self.error = None
+        self.refs = 1
+        self.on_release = on_release
+        self.ready = threading.Event()
+
+class StemRegistry:
+    """Reference-counted, read-only stem sets shared by every deck in the process
+
+    Keyed by stem folder (plus whatever else changes the loaded data, such
+    as sample rate and storage dtype). The first deck to acquire a key loads
+    it; later decks get the same buffers, and a deck asking for a key that is
+    still loading waits for that load instead of decoding again. The entry is
+    dropped when the last deck releases it.
+    """
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.loads = 0
+        self.shared_hits = 0
+
+    def acquire(self, key, load, on_release=None):
+        """Value for key, calling load() only if no deck holds it yet
+
+        on_release(value) runs after the last release, e.g. to free
+        shared memory.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry.refs += 1
+                self.shared_hits += 1
+                loading = False
+            else:
+                entry = self.entries[key] = RegistryEntry(on_release)
+                self.loads += 1
+                loading = True
+
+        if loading:
+            try:
+                entry.value = load()
+            except Exception as e:
+                entry.error = e
+                with self.lock:
+                    if self.entries.get(key) is entry:
+                        del self.entries[key]
+                raise
+            finally:
+                entry.ready.set()
+        else:
+            entry.ready.wait()
+            # The failed entry is already gone, so there is nothing to release
+            if entry.error is not None:
+                raise entry.error
+        return entry.value
+
+    def release(self, key):
+        """Drop one reference; the value is freed with the last one"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+            entry.refs -= 1
+            if entry.refs > 0:
+                return
+            del self.entries[key]
+
+        if entry.on_release is not None and entry.value is not None:
+            entry.on_release(entry.value)
+
+    def get_stats(self):
+        """Live entries with their reference counts and sizes"""
+        with self.lock:
+            entries = [{"key": str(key), "refs": entry.refs,
+                        "bytes": getattr(getattr(entry.value, "matrix", None), "nbytes", 0)}
+                       for key, entry in self.entries.items()]
+            return {"entries": entries, "loads": self.loads, "shared_hits": self.shared_hits}
+
+_shared_registry = None
+
+def get_stem_registry():
+    """Process-wide registry shared by every deck"""
+    global _shared_registry
+    if _shared_registry is None:
+        _shared_registry = StemRegistry()
+    return _shared_registry
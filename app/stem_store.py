@@ -0,0 +1,208 @@
+# python -m app.stem_store [sample_rate]   (converts every separated song in
+# data/separated/<model>; defaults to the output device's native rate)
+
+import numpy as np
+import librosa
+import soundfile as sf
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from calibrate.split_audio import find_stem_set
+
+# Stems decoded when a folder holds no complete stem set; songs otherwise
+# load whatever their separation produced (see split_audio.STEM_SETS)
+STEM_NAMES = ["vocals", "drums", "bass", "other"]
+
+# GUI colours for known stems; any other stem takes the next palette colour
+STEM_COLORS = {"vocals": "#FF6B6B", "drums": "#4ECDC4", "bass": "#45B7D1", "other": "#96CEB4",
+               "guitar": "#FFA726", "piano": "#BA68C8", "no_vocals": "#96CEB4"}
+STEM_PALETTE = ["#FF6B6B", "#4ECDC4", "#45B7D1", "#96CEB4", "#FFA726", "#BA68C8",
+                "#F06292", "#AED581"]
+
+# librosa res_type values that need no extra packages, from best quality to
+# fastest; only used when a stem's sample rate differs from the engine's
+RESAMPLERS = ("soxr_vhq", "soxr_hq", "soxr_mq", "soxr_lq", "soxr_qq", "fft", "polyphase")
+DEFAULT_RESAMPLER = "soxr_hq"
+SEPARATED_DIR = os.path.join("data", "separated")
+
+def stem_color(stem_name, index):
+    """Display colour for the index-th stem of a song"""
+    return STEM_COLORS.get(stem_name, STEM_PALETTE[index % len(STEM_PALETTE)])
+
+def store_paths(stem_folder, sample_rate):
+    """Matrix file and sidecar index for a stem folder at one sample rate"""
+    base = os.path.join(stem_folder, f"stems_{sample_rate}")
+    return base + ".f32.npy", base + ".json"
+
+def to_stereo(audio):
+    """(n_samples, channels) audio as contiguous (n_samples, 2) float32"""
+    if audio.shape[1] == 1:
+        audio = np.repeat(audio, 2, axis=1)
+    elif audio.shape[1] > 2:
+        audio = audio[:, :2]
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+def decode_stem_file(stem_path, sample_rate, resampler=DEFAULT_RESAMPLER):
+    """Decode one stem WAV to (n_samples, 2) float32; returns (audio, how)
+
+    soundfile reads the file directly and librosa is only used to resample
+    when the file's rate differs from the engine's. Formats soundfile cannot
+    read fall back to librosa.load.
+    """
+    try:
+        audio, sr = sf.read(stem_path, dtype='float32', always_2d=True)
+    except Exception:
+        audio, sr = librosa.load(stem_path, sr=sample_rate, mono=False, res_type=resampler)
+        audio = audio[:, np.newaxis] if audio.ndim == 1 else audio.T
+        return to_stereo(audio), "librosa"
+
+    if sr == sample_rate:
+        return to_stereo(audio), "soundfile"
+
+    # librosa resamples along the last axis, so work channel-major
+    resampled = librosa.resample(np.ascontiguousarray(audio.T), orig_sr=sr,
+                                 target_sr=sample_rate, res_type=resampler)
+    return to_stereo(resampled.T), f"{resampler} {sr}->{sample_rate}"
+
+def decode_stem_files(stem_folder, sample_rate, stem_names=None,
+                      resampler=DEFAULT_RESAMPLER, workers=None, timings=None):
+    """Decode the separated WAVs into (n_samples, 2) float32 arrays
+
+    Without stem_names, every stem of the folder's stem set is decoded
+    (4 for htdemucs, 6 for htdemucs_6s, 2 for a vocals/no_vocals split).
+    Stems decode concurrently on a thread pool (soundfile and the resamplers
+    release the GIL). Per-stem decode times in seconds are printed and, when
+    a dict is given as `timings`, stored in it with the total under "total".
+    """
+    if resampler not in RESAMPLERS:
+        raise ValueError(f"Unsupported resampler: {resampler}")
+    if stem_names is None:
+        stem_names = find_stem_set(stem_folder) or STEM_NAMES
+
+    def decode(stem_name):
+        stem_path = os.path.join(stem_folder, f"{stem_name}.wav")
+        if not os.path.exists(stem_path):
+            print(f"⚠️ {stem_name} file not found at {stem_path}")
+            return None
+        started = time.perf_counter()
+        try:
+            audio, how = decode_stem_file(stem_path, sample_rate, resampler)
+        except Exception as e:
+            print(f"❌ Error loading {stem_name}: {e}")
+            return None  # Continue with other stems
+        elapsed = time.perf_counter() - started
+
+        if len(audio) == 0:
+            print(f"⚠️ Warning: {stem_name} is empty, skipping")
+            return None
+        print(f"⏱️ {stem_name}: {elapsed * 1000:.0f} ms ({how})")
+        return audio, elapsed
+
+    started = time.perf_counter()
+    if workers is None:
+        workers = len(stem_names)
+    if workers > 1 and len(stem_names) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(decode, stem_names))
+    else:
+        results = [decode(stem_name) for stem_name in stem_names]
+    total = time.perf_counter() - started
+
+    loaded_stems = {}
+    for stem_name, result in zip(stem_names, results):
+        if result is not None:
+            loaded_stems[stem_name] = result[0]
+            if timings is not None:
+                timings[stem_name] = round(result[1], 4)
+    if timings is not None:
+        timings["total"] = round(total, 4)
+    print(f"⏱️ Decoded {len(loaded_stems)} stems in {total * 1000:.0f} ms")
+    return loaded_stems
+
+def write_stem_store(stem_folder, sample_rate, stems):
+    """Write decoded stems as one padded (n_stems, n_samples, 2) float32 file"""
+    matrix_path, index_path = store_paths(stem_folder, sample_rate)
+    stem_names = list(stems)
+    max_length = max(len(audio) for audio in stems.values())
+
+    # Write to a temp file first so readers never see a half-written store
+    temp_path = matrix_path + ".tmp.npy"
+    matrix = np.lib.format.open_memmap(temp_path, mode='w+', dtype=np.float32,
+                                       shape=(len(stem_names), max_length, 2))
+    for i, stem_name in enumerate(stem_names):
+        audio = stems[stem_name]
+        matrix[i, :len(audio)] = audio
+        matrix[i, len(audio):] = 0
+    matrix.flush()
+    del matrix
+    os.replace(temp_path, matrix_path)
+
+    with open(index_path, 'w') as f:
+        json.dump({"stem_names": stem_names, "sample_rate": sample_rate,
+                   "n_samples": max_length}, f, indent=2)
+
+def open_stem_store(stem_folder, sample_rate):
+    """Memory-map a pre-decoded store, or None if missing or older than the WAVs
+
+    Returns (stem_names, matrix) where matrix is a read-only np.memmap, so
+    reloading costs almost nothing and the OS page cache is shared between
+    decks and processes.
+    """
+    matrix_path, index_path = store_paths(stem_folder, sample_rate)
+    if not (os.path.exists(matrix_path) and os.path.exists(index_path)):
+        return None
+
+    try:
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+
+        # Re-separated stems invalidate the store
+        store_time = os.path.getmtime(matrix_path)
+        for stem_name in index["stem_names"]:
+            stem_path = os.path.join(stem_folder, f"{stem_name}.wav")
+            if os.path.exists(stem_path) and os.path.getmtime(stem_path) > store_time:
+                return None
+
+        matrix = np.load(matrix_path, mmap_mode='r')
+        if matrix.shape[0] != len(index["stem_names"]):
+            return None
+        return index["stem_names"], matrix
+
+    except Exception as e:
+        print(f"⚠️ Could not open stem store in {stem_folder}: {e}")
+        return None
+
+def convert_song(stem_folder, sample_rate=44100, resampler=DEFAULT_RESAMPLER):
+    """One-time conversion of a separated song into an engine-ready store"""
+    if open_stem_store(stem_folder, sample_rate) is not None:
+        return False
+
+    stems = decode_stem_files(stem_folder, sample_rate, resampler=resampler)
+    if not stems:
+        return False
+
+    write_stem_store(stem_folder, sample_rate, stems)
+    return True
+
+if __name__ == "__main__":
+    import sys
+    from app.audio_backend import get_backend, negotiate_sample_rate
+
+    # The device is only asked for its rate when none is given
+    rate = int(sys.argv[1]) if len(sys.argv) > 1 else negotiate_sample_rate(get_backend())
+    if not os.path.exists(SEPARATED_DIR):
+        print(f"❌ No separated songs found in {SEPARATED_DIR}")
+    else:
+        print(f"🎚️ Converting stems at {rate} Hz")
+        for model in sorted(os.listdir(SEPARATED_DIR)):
+            model_dir = os.path.join(SEPARATED_DIR, model)
+            if not os.path.isdir(model_dir):
+                continue
+            for song_name in sorted(os.listdir(model_dir)):
+                folder = os.path.join(model_dir, song_name)
+                if os.path.isdir(folder):
+                    if convert_song(folder, rate):
+                        print(f"✅ Converted {model}/{song_name}")
+                    else:
+                        print(f"⏭️ {model}/{song_name} already converted (or no stems)")
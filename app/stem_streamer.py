@@ -0,0 +1,179 @@
+import numpy as np
+import threading
+import time
+from app.stream_effects import FractionalReader
+
+class DiskStemStreamer:
+    """Streams a pre-decoded stem store from disk through a ring buffer
+
+    A reader thread keeps the ring filled `prefetch_seconds` ahead of the
+    playhead; the audio callback reads from it without locks. The ring is a
+    sliding window over absolute sample positions: position p lives at
+    ring[:, p % capacity] and maps to file sample p % n_samples, so looping
+    is just reading past the end.
+
+    Only the reader thread moves the window; the callback only reports how
+    far it has played via release(). Seeks bump a sequence counter around
+    the window reset so a read that overlaps one is discarded.
+    """
+    def __init__(self, store_path, sample_rate=44100, prefetch_seconds=5.0,
+                 history_seconds=0.5, chunk_seconds=0.1):
+        self.store_path = store_path
+
+        # Only the header is needed - samples are read explicitly from the file
+        header = np.load(store_path, mmap_mode='r')
+        self.n_stems, self.n_samples = header.shape[:2]
+        self.data_offset = header.offset
+        del header
+
+        self.history = int(history_seconds * sample_rate)
+        self.chunk_size = max(1024, int(chunk_seconds * sample_rate))
+        self.capacity = int(prefetch_seconds * sample_rate) + self.history + self.chunk_size
+        self.ring = np.zeros((self.n_stems, self.capacity, 2), dtype=np.float32)
+        self.reader = FractionalReader(self.n_stems, 2048)
+
+        # Window of valid absolute positions [window_start, window_end)
+        self.window_start = 0
+        self.window_end = 0
+        self.sequence = 0  # Odd while the reader is resetting the window
+        self.consumed_position = 0
+
+        # Seek requests are (generation, position); each side tracks what it has handled
+        self.seek_request = (0, 0)
+        self.reader_generation = 0
+        self.consumer_generation = 0
+
+        self.underruns = 0
+        self.running = False
+        self.thread = None
+        self.file = None
+
+    def start(self, position=0):
+        """Open the store and start prefetching from a position"""
+        self.file = open(self.store_path, 'rb')
+        self.window_start = self.window_end = position
+        self.consumed_position = position
+        self.running = True
+        self.thread = threading.Thread(target=self.reader_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the reader thread and close the file"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def seek(self, position):
+        """Request a refill at a new position (safe from any thread)"""
+        generation = self.seek_request[0] + 1
+        self.seek_request = (generation, int(position))
+
+    def poll_seek(self):
+        """Consumer side: new playhead position if a seek arrived, else None"""
+        generation, position = self.seek_request
+        if generation == self.consumer_generation:
+            return None
+        self.consumer_generation = generation
+        self.consumed_position = position
+        return position
+
+    def release(self, position):
+        """Consumer side: everything before position - history may be overwritten"""
+        self.consumed_position = position
+
+    def read(self, start, count, out):
+        """Copy absolute samples [start, start + count) into out (n_stems, count, 2)"""
+        sequence = self.sequence
+        if sequence % 2 or start < self.window_start or start + count > self.window_end:
+            self.underruns += 1
+            out.fill(0)
+            return False
+
+        index = start % self.capacity
+        first = min(count, self.capacity - index)
+        out[:, :first] = self.ring[:, index:index + first]
+        if first < count:
+            out[:, first:] = self.ring[:, :count - first]
+
+        if sequence != self.sequence:
+            out.fill(0)
+            return False
+        return True
+
+    def read_fractional(self, start, step, count, out, cubic=False):
+        """Interpolated read at a fractional position and rate (see FractionalReader)"""
+        # Cubic reads also use the sample before each position. History behind
+        # the playhead covers it, except right after a seek or start, where
+        # one stale tap is inaudible next to the jump itself
+        first = int(np.floor(start))
+        last = int(np.floor(start + step * (count - 1))) + (2 if cubic else 1)
+
+        sequence = self.sequence
+        if sequence % 2 or first < self.window_start or last >= self.window_end:
+            self.underruns += 1
+            out.fill(0)
+            return False
+
+        # Ring indices wrap at capacity, which is exactly where the window wraps
+        self.reader.read(self.ring, start, step, count, out, cubic)
+
+        if sequence != self.sequence:
+            out.fill(0)
+            return False
+        return True
+
+    def buffered_samples(self, position):
+        """How far ahead of position the ring is filled"""
+        return max(0, self.window_end - position)
+
+    def reader_loop(self):
+        while self.running:
+            generation, target = self.seek_request
+            if generation != self.reader_generation:
+                self.reader_generation = generation
+                if not (self.window_start <= target < self.window_end):
+                    self.reset_window(target)
+
+            # Oldest sample that must be kept around for the consumer
+            keep_from = max(self.window_start, self.consumed_position - self.history)
+            keep_from = min(keep_from, self.window_end)
+            free = self.capacity - (self.window_end - keep_from)
+
+            if free < self.chunk_size:
+                time.sleep(0.005)
+                continue
+
+            self.window_start = keep_from
+            self.fill_chunk(self.window_end, self.chunk_size)
+            self.window_end += self.chunk_size
+
+    def reset_window(self, target):
+        """Empty the window and restart it at target"""
+        self.sequence += 1
+        # Collapse first so the window is never larger than its valid data
+        self.window_end = self.window_start
+        if target >= self.window_start:
+            self.window_start = target
+            self.window_end = target
+        else:
+            self.window_end = target
+            self.window_start = target
+        self.sequence += 1
+
+    def fill_chunk(self, position, count):
+        """Read count samples at absolute position from disk into the ring"""
+        done = 0
+        while done < count:
+            file_index = (position + done) % self.n_samples
+            ring_index = (position + done) % self.capacity
+            n = min(count - done, self.n_samples - file_index, self.capacity - ring_index)
+
+            for stem in range(self.n_stems):
+                # Each stem is contiguous in the store: (n_stems, n_samples, 2)
+                self.file.seek(self.data_offset + (stem * self.n_samples + file_index) * 8)
+                self.file.readinto(memoryview(self.ring[stem, ring_index:ring_index + n]).cast('B'))
+            done += n
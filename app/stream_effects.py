@@ -0,0 +1,328 @@
+import numpy as np
+
+
+class StreamingTimePitch:
+    """Block-based WSOLA time-stretch and pitch-shift for stem playback.
+
+    Works directly on stem blocks shaped (n_stems, n_samples, 2) so that all
+    stems share the same grain positions and stay sample-locked. Pitch is
+    shifted by reading the source at a fractional rate, and tempo is then
+    corrected by WSOLA grain placement. Memory use is a few grains per stem
+    no matter how long the track is.
+    """
+    def __init__(self, n_stems, frame_size=1024, tolerance=256):
+        self.n_stems = n_stems
+        self.frame_size = frame_size
+        self.hop = frame_size // 2
+        self.tolerance = tolerance
+
+        # Periodic Hann window sums to 1 at 50% overlap
+        window = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame_size) / frame_size)
+        self.window = window.astype(np.float32).reshape(1, frame_size, 1)
+
+        # Region read per grain: search range plus the natural continuation
+        self.region_size = frame_size + self.hop + 2 * tolerance
+        self.region = np.zeros((n_stems, self.region_size, 2), dtype=np.float32)
+        self.mono = np.zeros(self.region_size, dtype=np.float32)
+        self.windowed = np.zeros((n_stems, frame_size, 2), dtype=np.float32)
+        self.overlap = np.zeros((n_stems, frame_size, 2), dtype=np.float32)
+        self.template = np.zeros(frame_size, dtype=np.float32)
+        self.has_template = False
+
+        # Coarse search runs on every 4th sample
+        self.search_step = 4
+        span = 2 * tolerance + 1
+        self.n_lags = len(range(0, frame_size + span - 1, self.search_step)) - frame_size // self.search_step + 1
+        self.squares = np.zeros(len(range(0, self.region_size, self.search_step)), dtype=np.float32)
+        self.energy = np.zeros(len(self.squares) + 1, dtype=np.float32)
+        self.norm = np.zeros(self.n_lags, dtype=np.float32)
+
+        # The coarse correlation is one matrix-vector product: each row of
+        # `lags` is the decimated region at one lag, gathered through a
+        # sliding view of `coarse_mono`, so no grain allocates
+        count = frame_size // self.search_step
+        self.coarse_mono = np.zeros(len(self.squares), dtype=np.float32)
+        self.coarse_template = np.zeros(count, dtype=np.float32)
+        self.lag_view = np.lib.stride_tricks.sliding_window_view(self.coarse_mono, count)[:self.n_lags]
+        self.lags = np.zeros((self.n_lags, count), dtype=np.float32)
+        self.corr = np.zeros(self.n_lags, dtype=np.float32)
+
+        # Output FIFO holds finished samples waiting for the callback; it is
+        # consumed from fifo_start and only compacted when the end is reached
+        self.fifo_capacity = 2 * 8192 + frame_size
+        self.fifo = np.zeros((n_stems, self.fifo_capacity, 2), dtype=np.float32)
+        self.fifo_start = 0
+        self.fifo_length = 0
+
+        self.params = (1.0, 1.0)  # (speed, pitch ratio)
+        self.read_position = 0.0
+        self.position = 0.0
+
+        # Optional (start, end) loop in source samples; both pointers wrap at
+        # its end, and read_source is expected to wrap reads that cross it
+        self.loop = None
+
+    def set_params(self, speed=1.0, pitch_shift=0):
+        """Set tempo ratio and pitch shift in semitones, applied at the next grain"""
+        self.params = (float(speed), float(2.0 ** (pitch_shift / 12.0)))
+
+    def reset(self, position):
+        """Restart processing at a source sample position"""
+        self.read_position = float(position)
+        self.position = float(position)
+        self.overlap.fill(0)
+        self.fifo_start = 0
+        self.fifo_length = 0
+        self.has_template = False
+
+    def process(self, read_source, frames):
+        """Return the next `frames` output samples as a (n_stems, frames, 2) view
+
+        `read_source(start, step, count, out)` must fill `out` with stems read
+        from fractional source position `start` advancing `step` per sample.
+        The view is only valid until the next call.
+        """
+        while self.fifo_length < frames:
+            self._synthesize_grain(read_source)
+
+        out = self.fifo[:, self.fifo_start:self.fifo_start + frames]
+        self.fifo_start += frames
+        self.fifo_length -= frames
+
+        # The audible playhead advances by `speed` source samples per output sample
+        self.position += frames * self.params[0]
+        loop = self.loop
+        if loop is not None and loop[0] <= self.position - frames * self.params[0] < loop[1] <= self.position:
+            self.position -= loop[1] - loop[0]
+        return out
+
+    def _synthesize_grain(self, read_source):
+        speed, ratio = self.params
+        tol = self.tolerance
+        n = self.frame_size
+
+        # Read the search region at the pitch ratio (one read covers every stem)
+        start = self.read_position - tol * ratio
+        read_source(start, ratio, self.region_size, self.region)
+        mono = np.sum(self.region, axis=(0, 2), out=self.mono)
+
+        if self.has_template:
+            delta = self._best_offset(mono)
+        else:
+            delta = tol
+
+        segment = self.region[:, delta:delta + n]
+        np.multiply(segment, self.window, out=self.windowed)
+        self.overlap += self.windowed
+
+        # Move unread output to the front once the FIFO end is reached
+        hop = self.hop
+        if self.fifo_start + self.fifo_length + hop > self.fifo_capacity:
+            end = self.fifo_start + self.fifo_length
+            self.fifo[:, :self.fifo_length] = self.fifo[:, self.fifo_start:end]
+            self.fifo_start = 0
+
+        # First hop of the accumulator is complete
+        write = self.fifo_start + self.fifo_length
+        self.fifo[:, write:write + hop] = self.overlap[:, :hop]
+        self.fifo_length += hop
+        self.overlap[:, :n - hop] = self.overlap[:, hop:]
+        self.overlap[:, n - hop:] = 0
+
+        # Natural continuation of the chosen grain is the next template
+        self.template[:] = mono[delta + hop:delta + hop + n]
+        self.has_template = True
+
+        # Advance by one synthesis hop of output time, expressed in source samples
+        previous = self.read_position
+        self.read_position += speed * hop
+        loop = self.loop
+        if loop is not None and loop[0] <= previous < loop[1] <= self.read_position:
+            self.read_position -= loop[1] - loop[0]
+
+    def _best_offset(self, mono):
+        """Offset within the search region that best continues the last grain"""
+        n = self.frame_size
+        span = 2 * self.tolerance + 1
+
+        # Decimated search keeps the correlation cheap enough for the callback
+        step = self.search_step
+        np.copyto(self.coarse_mono, mono[::step])
+        np.copyto(self.coarse_template, self.template[::step])
+        np.copyto(self.lags, self.lag_view)
+        corr = np.dot(self.lags, self.coarse_template, out=self.corr)
+
+        # Sliding window energy from a running sum, into preallocated buffers
+        count = n // step
+        np.square(self.coarse_mono, out=self.squares)
+        np.cumsum(self.squares, out=self.energy[1:])
+        norm = self.norm
+        np.subtract(self.energy[count:count + self.n_lags], self.energy[:self.n_lags], out=norm)
+        np.maximum(norm, 0, out=norm)
+        np.sqrt(norm, out=norm)
+        norm += 1e-9
+        np.divide(corr, norm, out=corr)
+        coarse = int(np.argmax(corr)) * step
+
+        # Refine around the coarse peak at full resolution
+        lo = max(0, coarse - step)
+        hi = min(span - 1, coarse + step)
+        best, best_score = coarse, -np.inf
+        template_energy = np.dot(self.template, self.template) + 1e-9
+        for offset in range(lo, hi + 1):
+            window = mono[offset:offset + n]
+            score = np.dot(window, self.template) / np.sqrt(np.dot(window, window) * template_energy + 1e-9)
+            if score > best_score:
+                best, best_score = offset, score
+        return best
+
+
+class FractionalReader:
+    """Linear- or cubic-interpolated reads from a (n_stems, n_samples, 2) buffer into preallocated scratch"""
+    def __init__(self, n_stems, max_count, cubic=False):
+        self.n_stems = n_stems
+        self.max_count = max_count
+        self.ramp = np.arange(max_count, dtype=np.float64)
+        self.positions = np.zeros(max_count, dtype=np.float64)
+        self.floor = np.zeros(max_count, dtype=np.float64)
+        self.frac32 = np.zeros(max_count, dtype=np.float32)
+        self.frac = np.zeros((max_count, 2), dtype=np.float32)
+        self.index = np.zeros(max_count, dtype=np.int64)
+        self.next_index = np.zeros(max_count, dtype=np.int64)
+
+        # Flat so any count can be viewed as a contiguous (n_stems, count, 2)
+        # block - np.take needs a contiguous out to avoid a temporary
+        size = n_stems * max_count * 2
+        self.gather_a = np.zeros(size, dtype=np.float32)
+        self.gather_b = np.zeros(size, dtype=np.float32)
+        self.raw_a = self.gather_a
+        self.raw_b = self.gather_b
+
+        # The two outer taps and a coefficient buffer for cubic reads, made
+        # on first use (see enable_cubic) so linear readers stay small
+        self.cubic = None
+        if cubic:
+            self.enable_cubic()
+
+    def enable_cubic(self):
+        """Allocate the cubic scratch now rather than inside the first cubic read"""
+        if self.cubic is None:
+            size = self.n_stems * self.max_count * 2
+            self.cubic = {
+                "prev_index": np.zeros(self.max_count, dtype=np.int64),
+                "after_index": np.zeros(self.max_count, dtype=np.int64),
+                "gather_p": np.zeros(size, dtype=np.float32),
+                "gather_q": np.zeros(size, dtype=np.float32),
+                "raw_p": np.zeros(size, dtype=self.raw_a.dtype),
+                "raw_q": np.zeros(size, dtype=self.raw_a.dtype),
+                "coeff": np.zeros(size, dtype=np.float32),
+            }
+
+    def read(self, buffer, start, step, count, out, cubic=False):
+        """Fill out with buffer sampled from `start` every `step` samples, wrapping at the end
+
+        Cubic reads use a 4-point Hermite spline through the two samples on
+        either side of each position; linear reads use the nearest two.
+        """
+        if count > self.max_count:
+            self.__init__(self.n_stems, count, cubic=self.cubic is not None)
+
+        # Compact stems are gathered in their own dtype, then converted
+        if self.raw_a.dtype != buffer.dtype:
+            if buffer.dtype == np.float32:
+                self.raw_a, self.raw_b = self.gather_a, self.gather_b
+            else:
+                self.raw_a = np.zeros(len(self.gather_a), dtype=buffer.dtype)
+                self.raw_b = np.zeros(len(self.gather_b), dtype=buffer.dtype)
+            if self.cubic is not None:
+                self.cubic = None
+                self.enable_cubic()
+
+        positions = self.positions[:count]
+        np.multiply(self.ramp[:count], step, out=positions)
+        positions += start
+        floor = self.floor[:count]
+        np.floor(positions, out=floor)
+        np.subtract(positions, floor, out=positions)
+        np.copyto(self.frac32[:count], positions, casting='same_kind')
+        frac = self.frac[:count]
+        np.copyto(frac, self.frac32[:count, None])
+
+        index = self.index[:count]
+        np.copyto(index, floor, casting='unsafe')
+        next_index = self.next_index[:count]
+        np.add(index, 1, out=next_index)
+
+        # mode='wrap' maps indices onto the buffer without a temporary
+        shape = (self.n_stems, count, 2)
+        size = self.n_stems * count * 2
+        raw_a = self.raw_a[:size].reshape(shape)
+        raw_b = self.raw_b[:size].reshape(shape)
+        np.take(buffer, index, axis=1, out=raw_a, mode='wrap')
+        np.take(buffer, next_index, axis=1, out=raw_b, mode='wrap')
+
+        a = self.gather_a[:size].reshape(shape)
+        b = self.gather_b[:size].reshape(shape)
+        if raw_a is not a:
+            np.copyto(a, raw_a)
+            np.copyto(b, raw_b)
+
+        if cubic:
+            self.hermite(buffer, index, frac, a, b, shape, size, out)
+            return
+
+        # out = a + (b - a) * frac, per stem so frac never broadcasts over stems
+        np.subtract(b, a, out=out)
+        for stem in range(self.n_stems):
+            np.multiply(out[stem], frac, out=out[stem])
+        np.add(out, a, out=out)
+
+    def hermite(self, buffer, index, frac, a, b, shape, size, out):
+        """out = 4-point Hermite interpolation between a and b (Horner form)"""
+        self.enable_cubic()
+        scratch = self.cubic
+        count = shape[1]
+        prev_index = scratch["prev_index"][:count]
+        np.subtract(index, 1, out=prev_index)
+        after_index = scratch["after_index"][:count]
+        np.add(index, 2, out=after_index)
+
+        raw_p = scratch["raw_p"][:size].reshape(shape)
+        raw_q = scratch["raw_q"][:size].reshape(shape)
+        np.take(buffer, prev_index, axis=1, out=raw_p, mode='wrap')
+        np.take(buffer, after_index, axis=1, out=raw_q, mode='wrap')
+        p = scratch["gather_p"][:size].reshape(shape)
+        q = scratch["gather_q"][:size].reshape(shape)
+        if raw_p is not p:
+            np.copyto(p, raw_p)
+            np.copyto(q, raw_q)
+        c = scratch["coeff"][:size].reshape(shape)
+
+        # Samples p, a, b, q at offsets -1, 0, 1, 2:
+        # out = ((c3 * t + c2) * t + c1) * t + a
+        # c3 = 0.5 (q - p) + 1.5 (a - b)
+        np.subtract(q, p, out=out)
+        out *= 0.5
+        np.subtract(a, b, out=c)
+        c *= 1.5
+        out += c
+        # c2 = p - 2.5 a + 2 b - 0.5 q (q is not needed after this)
+        np.multiply(a, -2.5, out=c)
+        c += p
+        c += b
+        c += b
+        q *= -0.5
+        c += q
+        self.multiply_frac(out, frac)
+        out += c
+        # c1 = 0.5 (b - p)
+        np.subtract(b, p, out=c)
+        c *= 0.5
+        self.multiply_frac(out, frac)
+        out += c
+        self.multiply_frac(out, frac)
+        out += a
+
+    def multiply_frac(self, block, frac):
+        for stem in range(self.n_stems):
+            np.multiply(block[stem], frac, out=block[stem])
@@ -0,0 +1,56 @@
+# python -m bench.beat_loops
+
+import numpy as np
+from app.mixer_engine import MasterMixerEngine
+from app.audio_backend import get_backend
+from app.beat_grid import BeatGrid
+from bench.callback_blocks import BLOCK_SIZES, STEM_NAMES, time_blocks
+
+N_DECKS = 4
+
+def make_mixer(duration=60.0, sample_rate=44100):
+    """Mixer with every deck loaded and playing synthetic stems on a 128 bpm grid"""
+    rng = np.random.default_rng(0)
+    n_samples = int(duration * sample_rate)
+    stems = {name: (rng.standard_normal((n_samples, 2)) * 0.05).astype(np.float32)
+             for name in STEM_NAMES}
+
+    mixer = MasterMixerEngine(n_decks=N_DECKS, sample_rate=sample_rate, backend=get_backend("null"))
+    for deck in mixer.decks:
+        deck.load_stem_arrays(stems)
+        deck.beat_grid = BeatGrid(128, sample_rate)
+        deck.is_playing = True
+    return mixer
+
+def run(iterations=5000):
+    mixer = make_mixer()
+    callback = lambda out, n: mixer.audio_callback(out, n, None, None)
+    results = []
+
+    for frames in BLOCK_SIZES:
+        for deck in mixer.decks:
+            deck.exit_loop()
+            deck.set_position_seconds(10.0)
+        plain = time_blocks(callback, frames, iterations)
+
+        # Shortest loop wraps most often - the worst case
+        for deck in mixer.decks:
+            deck.set_position_seconds(10.0)
+            deck.set_loop(1)
+        looped = time_blocks(callback, frames, iterations)
+
+        results.append({
+            "decks": N_DECKS,
+            "frames": frames,
+            "plain_mean_us": round(float(np.mean(plain)), 2),
+            "looped_mean_us": round(float(np.mean(looped)), 2),
+            "looped_p99_us": round(float(np.percentile(looped, 99)), 2),
+            "overhead_pct": round((float(np.mean(looped)) / float(np.mean(plain)) - 1) * 100, 1),
+        })
+    return results
+
+if __name__ == "__main__":
+    print(f"{'decks':>5} {'frames':>6} {'plain':>9} {'looped':>9} {'p99':>9} {'overhead':>9}")
+    for r in run():
+        print(f"{r['decks']:>5} {r['frames']:>6} {r['plain_mean_us']:>8.1f}u {r['looped_mean_us']:>8.1f}u "
+              f"{r['looped_p99_us']:>8.1f}u {r['overhead_pct']:>8.1f}%")
@@ -0,0 +1,105 @@
+# python -m bench.callback_allocations   (exits non-zero if the callback allocates)
+
+import sys
+import itertools
+import tracemalloc
+import numpy as np
+from bench.callback_blocks import make_engine
+
+CALLBACKS = 100000
+WARMUP = 2000
+FRAMES = 256
+
+# tracemalloc's own bookkeeping and a few interned ints can show up as noise
+NET_TOLERANCE = 2048
+
+def measure(callback, frames=FRAMES, iterations=CALLBACKS):
+    """(net_bytes, peak_bytes) allocated by `iterations` callbacks after a warm-up"""
+    outdata = np.zeros((frames, 2), dtype=np.float32)
+    for _ in range(WARMUP):
+        callback(outdata, frames, None, None)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in range(iterations):
+        callback(outdata, frames, None, None)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return after - before, peak - before
+
+def ramping(engine):
+    """Callback that sees a gain change every block, so each one is ramped"""
+    def callback(outdata, frames, time, status):
+        engine.gain_ramp.retarget()
+        engine.audio_callback(outdata, frames, time, status)
+    return callback
+
+def turning(engine, stem_name):
+    """Callback that sees a new EQ design for a stem every block, as while a knob moves
+
+    The designs are made up front: redesigning is the GUI thread's work,
+    installing the design (and remapping filter state) is the callback's.
+    """
+    chain = engine.eq_chain(stem_name)
+    designs = []
+    for low, high, sweep in ((-12.0, 0.0, 0.0), (-6.0, 3.0, 0.5), (0.0, 3.0, -0.4)):
+        chain.set_eq(low=low, high=high)
+        chain.set_sweep(sweep)
+        designs.append(chain.design)
+    designs = itertools.cycle(designs)
+
+    def callback(outdata, frames, time, status):
+        chain.design = next(designs)
+        engine.audio_callback(outdata, frames, time, status)
+    return callback
+
+def run(iterations=CALLBACKS):
+    cases = []
+
+    engine = make_engine(duration=10.0)
+    cases.append(("direct", engine, engine.audio_callback))
+
+    compact = make_engine(duration=10.0, storage_dtype="int16")
+    cases.append(("direct int16", compact, compact.audio_callback))
+
+    filtered = make_engine(duration=10.0, read_only=True)
+    filtered.set_eq("drums", low=-12.0, high=3.0)
+    filtered.set_filter("vocals", 0.5)
+    filtered.set_filter(None, -0.3)
+    cases.append(("direct eq", filtered, filtered.audio_callback))
+
+    knobs = make_engine(duration=10.0, read_only=True)
+    cases.append(("eq knob", knobs, turning(knobs, "drums")))
+
+    # Filtered and dry stems both take the ramped path
+    ramped = make_engine(duration=10.0, read_only=True)
+    ramped.set_eq("drums", low=-12.0)
+    cases.append(("gain ramp", ramped, ramping(ramped)))
+
+    vinyl = make_engine(duration=10.0)
+    vinyl.set_interpolation("cubic")
+    vinyl.set_varispeed(1.04)
+    vinyl.set_pitch_bend(-0.01)
+    cases.append(("varispeed", vinyl, vinyl.audio_callback))
+
+    stretched = make_engine(duration=10.0)
+    stretched.apply_effects_to_stems(speed=1.05, pitch_shift=2)
+    cases.append(("stretch", stretched, stretched.audio_callback))
+
+    results = []
+    for name, engine, callback in cases:
+        net, peak = measure(callback, iterations=iterations)
+        results.append({"case": name, "callbacks": iterations,
+                        "net_bytes": net, "peak_bytes": peak,
+                        "ok": net <= NET_TOLERANCE})
+        engine.cleanup()
+    return results
+
+if __name__ == "__main__":
+    results = run()
+    print(f"{'case':<14} {'callbacks':>9} {'net':>8} {'peak':>8}")
+    for r in results:
+        print(f"{r['case']:<14} {r['callbacks']:>9} {r['net_bytes']:>7}B {r['peak_bytes']:>7}B"
+              f"  {'ok' if r['ok'] else 'ALLOCATES'}")
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
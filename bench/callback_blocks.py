@@ -0,0 +1,89 @@
+# python -m bench.callback_blocks
+
+import time
+import numpy as np
+from app.sounddevice_audio_engine import RealTimeStemAudioEngine, stack_stems
+from app.audio_backend import get_backend
+
+BLOCK_SIZES = [64, 128, 256, 512]
+STEM_NAMES = ["vocals", "drums", "bass", "other"]
+
+def make_engine(duration=240.0, sample_rate=44100, read_only=False, **engine_options):
+    """Engine loaded with deterministic synthetic stems, ready to call back
+
+    read_only loads them as load_song_stems does: a read-only matrix in the
+    engine's storage dtype, like a mapped stem store or registry entry.
+    """
+    rng = np.random.default_rng(0)
+    n_samples = int(duration * sample_rate)
+    stems = {name: (rng.standard_normal((n_samples, 2)) * 0.1).astype(np.float32)
+             for name in STEM_NAMES}
+
+    # The bench calls the callback itself - no sound card involved
+    engine_options.setdefault("backend", get_backend("null"))
+    engine = RealTimeStemAudioEngine(sample_rate=sample_rate, **engine_options)
+    if read_only:
+        stem_names, matrix = stack_stems(stems)
+        matrix = engine.compact(matrix)
+        matrix.setflags(write=False)
+        engine.set_stem_matrix(stem_names, matrix)
+    else:
+        engine.load_stem_arrays(stems)
+    engine.is_playing = True
+    return engine
+
+def legacy_callback(engine, outdata, frames):
+    """The per-stem Python loop the matrix kernel replaced, for comparison"""
+    outdata.fill(0)
+    current_pos = engine.current_position
+    for stem_name, audio in engine.processed_stems.items():
+        volume = engine.volumes.get(stem_name, 1.0)
+        if volume > 0.001 and len(audio) > current_pos:
+            to_copy = min(frames, len(audio) - current_pos)
+            outdata[:to_copy] += audio[current_pos:current_pos + to_copy] * volume
+    outdata *= engine.master_volume
+    np.clip(outdata, -0.95, 0.95, out=outdata)
+    engine.current_position += frames
+    max_len = max(len(audio) for audio in engine.processed_stems.values())
+    if engine.current_position >= max_len:
+        engine.current_position = 0
+
+def time_blocks(callback, frames, iterations):
+    """Per-block timings in microseconds"""
+    outdata = np.zeros((frames, 2), dtype=np.float32)
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        callback(outdata, frames)
+        timings[i] = time.perf_counter() - start
+    return timings * 1e6
+
+def run(iterations=5000):
+    engine = make_engine()
+    results = []
+
+    for frames in BLOCK_SIZES:
+        deadline_us = frames / engine.sample_rate * 1e6
+
+        engine.current_position = 0
+        matrix = time_blocks(lambda out, n: engine.audio_callback(out, n, None, None), frames, iterations)
+        engine.current_position = 0
+        legacy = time_blocks(lambda out, n: legacy_callback(engine, out, n), frames, iterations)
+
+        results.append({
+            "frames": frames,
+            "deadline_us": round(deadline_us, 1),
+            "matrix_mean_us": round(float(np.mean(matrix)), 2),
+            "matrix_p99_us": round(float(np.percentile(matrix, 99)), 2),
+            "legacy_mean_us": round(float(np.mean(legacy)), 2),
+            "legacy_p99_us": round(float(np.percentile(legacy, 99)), 2),
+            "deadline_used_pct": round(float(np.mean(matrix)) / deadline_us * 100, 2),
+        })
+    return results
+
+if __name__ == "__main__":
+    print(f"{'frames':>6} {'deadline':>9} {'matrix':>9} {'p99':>9} {'legacy':>9} {'p99':>9} {'used':>7}")
+    for r in run():
+        print(f"{r['frames']:>6} {r['deadline_us']:>8.0f}u {r['matrix_mean_us']:>8.1f}u "
+              f"{r['matrix_p99_us']:>8.1f}u {r['legacy_mean_us']:>8.1f}u {r['legacy_p99_us']:>8.1f}u "
+              f"{r['deadline_used_pct']:>6.2f}%")
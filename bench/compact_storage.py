@@ -0,0 +1,43 @@
+# python -m bench.compact_storage
+
+import numpy as np
+from bench.callback_blocks import BLOCK_SIZES, make_engine, time_blocks
+
+STORAGE_DTYPES = ["float32", "float16", "int16"]
+
+def run(iterations=5000, duration=240.0):
+    results = []
+    reference = None
+
+    for storage_dtype in STORAGE_DTYPES:
+        engine = make_engine(duration=duration, storage_dtype=storage_dtype)
+        callback = lambda out, n: engine.audio_callback(out, n, None, None)
+
+        # Worst-case conversion error against float32 storage
+        out = np.zeros((512, 2), dtype=np.float32)
+        engine.current_position = 0
+        callback(out, 512)
+        if reference is None:
+            reference = out.copy()
+        max_error = float(np.max(np.abs(out - reference)))
+
+        for frames in BLOCK_SIZES:
+            deadline_us = frames / engine.sample_rate * 1e6
+            engine.current_position = 0
+            timings = time_blocks(callback, frames, iterations)
+            results.append({
+                "storage": storage_dtype,
+                "resident_mb": round(engine.stem_matrix.nbytes / 1024 ** 2, 1),
+                "max_error": max_error,
+                "frames": frames,
+                "mean_us": round(float(np.mean(timings)), 2),
+                "p99_us": round(float(np.percentile(timings, 99)), 2),
+                "deadline_used_pct": round(float(np.percentile(timings, 99)) / deadline_us * 100, 2),
+            })
+    return results
+
+if __name__ == "__main__":
+    print(f"{'storage':>8} {'MB':>7} {'frames':>6} {'mean':>9} {'p99':>9} {'p99/deadline':>13} {'max err':>9}")
+    for r in run():
+        print(f"{r['storage']:>8} {r['resident_mb']:>7.1f} {r['frames']:>6} {r['mean_us']:>8.1f}u "
+              f"{r['p99_us']:>8.1f}u {r['deadline_used_pct']:>12.2f}% {r['max_error']:>9.2e}")
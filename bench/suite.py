@@ -0,0 +1,258 @@
+# python -m bench.suite [results.json] [--full]
+#
+# Times the engine's hot paths on deterministic synthetic stems shaped like
+# the tracks in data/metadata (duration and bpm) and prints or writes JSON,
+# so runs from different builds can be diffed. Tracks are capped at 60 s
+# unless --full is given.
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+import numpy as np
+import soundfile as sf
+from app.sounddevice_audio_engine import RealTimeStemAudioEngine
+from app.audio_backend import get_backend
+from app.render_cache import RenderCache
+from app.offline_render import wait_for_renders
+from bench.callback_blocks import BLOCK_SIZES, STEM_NAMES, time_blocks
+
+METADATA_DIR = os.path.join("data", "metadata")
+SAMPLE_RATE = 44100
+TRACK_LIMIT_SECONDS = 60.0
+EFFECT_SETTINGS = [(1.0, 0), (0.95, -1), (1.05, 2), (1.1, 0)]
+CALLBACK_ITERATIONS = 2000
+SEEKS = 50
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, or None if unknown"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, kilobytes elsewhere
+        return round(peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / 1024 ** 2, 1)
+    except ImportError:
+        return None
+
+def load_tracks(limit_seconds):
+    """(song_name, bpm, duration) for every track in data/metadata"""
+    tracks = []
+    for filename in sorted(os.listdir(METADATA_DIR)):
+        if filename.endswith(".json"):
+            with open(os.path.join(METADATA_DIR, filename), 'r') as f:
+                metadata = json.load(f)
+            duration = metadata.get("duration", 180.0)
+            if limit_seconds:
+                duration = min(duration, limit_seconds)
+            tracks.append((os.path.splitext(filename)[0], float(metadata.get("bpm", 120)), duration))
+    return tracks
+
+def synthetic_stems(song_name, bpm, duration, sample_rate=SAMPLE_RATE):
+    """Deterministic stereo stems with the track's length and tempo"""
+    rng = np.random.default_rng(zlib.crc32(song_name.encode()))
+    n_samples = int(duration * sample_rate)
+    t = np.arange(n_samples) / sample_rate
+
+    # Drums: decaying noise bursts on every beat
+    beat = 60.0 / bpm
+    envelope = np.exp(-(t % beat) * 30.0)
+    drums = rng.standard_normal(n_samples) * envelope * 0.3
+    bass = np.sin(2 * np.pi * 55.0 * t) * 0.3
+    vocals = np.sin(2 * np.pi * 220.0 * t + 3 * np.sin(2 * np.pi * 0.5 * t)) * 0.2
+    other = rng.standard_normal(n_samples) * 0.05
+
+    stems = {}
+    for name, mono in zip(STEM_NAMES, [vocals, drums, bass, other]):
+        stereo = np.stack([mono, np.roll(mono, 7)], axis=1)
+        stems[name] = stereo.astype(np.float32)
+    return stems
+
+def make_engine(**options):
+    return RealTimeStemAudioEngine(sample_rate=SAMPLE_RATE, backend=get_backend("null"),
+                                   render_cache=RenderCache(), **options)
+
+def bench_load(tracks):
+    """Cold load decodes the WAVs and writes the stem store; warm load maps it"""
+    results = []
+    for song_name, bpm, duration in tracks:
+        folder = os.path.join("data", "separated", "htdemucs", song_name)
+        os.makedirs(folder, exist_ok=True)
+        for name, audio in synthetic_stems(song_name, bpm, duration).items():
+            sf.write(os.path.join(folder, f"{name}.wav"), audio, SAMPLE_RATE, subtype="PCM_16")
+
+        timings = {}
+        for label in ("cold", "warm"):
+            engine = make_engine()
+            start = time.perf_counter()
+            engine.load_song_stems(f"{song_name}.mp3")
+            timings[label] = time.perf_counter() - start
+            if label == "cold":
+                stem_timings = engine.load_timings
+            engine.cleanup()
+
+        results.append({"track": song_name, "seconds": duration,
+                        "cold_s": round(timings["cold"], 4),
+                        "cold_stems_s": stem_timings,
+                        "warm_s": round(timings["warm"], 4),
+                        "peak_rss_mb": peak_rss_mb()})
+    return results
+
+def bench_effects(tracks):
+    """apply_effects_to_stems latency in streaming and full-render modes"""
+    song_name, bpm, duration = tracks[0]
+    stems = synthetic_stems(song_name, bpm, duration)
+    results = []
+
+    for effects_mode in ("stream", "render"):
+        engine = make_engine(effects_mode=effects_mode)
+        engine.load_stem_arrays(stems, song_name)
+        for speed, pitch in EFFECT_SETTINGS:
+            start = time.perf_counter()
+            engine.apply_effects_to_stems(speed, pitch)
+            returned = time.perf_counter() - start
+            if effects_mode == "render":
+                wait_for_renders([engine])
+            ready = time.perf_counter() - start
+            results.append({"mode": effects_mode, "track": song_name, "seconds": duration,
+                            "speed": speed, "pitch": pitch,
+                            "call_s": round(returned, 4), "ready_s": round(ready, 4),
+                            "peak_rss_mb": peak_rss_mb()})
+        engine.cleanup()
+    return results
+
+def bench_callback(tracks):
+    """audio_callback cost per block size, direct and through the stretcher"""
+    song_name, bpm, duration = tracks[0]
+    stems = synthetic_stems(song_name, bpm, duration)
+    results = []
+
+    for label, speed, pitch in (("direct", 1.0, 0), ("stretch", 1.05, 2)):
+        engine = make_engine()
+        engine.load_stem_arrays(stems, song_name)
+        engine.apply_effects_to_stems(speed, pitch)
+        engine.is_playing = True
+        callback = lambda out, n: engine.audio_callback(out, n, None, None)
+
+        for frames in BLOCK_SIZES:
+            engine.set_position_seconds(0)
+            timings = time_blocks(callback, frames, CALLBACK_ITERATIONS)
+            deadline_us = frames / SAMPLE_RATE * 1e6
+            results.append({"path": label, "frames": frames,
+                            "deadline_us": round(deadline_us, 1),
+                            "mean_us": round(float(np.mean(timings)), 2),
+                            "p99_us": round(float(np.percentile(timings, 99)), 2),
+                            "max_us": round(float(np.max(timings)), 2),
+                            "p99_deadline_pct": round(float(np.percentile(timings, 99)) / deadline_us * 100, 2)})
+        engine.cleanup()
+    return results
+
+def bench_seek(tracks):
+    """Time from set_position_seconds until the callback plays audio from the target"""
+    song_name, _, duration = tracks[0]
+    rng = np.random.default_rng(1)
+    targets = rng.uniform(0, duration * 0.9, SEEKS)
+    outdata = np.zeros((512, 2), dtype=np.float32)
+    results = []
+
+    for load_mode in ("memory", "stream"):
+        engine = make_engine(load_mode=load_mode)
+        engine.load_song_stems(f"{song_name}.mp3")
+        engine.is_playing = True
+        engine.audio_callback(outdata, 512, None, None)
+
+        latencies = []
+        for target in targets:
+            start = time.perf_counter()
+            engine.set_position_seconds(target)
+            # A streaming deck outputs silence until the ring refills
+            while True:
+                underruns = engine.streamer.underruns if engine.streamer else 0
+                engine.audio_callback(outdata, 512, None, None)
+                if not engine.streamer or engine.streamer.underruns == underruns:
+                    break
+                time.sleep(0.0005)
+            latencies.append(time.perf_counter() - start)
+        engine.cleanup()
+
+        latencies = np.array(latencies) * 1e3
+        results.append({"load_mode": load_mode, "seeks": SEEKS,
+                        "mean_ms": round(float(np.mean(latencies)), 3),
+                        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+                        "max_ms": round(float(np.max(latencies)), 3)})
+    return results
+
+def bench_waveforms(tracks):
+    """WaveformsPlayer.generate_waveforms on a loaded engine, without building the GUI"""
+    try:
+        from app.waveforms_player import RealTimeStemPlayer
+    except ImportError as e:
+        return [{"skipped": f"waveforms player unavailable: {e}"}]
+
+    results = []
+    for song_name, bpm, duration in tracks:
+        engine = make_engine()
+        engine.load_stem_arrays(synthetic_stems(song_name, bpm, duration), song_name)
+
+        # generate_waveforms only needs the engine and the stem list
+        player = RealTimeStemPlayer.__new__(RealTimeStemPlayer)
+        player.audio_engine = engine
+        player.stem_names = list(engine.stem_names)
+        start = time.perf_counter()
+        player.generate_waveforms()
+        results.append({"track": song_name, "seconds": duration,
+                        "time_s": round(time.perf_counter() - start, 4),
+                        "peak_rss_mb": peak_rss_mb()})
+        engine.cleanup()
+    return results
+
+def build_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def run(limit_seconds=TRACK_LIMIT_SECONDS):
+    tracks = load_tracks(limit_seconds)
+    results = {"build": build_info(), "tracks": [name for name, _, _ in tracks]}
+
+    # Stems are found relative to the working directory, so the synthetic
+    # tracks get a throwaway data/ tree of their own
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory() as workspace:
+        os.chdir(workspace)
+        try:
+            results["load"] = bench_load(tracks)
+            results["effects"] = bench_effects(tracks)
+            results["callback"] = bench_callback(tracks)
+            results["seek"] = bench_seek(tracks)
+            results["waveforms"] = bench_waveforms(tracks)
+        finally:
+            os.chdir(previous)
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    results = run(None if "--full" in sys.argv else TRACK_LIMIT_SECONDS)
+    output = json.dumps(results, indent=2)
+    if args:
+        with open(args[0], 'w') as f:
+            f.write(output)
+        print(f"✅ Benchmark results written to {args[0]}")
+    else:
+        print(output)
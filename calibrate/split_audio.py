@@ -1,12 +1,26 @@
-# to run: python split_audio.py
+# to run: python split_audio.py [model] [two_stems]   (e.g. htdemucs_6s, or htdemucs vocals)
 
 import os
+import sys
 import subprocess
 import glob
 from pydub import AudioSegment
 import simpleaudio as sa
 from tkinter import filedialog, Tk
 
+# Stem sets the supported Demucs runs write, largest first: htdemucs_6s,
+# htdemucs, and --two-stems vocals. A folder is complete when it holds every
+# file of one of them
+STEM_SETS = [
+    ["vocals", "drums", "bass", "guitar", "piano", "other"],
+    ["vocals", "drums", "bass", "other"],
+    ["vocals", "no_vocals"],
+]
+DEFAULT_MODEL = "htdemucs"
+
+# Model folders searched for an existing separation
+MODEL_DIRS = ["htdemucs_6s", "htdemucs", "mdx_extra", "mdx", "demucs"]
+
 # STEP 1: Let user pick a file
 def pick_audio_file():
     root = Tk()
@@ -20,7 +34,14 @@ def pick_audio_file():
     return file_path
 
 # STEP 2: Split using Demucs via CLI with better folder detection
-def split_song(file_path):
+def split_song(file_path, model=None, two_stems=None):
+    """Separate a song into data/separated/<model>/<song>; returns the folder name
+
+    Without a model, an existing separation by any model is reused (see
+    get_stem_folder_path) and Demucs only runs, with DEFAULT_MODEL, when
+    there is none. two_stems splits into that stem and everything else
+    (e.g. "vocals" gives vocals.wav and no_vocals.wav).
+    """
     song_name = os.path.splitext(os.path.basename(file_path))[0]
     
     # Clean up song name (remove special characters that might cause issues)
@@ -30,34 +51,28 @@ def split_song(file_path):
     print(f"🎵 Processing: {song_name}")
     print(f"🔧 Clean name: {clean_song_name}")
     
-    # Expected stem folder patterns - ONLY htdemucs
-    possible_folders = [
-        os.path.join("data", "separated", "htdemucs", song_name),
-        os.path.join("data", "separated", "htdemucs", clean_song_name)
-    ]
-    
-    # Check if stems already exist
+    # Check if stems already exist (under the model, or any model if none was asked for)
     existing_folder = None
-    for folder in possible_folders:
-        if os.path.exists(folder) and has_all_stems(folder):
-            existing_folder = folder
-            print(f"✅ Found existing stems: {folder}")
+    for name in (song_name, clean_song_name):
+        existing_folder = get_stem_folder_path(name, model)
+        if existing_folder:
+            print(f"✅ Found existing stems: {existing_folder}")
             break
+    model = model or DEFAULT_MODEL
     
     if not existing_folder:
         print("🎛️ Running Demucs to split stems...")
         
         # Ensure data directory exists
         os.makedirs("data", exist_ok=True)
+        options = ["--name", model, "--out", "data"]
+        if two_stems:
+            options += ["--two-stems", two_stems]
         
         try:
-            # Run Demucs with htdemucs model
-            result = subprocess.run([
-                "demucs", 
-                "--name", "htdemucs",
-                "--out", "data",
-                file_path
-            ], check=True, capture_output=True, text=True)
+            # Run Demucs with the chosen model
+            result = subprocess.run(["demucs"] + options + [file_path],
+                                    check=True, capture_output=True, text=True)
             
             print("✅ Demucs separation completed")
             
@@ -69,19 +84,15 @@ def split_song(file_path):
             # Try alternative approach
             try:
                 print("🔄 Trying alternative Demucs command...")
-                subprocess.run([
-                    "python", "-m", "demucs.separate", 
-                    "--name", "htdemucs",
-                    "--out", "data",
-                    file_path
-                ], check=True)
+                subprocess.run(["python", "-m", "demucs.separate"] + options + [file_path],
+                               check=True)
                 print("✅ Alternative Demucs succeeded")
             except:
                 print("❌ Both Demucs methods failed")
                 return None
         
         # Find the actual created folder
-        stem_folder = find_actual_stem_folder("data", song_name, clean_song_name)
+        stem_folder = find_actual_stem_folder("data", song_name, clean_song_name, model)
         
     else:
         stem_folder = existing_folder
@@ -93,22 +104,22 @@ def split_song(file_path):
         print(f"❌ Could not find or create stems for: {song_name}")
         return None
 
-def find_actual_stem_folder(data_dir, original_name, clean_name):
-    """Find the actual folder created by Demucs - ONLY in htdemucs"""
+def find_actual_stem_folder(data_dir, original_name, clean_name, model=DEFAULT_MODEL):
+    """Find the actual folder created by Demucs - only in the model's directory"""
     
-    # Only look in htdemucs directory
-    htdemucs_dir = os.path.join(data_dir, "separated", "htdemucs")
-    if not os.path.exists(htdemucs_dir):
-        print(f"❌ No htdemucs directory found: {htdemucs_dir}")
+    # Only look in the model's directory
+    model_dir = os.path.join(data_dir, "separated", model)
+    if not os.path.exists(model_dir):
+        print(f"❌ No {model} directory found: {model_dir}")
         return None
     
-    print(f"🔍 Checking htdemucs directory...")
+    print(f"🔍 Checking {model} directory...")
     
     # Look for folders matching our song names
     potential_names = [original_name, clean_name]
     
-    for folder_name in os.listdir(htdemucs_dir):
-        folder_path = os.path.join(htdemucs_dir, folder_name)
+    for folder_name in os.listdir(model_dir):
+        folder_path = os.path.join(model_dir, folder_name)
         
         if os.path.isdir(folder_path):
             print(f"   Found folder: {folder_name}")
@@ -126,35 +137,46 @@ def find_actual_stem_folder(data_dir, original_name, clean_name):
                         print(f"✅ Found matching stem folder: {folder_path}")
                         return folder_path
     
-    print("❌ No valid stem folder found in htdemucs")
+    print(f"❌ No valid stem folder found in {model}")
+    return None
+
+def find_stem_set(folder_path):
+    """Names of the largest complete stem set in a folder, or None"""
+    for stem_names in STEM_SETS:
+        if all(os.path.exists(os.path.join(folder_path, f"{stem}.wav")) for stem in stem_names):
+            return list(stem_names)
     return None
 
 def has_all_stems(folder_path):
-    """Check if folder contains all required stem files"""
-    required_stems = ["vocals.wav", "drums.wav", "bass.wav", "other.wav"]
-    
-    for stem in required_stems:
-        stem_path = os.path.join(folder_path, stem)
-        if not os.path.exists(stem_path):
-            print(f"   Missing: {stem}")
-            return False
+    """Check if folder contains every stem file of one supported stem set"""
+    stem_names = find_stem_set(folder_path)
+    if stem_names is None:
+        print(f"   Missing stems in: {folder_path}")
+        return False
     
-    print(f"   ✅ All stems present in: {folder_path}")
+    print(f"   ✅ All {len(stem_names)} stems present in: {folder_path}")
     return True
 
-def get_stem_folder_path(song_name):
-    """Get the full path to the stem folder"""
+def get_stem_folder_path(song_name, model=None):
+    """Get the full path to the stem folder, or None
+
+    With a model only its folder is checked. Otherwise every model folder
+    is, and the separation with the most stems wins, so an htdemucs_6s
+    split is preferred over a 4-stem htdemucs one of the same song.
+    """
     base_dir = "data/separated"
+    model_dirs = [model] if model else MODEL_DIRS
     
-    # Try different model directories
-    model_dirs = ["htdemucs", "mdx_extra", "mdx", "demucs"]
-    
+    best_path, best_count = None, 0
     for model_dir in model_dirs:
         potential_path = os.path.join(base_dir, model_dir, song_name)
-        if os.path.exists(potential_path) and has_all_stems(potential_path):
-            return potential_path
+        if not os.path.isdir(potential_path):
+            continue
+        stem_names = find_stem_set(potential_path)
+        if stem_names is not None and len(stem_names) > best_count:
+            best_path, best_count = potential_path, len(stem_names)
     
-    return None
+    return best_path
 
 # STEP 3: Play selected stem
 def play_stem(stem_file):
@@ -183,13 +205,15 @@ if __name__ == "__main__":
         print("❌ No file selected.")
         exit()
 
-    song_name = split_song(file_path)
+    model = sys.argv[1] if len(sys.argv) > 1 else None
+    two_stems = sys.argv[2] if len(sys.argv) > 2 else None
+    song_name = split_song(file_path, model, two_stems)
     if not song_name:
         print("❌ Failed to split song.")
         exit()
 
     # Find the actual stem folder
-    stem_folder = get_stem_folder_path(song_name)
+    stem_folder = get_stem_folder_path(song_name, model)
     if not stem_folder:
         print(f"❌ Could not locate stem folder for: {song_name}")
         exit()
@@ -203,7 +227,5 @@ if __name__ == "__main__":
         print(f"❌ Vocals not found at: {vocals_path}")
         
     print(f"🎛️ All stems available in: {stem_folder}")
-    print("   - vocals.wav")  
-    print("   - drums.wav")
-    print("   - bass.wav")
-    print("   - other.wav")
\ No newline at end of file
+    for stem in find_stem_set(stem_folder):
+        print(f"   - {stem}.wav")
\ No newline at end of file
@@ -0,0 +1,39 @@
+import time
+import numpy as np
+import soundfile as sf
+from app.audio_backend import get_backend
+from app.offline_render import render_offline
+from app.render_cache import RenderCache
+from app.sounddevice_audio_engine import RealTimeStemAudioEngine
+
+SAMPLE_RATE = 44100
+
+class SlowDiskCache(RenderCache):
+    """Disk cache on a slow drive: the save outlasts the render"""
+    def put(self, *args):
+        time.sleep(0.5)
+        super().put(*args)
+
+def test_int16_deck_bounces_the_finished_render(tmp_path):
+    # int16 storage and a disk cache both run after the render itself;
+    # the bounce must still start from the stretched matrix
+    rng = np.random.default_rng(0)
+    n_samples = 2 * SAMPLE_RATE
+    stems = {name: (rng.standard_normal((n_samples, 2)) * 0.05).astype(np.float32)
+             for name in ("vocals", "drums")}
+    engine = RealTimeStemAudioEngine(sample_rate=SAMPLE_RATE, effects_mode="render",
+                                     render_workers=1, storage_dtype="int16",
+                                     render_cache=SlowDiskCache(disk_root=str(tmp_path / "cache")),
+                                     backend=get_backend("null"))
+    engine.load_stem_arrays(stems, "test song")
+    engine.apply_effects_to_stems(speed=1.25)
+
+    path = str(tmp_path / "bounce.wav")
+    result = render_offline(engine, path)
+    engine.cleanup()
+
+    stretched = engine.track_length()
+    assert engine.timebase == 1.25
+    assert abs(stretched - n_samples / 1.25) < 1024
+    assert result["frames"] == stretched
+    assert sf.info(path).frames == stretched